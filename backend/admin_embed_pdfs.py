@@ -6,10 +6,11 @@ import argparse
 import os
 from pathlib import Path
 from typing import List, Dict
-import PyPDF2
+from uuid import uuid4
 from dotenv import load_dotenv
 
 from rag_engine import RAGEngine
+from pdf_ingest import PDF_CHUNK_SIZE, PDF_CHUNK_OVERLAP, chunk_text, iter_pdf_chunks, iter_pdf_pages
 from database import init_db
 
 load_dotenv()
@@ -18,10 +19,16 @@ load_dotenv()
 class PDFEmbedder:
     """Handles PDF processing and embedding"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        chunk_size: int = PDF_CHUNK_SIZE,
+        chunk_overlap: int = PDF_CHUNK_OVERLAP,
+        use_text_cache: bool = True
+    ):
         self.rag_engine = RAGEngine()
-        self.chunk_size = 1000  # Characters per chunk
-        self.chunk_overlap = 200  # Overlap between chunks
+        self.chunk_size = chunk_size  # Characters per chunk
+        self.chunk_overlap = chunk_overlap  # Overlap between chunks
+        self.use_text_cache = use_text_cache  # Reuse extracted text for unchanged PDFs
     
     def extract_text_from_pdf(self, pdf_path: str) -> List[Dict]:
         """
@@ -30,20 +37,11 @@ class PDFEmbedder:
         Returns:
             List of dicts with keys: page, text
         """
-        pages = []
-        
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages, start=1):
-                    text = page.extract_text()
-                    if text.strip():
-                        pages.append({
-                            'page': page_num,
-                            'text': text
-                        })
-            
+            pages = [
+                {'page': page, 'text': text}
+                for page, text in iter_pdf_pages(pdf_path, use_cache=self.use_text_cache)
+            ]
             print(f"✓ Extracted {len(pages)} pages from PDF")
             return pages
             
@@ -55,77 +53,43 @@ class PDFEmbedder:
         """
         Split text into overlapping chunks
         """
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + self.chunk_size
-            chunk = text[start:end]
-            
-            # Try to break at sentence boundary
-            if end < len(text):
-                last_period = chunk.rfind('.')
-                last_newline = chunk.rfind('\n')
-                break_point = max(last_period, last_newline)
-                
-                if break_point > self.chunk_size * 0.5:
-                    chunk = chunk[:break_point + 1]
-                    end = start + break_point + 1
-            
-            chunks.append(chunk.strip())
-            start = end - self.chunk_overlap
-        
-        return chunks
+        return chunk_text(text, self.chunk_size, self.chunk_overlap)
     
     def embed_pdf(
         self, 
         pdf_path: str, 
         document_name: str,
-        language: str = 'en'
+        language: str = 'en',
+        meta_data: Dict = None
     ):
         """
         Process and embed a PDF into the vector database
+        
+        Pages are parsed, chunked and embedded in batches as they are read.
+        
+        Args:
+            meta_data: Stored on every chunk (jurisdictionCode, topic, version_date, source_url)
         """
         print(f"\n📄 Processing: {document_name}")
         print(f"   File: {pdf_path}")
         print(f"   Language: {language}")
         
-        # Extract text
-        pages = self.extract_text_from_pdf(pdf_path)
+        def on_progress(done: int, total: int):
+            print(f"   ✓ Embedded {done} chunks")
         
-        if not pages:
-            print("✗ No text extracted. Aborting.")
+        try:
+            total_chunks = self.rag_engine.add_chunk_stream(
+                source=document_name,
+                chunks=iter_pdf_chunks(pdf_path, self.chunk_size, self.chunk_overlap, self.use_text_cache),
+                document_id=str(uuid4()),
+                language=language,
+                meta_data=meta_data,
+                on_progress=on_progress
+            )
+        except Exception as e:
+            print(f"✗ Error embedding PDF: {e}")
             return
         
-        # Process each page
-        total_chunks = 0
-        
-        for page_data in pages:
-            page_num = page_data['page']
-            page_text = page_data['text']
-            
-            # Chunk the page text
-            chunks = self.chunk_text(page_text)
-            
-            # Embed each chunk
-            for chunk_idx, chunk in enumerate(chunks):
-                if len(chunk.strip()) < 50:  # Skip very small chunks
-                    continue
-                
-                try:
-                    doc_id = self.rag_engine.add_document_chunk(
-                        source=document_name,
-                        page=page_num,
-                        chunk_index=chunk_idx,
-                        content=chunk,
-                        language=language
-                    )
-                    total_chunks += 1
-                    print(f"   ✓ Embedded: Page {page_num}, Chunk {chunk_idx} (ID: {doc_id[:8]}...)")
-                    
-                except Exception as e:
-                    print(f"   ✗ Error embedding chunk: {e}")
-        
         print(f"\n✓ Successfully embedded {total_chunks} chunks from {document_name}")
 
 
@@ -153,6 +117,44 @@ def main():
         choices=['en', 'ar'],
         help='Document language (en or ar)'
     )
+    parser.add_argument(
+        '--jurisdiction',
+        type=str,
+        default='DXB',
+        help='Jurisdiction code stored in chunk metadata (default DXB)'
+    )
+    parser.add_argument(
+        '--topic',
+        type=str,
+        help='Topic stored in chunk metadata (e.g., "tenancy")'
+    )
+    parser.add_argument(
+        '--version-date',
+        type=str,
+        help='Version date of the document (e.g., "2024")'
+    )
+    parser.add_argument(
+        '--source-url',
+        type=str,
+        help='Public URL of the document'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=PDF_CHUNK_SIZE,
+        help=f'Characters per chunk (default {PDF_CHUNK_SIZE})'
+    )
+    parser.add_argument(
+        '--chunk-overlap',
+        type=int,
+        default=PDF_CHUNK_OVERLAP,
+        help=f'Overlap between chunks (default {PDF_CHUNK_OVERLAP})'
+    )
+    parser.add_argument(
+        '--no-text-cache',
+        action='store_true',
+        help='Re-parse the PDF even if its extracted text is cached'
+    )
     parser.add_argument(
         '--init-db',
         action='store_true',
@@ -173,11 +175,23 @@ def main():
         print("✓ Database initialized")
     
     # Embed PDF
-    embedder = PDFEmbedder()
+    embedder = PDFEmbedder(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        use_text_cache=not args.no_text_cache
+    )
     embedder.embed_pdf(
         pdf_path=args.pdf,
         document_name=args.name,
-        language=args.language
+        language=args.language,
+        meta_data={
+            k: v for k, v in {
+                "jurisdictionCode": args.jurisdiction,
+                "topic": args.topic,
+                "version_date": args.version_date,
+                "source_url": args.source_url
+            }.items() if v is not None
+        }
     )
     
     print("\n✅ Done!")
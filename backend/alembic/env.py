@@ -17,6 +17,10 @@ from models import Conversation, Message, Citation, Feedback, Document
 # access to the values within the .ini file in use.
 config = context.config
 
+# Prefer the deployment's DATABASE_URL over the local default in alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
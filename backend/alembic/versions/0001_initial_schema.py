@@ -0,0 +1,78 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+Databases created earlier with init_db()/create_all already have these
+tables; mark them as migrated with `alembic stamp 0001`.
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+
+    op.create_table(
+        'conversations',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('language', sa.String(length=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'messages',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('conversation_id', sa.String(), sa.ForeignKey('conversations.id'), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('is_user', sa.Boolean(), nullable=False),
+        sa.Column('language', sa.String(length=2), nullable=False),
+        sa.Column('confidence', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'citations',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('message_id', sa.String(), sa.ForeignKey('messages.id'), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('page', sa.Integer(), nullable=True),
+        sa.Column('excerpt', sa.Text(), nullable=False),
+        sa.Column('relevance_score', sa.Float(), nullable=False),
+    )
+    op.create_table(
+        'feedbacks',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('message_id', sa.String(), sa.ForeignKey('messages.id'), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'documents',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('page', sa.Integer(), nullable=True),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('content_ar', sa.Text(), nullable=True),
+        sa.Column('embedding', Vector(3072), nullable=False),
+        sa.Column('language', sa.String(length=2), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('meta_data', sa.Text(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('documents')
+    op.drop_table('feedbacks')
+    op.drop_table('citations')
+    op.drop_table('messages')
+    op.drop_table('conversations')
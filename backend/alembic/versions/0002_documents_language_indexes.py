@@ -0,0 +1,56 @@
+"""per-language partial indexes on documents
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00.000000
+
+Each language share of `documents` ('en', 'ar', 'both') gets its own
+partial ANN index, so a search only walks the share it filters on.
+
+- pgvector >= 0.7: HNSW over embedding cast to halfvec(3072). Plain
+  `vector` indexes stop at 2000 dimensions. VECTOR_SEARCH_CAST=halfvec
+  (the default) makes queries use the same expression as the index.
+- Older pgvector: no ANN index fits 3072 dimensions, so only the btree
+  indexes are created and searches stay exact per partition. Set
+  VECTOR_SEARCH_CAST=vector, since there is no halfvec type to cast to.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+LANGUAGES = ('en', 'ar', 'both')
+
+
+def _pgvector_version() -> tuple:
+    version = op.get_bind().execute(
+        sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    ).scalar() or "0"
+    return tuple(int(part) for part in version.split(".") if part.isdigit())
+
+
+def upgrade() -> None:
+    # 'both' does not fit in VARCHAR(2)
+    op.alter_column('documents', 'language', type_=sa.String(length=4), existing_type=sa.String(length=2))
+
+    op.create_index('ix_documents_language_created_at', 'documents', ['language', 'created_at'])
+
+    if _pgvector_version() >= (0, 7):
+        for language in LANGUAGES:
+            op.execute(
+                f"CREATE INDEX ix_documents_embedding_hnsw_{language} ON documents "
+                f"USING hnsw ((CAST(embedding AS halfvec(3072))) halfvec_cosine_ops) "
+                f"WHERE language = '{language}'"
+            )
+
+
+def downgrade() -> None:
+    for language in LANGUAGES:
+        op.execute(f"DROP INDEX IF EXISTS ix_documents_embedding_hnsw_{language}")
+    op.drop_index('ix_documents_language_created_at', table_name='documents')
+    op.alter_column('documents', 'language', type_=sa.String(length=2), existing_type=sa.String(length=4))
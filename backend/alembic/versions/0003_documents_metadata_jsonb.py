@@ -0,0 +1,63 @@
+"""documents.meta_data as indexed JSONB
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00.000000
+
+meta_data held a JSON string, so retrieval could not filter on it. It
+becomes JSONB (NULL/'' → '{}'), rows without a jurisdictionCode are
+backfilled with the 'DXB' default that /embed always applied, and two
+indexes back the filters:
+
+- GIN (jsonb_path_ops) for the `meta_data @> '{...}'` containment
+  predicate used by the retrieval SQL
+- btree on meta_data->>'jurisdictionCode' for per-jurisdiction scans
+  and counts
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE documents ALTER COLUMN meta_data TYPE JSONB "
+        "USING COALESCE(NULLIF(meta_data, '')::jsonb, '{}'::jsonb)"
+    )
+    op.execute(
+        "UPDATE documents SET meta_data = meta_data || '{\"jurisdictionCode\": \"DXB\"}'::jsonb "
+        "WHERE NOT meta_data ? 'jurisdictionCode'"
+    )
+    op.alter_column(
+        'documents', 'meta_data',
+        existing_type=postgresql.JSONB(),
+        nullable=False,
+        server_default=sa.text("'{}'::jsonb")
+    )
+    op.execute(
+        "CREATE INDEX ix_documents_meta_data ON documents "
+        "USING gin (meta_data jsonb_path_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_documents_jurisdiction ON documents "
+        "((meta_data->>'jurisdictionCode'))"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_documents_jurisdiction")
+    op.execute("DROP INDEX IF EXISTS ix_documents_meta_data")
+    op.alter_column(
+        'documents', 'meta_data',
+        existing_type=postgresql.JSONB(),
+        nullable=True,
+        server_default=None
+    )
+    op.execute("ALTER TABLE documents ALTER COLUMN meta_data TYPE TEXT USING meta_data::text")
@@ -0,0 +1,37 @@
+"""record embedding provider/version per document chunk
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00.000000
+
+Vectors from different embedding providers (OpenAI, local hashed n-gram)
+share the `embedding` column but are not comparable, so each chunk
+records which provider and model version produced it and vector search
+filters on both. Existing rows were all embedded with OpenAI's
+text-embedding-3-large.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'documents',
+        sa.Column('embedding_provider', sa.String(length=32), nullable=False, server_default='openai')
+    )
+    op.add_column(
+        'documents',
+        sa.Column('embedding_version', sa.String(length=64), nullable=False, server_default='text-embedding-3-large')
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'embedding_version')
+    op.drop_column('documents', 'embedding_provider')
@@ -0,0 +1,26 @@
+"""ingestion jobs for spooled PDF uploads
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 14:00:00.000000
+
+/embed/pdf spools the upload to disk and queues a job that points at the
+file instead of carrying extracted text.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('ingestion_jobs', sa.Column('file_path', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ingestion_jobs', 'file_path')
@@ -0,0 +1,29 @@
+"""index for keyset pagination of conversation messages
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 15:00:00.000000
+
+Conversation history pages and NDJSON exports walk messages by
+(created_at, id) within a conversation; this index serves each page as
+a single range scan.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_messages_conversation_created_id', 'messages',
+        ['conversation_id', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_created_id', table_name='messages')
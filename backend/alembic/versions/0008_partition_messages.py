@@ -0,0 +1,193 @@
+"""partition messages, citations and feedbacks by month
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 17:00:00.000000
+
+Chat history grows without bound and is only ever read recently, by
+conversation. The three tables become RANGE partitions on created_at
+with one partition per month (plus a default catch-all), so retention
+drops whole partitions instead of deleting rows (see partitions.py).
+
+Partitioned primary keys must include the partition key, so messages is
+keyed (id, created_at); citations and feedbacks keep message_id indexed
+but lose the foreign key to messages, which can no longer be enforced.
+Existing rows are copied across; citations take created_at from their
+message.
+"""
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+TABLES = ('messages', 'citations', 'feedbacks')
+MONTHS_AHEAD = 3
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _months(first: date, last: date):
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = _next_month(month)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # Move the old tables aside; constraint and index names must be freed too
+    op.drop_constraint('citations_message_id_fkey', 'citations', type_='foreignkey')
+    op.drop_constraint('feedbacks_message_id_fkey', 'feedbacks', type_='foreignkey')
+    op.drop_index('ix_messages_conversation_created_id', table_name='messages')
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        op.execute(f"ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey")
+    op.execute("ALTER TABLE messages_legacy RENAME CONSTRAINT messages_conversation_id_fkey TO messages_legacy_conversation_id_fkey")
+
+    op.execute("""
+        CREATE TABLE messages (
+            id VARCHAR NOT NULL,
+            conversation_id VARCHAR NOT NULL REFERENCES conversations (id),
+            content TEXT NOT NULL,
+            is_user BOOLEAN NOT NULL,
+            language VARCHAR(2) NOT NULL,
+            confidence FLOAT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("""
+        CREATE TABLE citations (
+            id VARCHAR NOT NULL,
+            message_id VARCHAR NOT NULL,
+            source VARCHAR NOT NULL,
+            page INTEGER,
+            excerpt TEXT NOT NULL,
+            relevance_score FLOAT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("""
+        CREATE TABLE feedbacks (
+            id VARCHAR NOT NULL,
+            message_id VARCHAR NOT NULL,
+            rating INTEGER NOT NULL,
+            comment TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    # Monthly partitions covering existing data through a few months ahead
+    first = conn.execute(sa.text("SELECT min(created_at) FROM messages_legacy")).scalar()
+    first = min(first.date(), datetime.utcnow().date()) if first else datetime.utcnow().date()
+    last = datetime.utcnow().date()
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last.replace(day=1))
+    for table in TABLES:
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        for month in _months(first, last):
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')"
+            )
+
+    # Rows without a timestamp predate the column default; they get the oldest month
+    fallback = first.replace(day=1)
+    op.execute(f"""
+        INSERT INTO messages (id, conversation_id, content, is_user, language, confidence, created_at)
+        SELECT id, conversation_id, content, is_user, language, confidence, COALESCE(created_at, '{fallback}')
+        FROM messages_legacy
+    """)
+    op.execute(f"""
+        INSERT INTO citations (id, message_id, source, page, excerpt, relevance_score, created_at)
+        SELECT c.id, c.message_id, c.source, c.page, c.excerpt, c.relevance_score,
+               COALESCE(m.created_at, '{fallback}')
+        FROM citations_legacy c
+        LEFT JOIN messages_legacy m ON m.id = c.message_id
+    """)
+    op.execute(f"""
+        INSERT INTO feedbacks (id, message_id, rating, comment, created_at)
+        SELECT id, message_id, rating, comment, COALESCE(created_at, '{fallback}')
+        FROM feedbacks_legacy
+    """)
+    for table in reversed(TABLES):
+        op.execute(f"DROP TABLE {table}_legacy")
+
+    # Indexes on the parent cascade to every current and future partition
+    op.create_index(
+        'ix_messages_conversation_created_id', 'messages',
+        ['conversation_id', 'created_at', 'id']
+    )
+    op.create_index('ix_citations_message_id', 'citations', ['message_id'])
+    op.create_index('ix_feedbacks_message_id', 'feedbacks', ['message_id'])
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey")
+
+    op.create_table(
+        'messages',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('conversation_id', sa.String(), sa.ForeignKey('conversations.id'), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('is_user', sa.Boolean(), nullable=False),
+        sa.Column('language', sa.String(length=2), nullable=False),
+        sa.Column('confidence', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'citations',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('message_id', sa.String(), sa.ForeignKey('messages.id'), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('page', sa.Integer(), nullable=True),
+        sa.Column('excerpt', sa.Text(), nullable=False),
+        sa.Column('relevance_score', sa.Float(), nullable=False),
+    )
+    op.create_table(
+        'feedbacks',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('message_id', sa.String(), sa.ForeignKey('messages.id'), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    # Rows orphaned while no foreign key was enforced cannot come back
+    op.execute("""
+        INSERT INTO messages (id, conversation_id, content, is_user, language, confidence, created_at)
+        SELECT id, conversation_id, content, is_user, language, confidence, created_at
+        FROM messages_partitioned
+    """)
+    op.execute("""
+        INSERT INTO citations (id, message_id, source, page, excerpt, relevance_score)
+        SELECT c.id, c.message_id, c.source, c.page, c.excerpt, c.relevance_score
+        FROM citations_partitioned c
+        WHERE EXISTS (SELECT 1 FROM messages m WHERE m.id = c.message_id)
+    """)
+    op.execute("""
+        INSERT INTO feedbacks (id, message_id, rating, comment, created_at)
+        SELECT f.id, f.message_id, f.rating, f.comment, f.created_at
+        FROM feedbacks_partitioned f
+        WHERE EXISTS (SELECT 1 FROM messages m WHERE m.id = f.message_id)
+    """)
+    for table in reversed(TABLES):
+        op.execute(f"DROP TABLE {table}_partitioned")
+    op.create_index(
+        'ix_messages_conversation_created_id', 'messages',
+        ['conversation_id', 'created_at', 'id']
+    )
@@ -0,0 +1,37 @@
+"""standalone table for /feedback widget votes
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 18:00:00.000000
+
+/feedback used to create a conversation and a message just to hang a
+feedback row off them. Votes now go to their own narrow table, written
+in batches; the only secondary index serves time-range reporting.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'answer_feedback',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('question', sa.Text(), nullable=False),
+        sa.Column('answer_id', sa.String(), nullable=True),
+        sa.Column('helpful', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    # BRIN: rows arrive in created_at order, so a few pages index the whole table
+    op.execute("CREATE INDEX ix_answer_feedback_created_at ON answer_feedback USING brin (created_at)")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_answer_feedback_created_at', table_name='answer_feedback')
+    op.drop_table('answer_feedback')
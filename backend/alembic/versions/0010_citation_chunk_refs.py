@@ -0,0 +1,47 @@
+"""citations reference document chunks instead of copying excerpts
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 19:00:00.000000
+
+New citations store documents.id plus the excerpt's character offsets
+and no text; the excerpt is resolved from the chunk on read. Existing
+rows keep their copied excerpt, so `excerpt` becomes nullable. Columns
+added to the partitioned parent apply to every partition.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('citations', sa.Column('document_id', sa.String(), nullable=True))
+    op.add_column('citations', sa.Column('excerpt_start', sa.Integer(), nullable=True))
+    op.add_column('citations', sa.Column('excerpt_end', sa.Integer(), nullable=True))
+    op.alter_column('citations', 'excerpt', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    # Resolve referenced excerpts back into text before dropping the references
+    # Offsets index the text the answer was given from (content_ar for Arabic messages)
+    op.execute("""
+        UPDATE citations c
+        SET excerpt = substr(
+            CASE WHEN m.language = 'ar' AND d.content_ar IS NOT NULL THEN d.content_ar ELSE d.content END,
+            c.excerpt_start + 1,
+            c.excerpt_end - c.excerpt_start
+        )
+        FROM documents d, messages m
+        WHERE c.excerpt IS NULL AND d.id = c.document_id AND m.id = c.message_id
+    """)
+    op.execute("UPDATE citations SET excerpt = '' WHERE excerpt IS NULL")
+    op.alter_column('citations', 'excerpt', existing_type=sa.Text(), nullable=False)
+    op.drop_column('citations', 'excerpt_end')
+    op.drop_column('citations', 'excerpt_start')
+    op.drop_column('citations', 'document_id')
@@ -0,0 +1,72 @@
+"""next-embedding columns for zero-downtime model migrations
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 20:00:00.000000
+
+reembed.py backfills new-model vectors into documents.embedding_next
+while retrieval keeps using documents.embedding, then cuts over by
+renaming the two sets of columns. Because the columns trade places, both
+are nullable and neither has a server default. embedding_migrations
+records each migration; the 'active' row decides which embedder
+retrieval and ingestion use.
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'embedding_migrations',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('provider', sa.String(length=32), nullable=False),
+        sa.Column('model', sa.String(length=64), nullable=True),
+        sa.Column('dimensions', sa.Integer(), nullable=True),
+        sa.Column('version', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('chunks_total', sa.Integer(), nullable=False),
+        sa.Column('chunks_done', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('cut_over_at', sa.DateTime(), nullable=True),
+    )
+    # At most one migration in flight and one active at a time
+    op.execute("""
+        CREATE UNIQUE INDEX ix_embedding_migrations_in_flight ON embedding_migrations ((true))
+        WHERE status IN ('backfilling', 'ready')
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX ix_embedding_migrations_active ON embedding_migrations ((true))
+        WHERE status = 'active'
+    """)
+    op.add_column('documents', sa.Column('embedding_next', Vector(3072), nullable=True))
+    op.add_column('documents', sa.Column('embedding_next_provider', sa.String(length=32), nullable=True))
+    op.add_column('documents', sa.Column('embedding_next_version', sa.String(length=64), nullable=True))
+    op.alter_column('documents', 'embedding', nullable=True, existing_type=Vector(3072))
+    op.alter_column('documents', 'embedding_provider', nullable=True, server_default=None,
+                    existing_type=sa.String(length=32))
+    op.alter_column('documents', 'embedding_version', nullable=True, server_default=None,
+                    existing_type=sa.String(length=64))
+
+
+def downgrade() -> None:
+    for language in ('en', 'ar', 'both'):
+        op.execute(f"DROP INDEX IF EXISTS ix_documents_embedding_next_hnsw_{language}")
+    op.alter_column('documents', 'embedding_version', nullable=False, server_default='text-embedding-3-large',
+                    existing_type=sa.String(length=64))
+    op.alter_column('documents', 'embedding_provider', nullable=False, server_default='openai',
+                    existing_type=sa.String(length=32))
+    op.alter_column('documents', 'embedding', nullable=False, existing_type=Vector(3072))
+    op.drop_column('documents', 'embedding_next_version')
+    op.drop_column('documents', 'embedding_next_provider')
+    op.drop_column('documents', 'embedding_next')
+    op.execute("DROP INDEX IF EXISTS ix_embedding_migrations_active")
+    op.execute("DROP INDEX IF EXISTS ix_embedding_migrations_in_flight")
+    op.drop_table('embedding_migrations')
@@ -0,0 +1,301 @@
+"""
+Local stand-in for the OpenAI chat-completions and embeddings APIs
+Usage:
+    python benchmarks/fake_openai_server.py --port 8100 --chat-latency lognormal:median=800,sigma=0.5 \\
+        --embed-latency lognormal:median=120,sigma=0.3 --rate-limit-rate 0.02 --error-rate 0.01
+
+Point the backend at it with:
+    OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-fake uvicorn main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class LatencyDistribution:
+    """
+    Latency in milliseconds drawn from a named distribution
+
+    Specs: "fixed:ms=50", "uniform:low=20,high=80", "lognormal:median=120,sigma=0.4"
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, raw = spec.partition(":")
+        self.kind = kind
+        self.params = {}
+        for pair in filter(None, raw.split(",")):
+            key, _, value = pair.partition("=")
+            self.params[key.strip()] = float(value)
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params.get("ms", 0.0)
+        if self.kind == "uniform":
+            return random.uniform(self.params.get("low", 0.0), self.params.get("high", 0.0))
+        return float(np.random.lognormal(np.log(self.params.get("median", 100.0)), self.params.get("sigma", 0.4)))
+
+
+class FakeOpenAIConfig:
+    """Runtime-adjustable behaviour of the fake server"""
+
+    def __init__(
+        self,
+        chat_latency: str = "lognormal:median=800,sigma=0.5",
+        embed_latency: str = "lognormal:median=120,sigma=0.3",
+        stream_token_ms: float = 15.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        embedding_dim: int = 3072,
+        completion_tokens: int = 250
+    ):
+        self.chat_latency = LatencyDistribution(chat_latency)
+        self.embed_latency = LatencyDistribution(embed_latency)
+        self.stream_token_ms = stream_token_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.embedding_dim = embedding_dim
+        self.completion_tokens = completion_tokens
+
+    def update(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            if key in ("chat_latency", "embed_latency"):
+                setattr(self, key, LatencyDistribution(value))
+            elif hasattr(self, key):
+                setattr(self, key, type(getattr(self, key))(value))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "chat_latency": self.chat_latency.spec,
+            "embed_latency": self.embed_latency.spec,
+            "stream_token_ms": self.stream_token_ms,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "retry_after": self.retry_after,
+            "embedding_dim": self.embedding_dim,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class UsageCounters:
+    """Token and request accounting across all calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.values = {
+                "chat_requests": 0,
+                "embedding_requests": 0,
+                "embedding_inputs": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "embedding_tokens": 0,
+                "rate_limited": 0,
+                "errors": 0,
+            }
+
+    def add(self, **amounts: int):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.values[key] += amount
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Deterministic unit vector seeded from the input text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+def error_response(status: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None):
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": error_type, "param": None, "code": None}},
+        headers=headers,
+    )
+
+
+def create_app(config: Optional[FakeOpenAIConfig] = None) -> FastAPI:
+    """Build the fake OpenAI app"""
+    config = config or FakeOpenAIConfig()
+    usage = UsageCounters()
+    app = FastAPI(title="Fake OpenAI API")
+
+    def injected_failure():
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            usage.add(rate_limited=1)
+            return error_response(
+                429, "Rate limit reached for requests (fake)", "requests",
+                headers={"Retry-After": str(config.retry_after)}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            usage.add(errors=1)
+            return error_response(500, "The server had an error while processing your request (fake)", "server_error")
+        return None
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.embed_latency.sample() / 1000)
+        failure = injected_failure()
+        if failure:
+            return failure
+
+        inputs: Union[str, List[str]] = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dim = int(body.get("dimensions") or config.embedding_dim)
+        tokens = sum(count_tokens(t) for t in inputs)
+        usage.add(embedding_requests=1, embedding_inputs=len(inputs), embedding_tokens=tokens)
+
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(t, dim)}
+                for i, t in enumerate(inputs)
+            ],
+            "model": body.get("model", "text-embedding-3-large"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = min(config.completion_tokens, int(body.get("max_tokens") or config.completion_tokens))
+        question = messages[-1].get("content", "") if messages else ""
+        answer = (f"[fake answer to: {question[:80]}] " + "lorem " * completion_tokens).strip()
+
+        # Time to first token
+        await asyncio.sleep(config.chat_latency.sample() / 1000)
+        failure = injected_failure()
+        if failure:
+            return failure
+        usage.add(chat_requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+        completion_id = f"chatcmpl-fake-{int(time.time() * 1000)}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4o-mini")
+        usage_block = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        if body.get("stream"):
+            async def event_stream():
+                for i, word in enumerate(answer.split(" ")):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"role": "assistant", "content": word} if i == 0 else {"content": " " + word},
+                            "finish_reason": None,
+                        }],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(config.stream_token_ms / 1000)
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "usage": usage_block,
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        # Non-streaming responses still pay for generating every token
+        await asyncio.sleep(completion_tokens * config.stream_token_ms / 1000)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": usage_block,
+        }
+
+    @app.get("/_stats")
+    async def stats():
+        return {"usage": dict(usage.values), "config": config.as_dict()}
+
+    @app.post("/_stats/reset")
+    async def reset_stats():
+        usage.reset()
+        return {"ok": True}
+
+    @app.post("/_config")
+    async def update_config(request: Request):
+        config.update(await request.json())
+        return config.as_dict()
+
+    return app
+
+
+def main():
+    """Main function for CLI"""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI API for load testing")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--chat-latency', type=str, default='lognormal:median=800,sigma=0.5',
+                        help='Time to first token distribution')
+    parser.add_argument('--embed-latency', type=str, default='lognormal:median=120,sigma=0.3')
+    parser.add_argument('--stream-token-ms', type=float, default=15.0, help='Delay per generated token')
+    parser.add_argument('--completion-tokens', type=int, default=250)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of calls failing with 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds on 429s')
+    parser.add_argument('--embedding-dim', type=int, default=3072)
+
+    args = parser.parse_args()
+    config = FakeOpenAIConfig(
+        chat_latency=args.chat_latency,
+        embed_latency=args.embed_latency,
+        stream_token_ms=args.stream_token_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        embedding_dim=args.embedding_dim,
+        completion_tokens=args.completion_tokens,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
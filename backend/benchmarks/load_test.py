@@ -0,0 +1,257 @@
+"""
+Load Test: drive /ask and /api/chat at increasing concurrency
+Usage:
+    # Spawn the fake OpenAI server and the API (1 and 4 workers) automatically
+    python benchmarks/load_test.py --spawn --workers 1,4 --concurrency 1,8,32,64
+
+    # Or target an already running deployment
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000 --concurrency 1,8,32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+QUESTIONS_EN = [
+    "How much notice does a landlord need to give before increasing rent?",
+    "Can my landlord evict me to sell the property?",
+    "When should my security deposit be refunded?",
+    "Who is responsible for maintenance and repairs?",
+    "Do I need to register my tenancy contract with Ejari?",
+    "How do I file a case with the Rental Dispute Center?",
+    "Can I sublet my apartment?",
+    "What happens if a rent cheque bounces?",
+]
+
+QUESTIONS_AR = [
+    "ما هي مدة الإشعار قبل زيادة الإيجار؟",
+    "هل يمكن للمالك إخلائي لبيع العقار؟",
+    "متى يجب استرداد مبلغ التأمين؟",
+    "من المسؤول عن الصيانة والإصلاحات؟",
+]
+
+
+def build_request(endpoint: str) -> Dict[str, Any]:
+    """Pick a random question and shape it for the given endpoint"""
+    if random.random() < 0.2:
+        question, language = random.choice(QUESTIONS_AR), "ar"
+    else:
+        question, language = random.choice(QUESTIONS_EN), "en"
+
+    if endpoint == "chat":
+        return {"path": "/api/chat", "json": {"message": question, "language": language}}
+    return {"path": "/ask", "json": {"question": question, "language": language}}
+
+
+async def sample_server_lag(client: httpx.AsyncClient, stop: asyncio.Event, samples: List[Dict[str, Any]]):
+    """Poll /metrics for the workers' event-loop lag while a stage runs"""
+    while not stop.is_set():
+        try:
+            start = time.perf_counter()
+            response = await client.get("/metrics", timeout=10)
+            probe_ms = (time.perf_counter() - start) * 1000
+            lag = response.json().get("latency", {}).get("event_loop_lag", {})
+            samples.append({"probe_ms": probe_ms, "p99_ms": lag.get("p99_ms"), "max_ms": lag.get("max_ms")})
+        except Exception:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_stage(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    endpoints: List[str],
+    timeout: float
+) -> Dict[str, Any]:
+    """
+    Closed-loop stage: `concurrency` workers send requests back-to-back for `duration` seconds
+
+    Returns:
+        Dict with latency percentiles, throughput, error rate and lag figures
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lag_samples: List[Dict[str, Any]] = []
+    deadline = time.perf_counter() + duration
+    stop = asyncio.Event()
+
+    limits = httpx.Limits(max_connections=concurrency + 2, max_keepalive_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                req = build_request(random.choice(endpoints))
+                start = time.perf_counter()
+                try:
+                    response = await client.post(req["path"], json=req["json"])
+                    key = str(response.status_code)
+                except httpx.TimeoutException:
+                    key = "timeout"
+                except httpx.HTTPError:
+                    key = "connection_error"
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[key] = statuses.get(key, 0) + 1
+
+        lag_task = asyncio.create_task(sample_server_lag(client, stop, lag_samples))
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - wall_start
+        stop.set()
+        await lag_task
+
+    total = len(latencies)
+    errors = total - statuses.get("200", 0)
+    lat = np.asarray(latencies) if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    lag_p99 = [s["p99_ms"] for s in lag_samples if s["p99_ms"] is not None]
+    probes = [s["probe_ms"] for s in lag_samples]
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "rps": round(total / wall, 2) if wall else 0.0,
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "statuses": statuses,
+        "loop_lag_p99_ms": round(max(lag_p99), 2) if lag_p99 else None,
+        "metrics_probe_p95_ms": round(float(np.percentile(probes, 95)), 1) if probes else None,
+    }
+
+
+def wait_for(url: str, timeout: float = 60.0):
+    """Block until `url` answers or raise"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def spawn(args_list: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        args_list, cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def terminate(process: Optional[subprocess.Popen]):
+    if process and process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+async def run_series(args, base_url: str, workers: Optional[int]) -> List[Dict[str, Any]]:
+    rows = []
+    label = f"{workers} worker(s)" if workers else base_url
+    print(f"\n🚀 {label}")
+    for concurrency in args.concurrency:
+        row = await run_stage(base_url, concurrency, args.duration, args.endpoints, args.timeout)
+        row["workers"] = workers
+        rows.append(row)
+        print(
+            f"   c={concurrency:<4} rps={row['rps']:>7.2f} p50={row['p50_ms']:>8.1f}ms "
+            f"p95={row['p95_ms']:>8.1f}ms p99={row['p99_ms']:>8.1f}ms "
+            f"errors={row['error_rate']:.2%} loop_lag_p99={row['loop_lag_p99_ms']}ms"
+        )
+    return rows
+
+
+def main():
+    """Main function for CLI"""
+    parser = argparse.ArgumentParser(description="Load test the LegalEdge AI API")
+    parser.add_argument('--base-url', type=str, default='http://127.0.0.1:8000')
+    parser.add_argument('--spawn', action='store_true',
+                        help='Start the fake OpenAI server and the API locally for each worker count')
+    parser.add_argument('--workers', type=str, default='1', help='Comma-separated uvicorn worker counts (--spawn)')
+    parser.add_argument('--port', type=int, default=8001, help='API port when spawning')
+    parser.add_argument('--fake-port', type=int, default=8100, help='Fake OpenAI port when spawning')
+    parser.add_argument('--fake-args', type=str, default='',
+                        help='Extra arguments for fake_openai_server.py, e.g. "--rate-limit-rate 0.05"')
+    parser.add_argument('--concurrency', type=str, default='1,4,16,32,64')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per concurrency stage')
+    parser.add_argument('--endpoints', type=str, default='ask,chat', help='Any of: ask, chat')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Client timeout per request')
+    parser.add_argument('--output', type=str, default=None, help='Where to save results JSON')
+
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(',')]
+    args.endpoints = [e.strip() for e in args.endpoints.split(',')]
+
+    results: List[Dict[str, Any]] = []
+    fake_usage: Dict[str, Any] = {}
+
+    if not args.spawn:
+        results.extend(asyncio.run(run_series(args, args.base_url, None)))
+    else:
+        fake_url = f"http://127.0.0.1:{args.fake_port}"
+        fake = spawn(
+            [sys.executable, "benchmarks/fake_openai_server.py", "--port", str(args.fake_port)]
+            + args.fake_args.split(),
+            dict(os.environ)
+        )
+        try:
+            wait_for(f"{fake_url}/_stats")
+            env = dict(os.environ, OPENAI_API_BASE=f"{fake_url}/v1", OPENAI_API_KEY="sk-fake")
+            for workers in (int(w) for w in args.workers.split(',')):
+                api = spawn(
+                    [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                     "--port", str(args.port), "--workers", str(workers), "--log-level", "warning"],
+                    env
+                )
+                try:
+                    base_url = f"http://127.0.0.1:{args.port}"
+                    wait_for(f"{base_url}/health")
+                    results.extend(asyncio.run(run_series(args, base_url, workers)))
+                finally:
+                    terminate(api)
+            fake_usage = httpx.get(f"{fake_url}/_stats", timeout=5).json()
+            print(f"\n🧮 Fake OpenAI usage: {json.dumps(fake_usage['usage'])}")
+        finally:
+            terminate(fake)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            "meta": {
+                "created_at": datetime.utcnow().isoformat(),
+                "endpoints": args.endpoints,
+                "duration_s": args.duration,
+                "fake_openai": fake_usage,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\n✓ Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
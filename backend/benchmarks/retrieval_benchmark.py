@@ -0,0 +1,470 @@
+"""
+Retrieval Benchmark: latency, throughput and recall@k at increasing corpus sizes
+Usage:
+    python benchmarks/retrieval_benchmark.py --sizes 10000,100000 --index flat --index ivf:lists=256,probes=8
+    python benchmarks/retrieval_benchmark.py --backend pgvector --database-url postgresql://.../legaledge_bench \\
+        --dim 1536 --index flat --index hnsw:m=16,ef_construction=64,ef_search=40
+    python benchmarks/retrieval_benchmark.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_corpus import SyntheticCorpus, generate_corpus, generate_queries, iter_batches
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Language partitions of the documents table
+BENCH_PARTITIONS = ('en', 'ar', 'both')
+
+
+# ===== Helpers =====
+
+def parse_index_spec(spec: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Parse an index setting such as "ivf:lists=256,probes=8"
+
+    Returns:
+        (kind, params) where kind is 'flat', 'ivf' or 'hnsw'
+    """
+    kind, _, raw_params = spec.partition(":")
+    params = {}
+    for pair in filter(None, raw_params.split(",")):
+        key, _, value = pair.partition("=")
+        params[key.strip()] = int(value)
+    if kind not in ("flat", "ivf", "hnsw"):
+        raise ValueError(f"Unknown index kind: {kind}")
+    return kind, params
+
+
+def language_mask(languages: np.ndarray, language: str) -> np.ndarray:
+    """Mirror of the `language = :language OR language = 'both'` filter"""
+    return (languages == language) | (languages == 'both')
+
+
+def exact_top_k(corpus: SyntheticCorpus, query: np.ndarray, language: str, k: int) -> List[int]:
+    """Ground truth: exhaustive cosine search with the language filter applied"""
+    scores = corpus.embeddings @ query
+    scores[~language_mask(corpus.languages, language)] = -np.inf
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])].tolist()
+
+
+def summarize(latencies_ms: List[float], wall_s: float, recalls: List[float]) -> Dict[str, float]:
+    """Compute latency percentiles, throughput and mean recall"""
+    lat = np.asarray(latencies_ms)
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(lat.mean()), 3),
+        "qps": round(len(lat) / wall_s, 1) if wall_s > 0 else 0.0,
+        "recall_at_k": round(float(np.mean(recalls)), 4) if recalls else None,
+    }
+
+
+def run_queries(
+    search: Callable[[int], List[Any]],
+    n_queries: int,
+    concurrency: int
+) -> Tuple[List[float], List[List[Any]], float]:
+    """
+    Run `search(i)` for every query index, optionally from a thread pool
+
+    Returns:
+        (latencies_ms, results, wall_seconds)
+    """
+    latencies = [0.0] * n_queries
+    results: List[List[Any]] = [[] for _ in range(n_queries)]
+
+    def timed(i: int):
+        start = time.perf_counter()
+        results[i] = search(i)
+        latencies[i] = (time.perf_counter() - start) * 1000
+
+    wall_start = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(n_queries):
+            timed(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(n_queries)))
+    wall = time.perf_counter() - wall_start
+
+    return latencies, results, wall
+
+
+# ===== In-process backend =====
+
+class InProcessBackend:
+    """NumPy flat and IVF search plus the LIKE-style keyword scan"""
+
+    def __init__(self, corpus: SyntheticCorpus):
+        from rag_engine import extract_keywords
+
+        self.extract_keywords = extract_keywords
+        self.corpus = corpus
+        self.lowered = [c.lower() for c in corpus.contents]
+        self.centroids: Optional[np.ndarray] = None
+        self.list_order: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+        self.params: Dict[str, int] = {}
+
+    def build(self, kind: str, params: Dict[str, int]) -> float:
+        """Build the requested index, returning build time in seconds"""
+        self.params = params
+        if kind == "flat":
+            return 0.0
+        if kind != "ivf":
+            raise ValueError(f"Index '{kind}' is only available on the pgvector backend")
+
+        start = time.perf_counter()
+        emb = self.corpus.embeddings
+        lists = params.get("lists", 256)
+        rng = np.random.default_rng(0)
+
+        # Spherical k-means on a sample, then assign everything
+        sample = emb[rng.choice(len(emb), size=min(len(emb), lists * 40), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+        for _ in range(10):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(lists):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+
+        assign = np.concatenate([
+            np.argmax(emb[i:i + 50_000] @ centroids.T, axis=1)
+            for i in range(0, len(emb), 50_000)
+        ])
+        self.centroids = centroids
+        self.list_order = np.argsort(assign, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=lists))])
+        return time.perf_counter() - start
+
+    def vector_search(self, kind: str, query: np.ndarray, language: str, k: int) -> List[int]:
+        if kind == "flat":
+            return exact_top_k(self.corpus, query.copy(), language, k)
+
+        probes = self.params.get("probes", 8)
+        probe_lists = np.argpartition(-(self.centroids @ query), probes)[:probes]
+        candidates = np.concatenate([
+            self.list_order[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe_lists
+        ])
+        candidates = candidates[language_mask(self.corpus.languages[candidates], language)]
+        if len(candidates) == 0:
+            return []
+        scores = self.corpus.embeddings[candidates] @ query
+        top = np.argsort(-scores)[:k]
+        return candidates[top].tolist()
+
+    def keyword_search(self, query_text: str, language: str, k: int) -> List[int]:
+        keywords = self.extract_keywords(query_text)
+        allowed = language_mask(self.corpus.languages, language)
+        if keywords:
+            main_keyword = keywords[0]
+            hits = []
+            for i, content in enumerate(self.lowered):
+                if allowed[i] and main_keyword in content:
+                    hits.append(i)
+                    if len(hits) == k:
+                        return hits
+            if hits:
+                return hits
+        # Mirrors the "return recent documents" fallback
+        return np.flatnonzero(allowed)[-k:][::-1].tolist()
+
+
+# ===== pgvector backend =====
+
+class PgVectorBackend:
+    """
+    Runs the production `RAGEngine.retrieve_context` against a scratch database
+
+    The target database gets its own `documents` table sized to the benchmark
+    dimension, so never point this at a database holding real documents.
+    """
+
+    def __init__(self, database_url: str, dim: int, reset: bool):
+        from sqlalchemy import create_engine, event, text
+
+        self.text = text
+        self.dim = dim
+        self.engine = create_engine(database_url)
+        self.session_settings: List[str] = []
+
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            exists = conn.execute(text("SELECT to_regclass('documents') IS NOT NULL")).scalar()
+            if exists and not reset:
+                raise RuntimeError("`documents` already exists in the target database; pass --reset to drop it")
+
+        os.environ["DATABASE_URL"] = database_url
+        # Benchmark dimensions are indexed as plain vectors
+        os.environ["VECTOR_SEARCH_CAST"] = "vector"
+        os.environ["RETRIEVAL_MMR"] = "false"  # Measure index recall, not re-ranking
+        os.environ["EMBEDDING_PROVIDER"] = "openai"  # Matches the column defaults below; vectors are synthetic
+        from rag_engine import RAGEngine
+
+        self.rag = RAGEngine()
+        self._local = threading.local()
+        self.rag.get_embedding = self._current_embedding
+
+        @event.listens_for(self.rag.engine, "connect")
+        def _apply_settings(dbapi_conn, _record):
+            cursor = dbapi_conn.cursor()
+            for statement in self.session_settings:
+                cursor.execute(statement)
+            cursor.close()
+
+    def _current_embedding(self, _text: str) -> List[float]:
+        vector = getattr(self._local, "vector", None)
+        if vector is None:
+            raise RuntimeError("keyword mode: embedding disabled")
+        return vector
+
+    def load(self, size: int, seed: int) -> float:
+        """(Re)create `documents` and bulk load the synthetic corpus with COPY"""
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            conn.execute(self.text("DROP TABLE IF EXISTS documents"))
+            conn.execute(self.text(f"""
+                CREATE TABLE documents (
+                    id VARCHAR PRIMARY KEY,
+                    source VARCHAR NOT NULL,
+                    page INTEGER,
+                    chunk_index INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    content_ar TEXT,
+                    embedding vector({self.dim}) NOT NULL,
+                    language VARCHAR(4),
+                    embedding_provider VARCHAR(32) NOT NULL DEFAULT 'openai',
+                    embedding_version VARCHAR(64) NOT NULL DEFAULT 'text-embedding-3-large',
+                    created_at TIMESTAMP DEFAULT now(),
+                    meta_data JSONB NOT NULL DEFAULT '{{}}'
+                )
+            """))
+
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for offset, contents, languages, _topics, embeddings in iter_batches(size, self.dim, seed):
+                buffer = io.StringIO()
+                for i, (content, language, vector) in enumerate(zip(contents, languages, embeddings)):
+                    vec = "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+                    buffer.write(f"bench-{offset + i}\tbenchmark\t{offset + i}\t0\t{content}\t{vec}\t{language}\n")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY documents (id, source, page, chunk_index, content, embedding, language) FROM STDIN",
+                    buffer
+                )
+            raw.commit()
+            cursor.execute("ANALYZE documents")
+            raw.commit()
+        finally:
+            raw.close()
+        return time.perf_counter() - start
+
+    def build(self, kind: str, params: Dict[str, int]) -> float:
+        """Drop any previous ANN indexes and build the requested one per language partition"""
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            for language in BENCH_PARTITIONS:
+                conn.execute(self.text(f"DROP INDEX IF EXISTS documents_embedding_bench_{language}"))
+            # Partial indexes mirror alembic 0002, matching the per-partition retrieval SQL
+            for language in BENCH_PARTITIONS:
+                if kind == "ivf":
+                    conn.execute(self.text(
+                        f"CREATE INDEX documents_embedding_bench_{language} ON documents "
+                        f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {params.get('lists', 100)}) "
+                        f"WHERE language = '{language}'"
+                    ))
+                elif kind == "hnsw":
+                    conn.execute(self.text(
+                        f"CREATE INDEX documents_embedding_bench_{language} ON documents "
+                        f"USING hnsw (embedding vector_cosine_ops) "
+                        f"WITH (m = {params.get('m', 16)}, ef_construction = {params.get('ef_construction', 64)}) "
+                        f"WHERE language = '{language}'"
+                    ))
+            if kind == "ivf":
+                self.session_settings = [f"SET ivfflat.probes = {params.get('probes', 1)}"]
+            elif kind == "hnsw":
+                self.session_settings = [f"SET hnsw.ef_search = {params.get('ef_search', 40)}"]
+            else:
+                self.session_settings = []
+        # Settings are applied on connect, so start from a fresh pool
+        self.rag.engine.dispose()
+        return time.perf_counter() - start
+
+    def search(self, query_text: str, vector: Optional[np.ndarray], language: str, k: int) -> List[int]:
+        self._local.vector = vector.tolist() if vector is not None else None
+        rows = self.rag.retrieve_context(query=query_text, language=language, top_k=k)
+        return [int(r["id"].split("-")[1]) for r in rows]
+
+
+# ===== Runner =====
+
+def benchmark_size(args, size: int) -> List[Dict[str, Any]]:
+    """Run every mode and index setting for one corpus size"""
+    print(f"\n📦 Corpus size: {size:,} chunks (dim={args.dim})")
+
+    start = time.perf_counter()
+    corpus = generate_corpus(size, args.dim, args.seed)
+    queries = generate_queries(args.queries, args.dim, args.seed)
+    print(f"   ✓ Generated corpus in {time.perf_counter() - start:.1f}s")
+
+    truth = [exact_top_k(corpus, q_vec.copy(), lang, args.k) for _, lang, q_vec in queries]
+
+    if args.backend == "pgvector":
+        backend = PgVectorBackend(args.database_url, args.dim, args.reset)
+        print(f"   ✓ Loaded into pgvector in {backend.load(size, args.seed):.1f}s")
+    else:
+        backend = InProcessBackend(corpus)
+
+    def record(mode: str, index: str, build_s: float, latencies, results, wall) -> Dict[str, Any]:
+        recalls = [len(set(r) & set(t)) / args.k for r, t in zip(results, truth)]
+        row = {
+            "backend": args.backend,
+            "mode": mode,
+            "index": index,
+            "size": size,
+            "dim": args.dim,
+            "k": args.k,
+            "queries": args.queries,
+            "concurrency": args.concurrency,
+            "build_s": round(build_s, 3),
+            **summarize(latencies, wall, recalls),
+        }
+        print(
+            f"   {mode:<8} {index:<36} p50={row['p50_ms']:>8.2f}ms p95={row['p95_ms']:>8.2f}ms "
+            f"p99={row['p99_ms']:>8.2f}ms qps={row['qps']:>8.1f} recall@{args.k}={row['recall_at_k']:.3f}"
+        )
+        return row
+
+    rows = []
+    if "vector" in args.modes:
+        for spec in args.index:
+            kind, params = parse_index_spec(spec)
+            try:
+                build_s = backend.build(kind, params)
+            except Exception as e:
+                print(f"   ✗ Skipping {spec}: {e}")
+                continue
+
+            if args.backend == "pgvector":
+                search = lambda i: backend.search(queries[i][0], queries[i][2], queries[i][1], args.k)
+            else:
+                search = lambda i: backend.vector_search(kind, queries[i][2], queries[i][1], args.k)
+            rows.append(record("vector", spec, build_s, *run_queries(search, args.queries, args.concurrency)))
+
+    if "keyword" in args.modes:
+        if args.backend == "pgvector":
+            search = lambda i: backend.search(queries[i][0], None, queries[i][1], args.k)
+        else:
+            search = lambda i: backend.keyword_search(queries[i][0], queries[i][1], args.k)
+        rows.append(record("keyword", "scan", 0.0, *run_queries(search, args.queries, args.concurrency)))
+
+    return rows
+
+
+def compare(current: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """
+    Compare results against a saved baseline
+
+    Returns:
+        True if any matching row regressed beyond the tolerance
+    """
+    with open(baseline_path) as f:
+        baseline = {
+            (r["backend"], r["mode"], r["index"], r["size"], r["dim"], r["k"]): r
+            for r in json.load(f)["results"]
+        }
+
+    print(f"\n📊 Comparison against {baseline_path} (tolerance {tolerance:.0%})")
+    regressed = False
+    for row in current:
+        key = (row["backend"], row["mode"], row["index"], row["size"], row["dim"], row["k"])
+        base = baseline.get(key)
+        if not base:
+            continue
+        p95_delta = (row["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        recall_delta = (row["recall_at_k"] or 0.0) - (base["recall_at_k"] or 0.0)
+        bad = p95_delta > tolerance or recall_delta < -0.01
+        regressed = regressed or bad
+        marker = "✗" if bad else "✓"
+        print(
+            f"   {marker} {row['mode']:<8} {row['index']:<36} size={row['size']:<8} "
+            f"p95 {p95_delta:+.1%}  recall {recall_delta:+.4f}"
+        )
+    return regressed
+
+
+def main():
+    """Main function for CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark LegalEdge AI retrieval on synthetic corpora")
+    parser.add_argument('--backend', choices=['inprocess', 'pgvector'], default='inprocess')
+    parser.add_argument('--database-url', type=str, default=os.getenv("BENCH_DATABASE_URL"),
+                        help='Scratch database for the pgvector backend (its `documents` table is replaced)')
+    parser.add_argument('--reset', action='store_true', help='Allow replacing an existing `documents` table')
+    parser.add_argument('--sizes', type=str, default='10000,100000,1000000',
+                        help='Comma-separated corpus sizes')
+    parser.add_argument('--dim', type=int, default=256, help='Embedding dimension')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per configuration')
+    parser.add_argument('--k', type=int, default=5, help='Top-k (matches retrieve_context default)')
+    parser.add_argument('--concurrency', type=int, default=1, help='Concurrent query threads')
+    parser.add_argument('--modes', type=str, default='vector,keyword', help='Retrieval modes to run')
+    parser.add_argument('--index', action='append',
+                        help='Index setting, e.g. flat, ivf:lists=256,probes=8, hnsw:m=16,ef_search=40')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=str, default=None, help='Where to save results JSON')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed p95 regression ratio')
+
+    args = parser.parse_args()
+    args.index = args.index or ['flat', 'ivf:lists=256,probes=8']
+    args.modes = [m.strip() for m in args.modes.split(',')]
+
+    if args.backend == 'pgvector' and not args.database_url:
+        print("✗ Error: --database-url (or BENCH_DATABASE_URL) is required for the pgvector backend")
+        sys.exit(2)
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        results.extend(benchmark_size(args, size))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"retrieval-{args.backend}-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            "meta": {
+                "created_at": datetime.utcnow().isoformat(),
+                "backend": args.backend,
+                "seed": args.seed,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\n✓ Results saved to {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        print("\n✗ Regression detected")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
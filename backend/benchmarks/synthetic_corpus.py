@@ -0,0 +1,169 @@
+"""
+Synthetic corpus generator for benchmarks
+Produces deterministic legal-ish chunks and clustered embeddings
+"""
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+
+# Topics roughly mirror the sections of the Dubai tenancy guide so that
+# keyword queries hit a realistic share of the corpus.
+TOPICS_EN = [
+    ["rent", "increase", "index", "notice", "ninety", "days"],
+    ["eviction", "notice", "twelve", "months", "notary", "landlord"],
+    ["security", "deposit", "refund", "damage", "tenant", "inspection"],
+    ["maintenance", "repairs", "landlord", "obligation", "defects", "urgent"],
+    ["ejari", "registration", "contract", "tenancy", "certificate", "fees"],
+    ["dispute", "rental", "committee", "filing", "claim", "hearing"],
+    ["renewal", "lease", "term", "conditions", "expiry", "extension"],
+    ["subletting", "consent", "written", "tenant", "unit", "permission"],
+    ["service", "charges", "owners", "association", "jointly", "owned"],
+    ["cheques", "payment", "bounced", "instalments", "receipt", "arrears"],
+]
+
+TOPICS_AR = [
+    ["إيجار", "زيادة", "مؤشر", "إشعار"],
+    ["إخلاء", "إشعار", "مالك", "كاتب"],
+    ["تأمين", "استرداد", "مستأجر", "أضرار"],
+    ["صيانة", "إصلاحات", "مالك", "التزام"],
+    ["عقد", "تسجيل", "إيجاري", "رسوم"],
+    ["نزاع", "لجنة", "دعوى", "جلسة"],
+    ["تجديد", "عقد إيجار", "مدة", "شروط"],
+    ["تأجير", "موافقة", "مستأجر", "وحدة"],
+    ["رسوم", "خدمات", "ملاك", "جمعية"],
+    ["شيكات", "دفع", "أقساط", "متأخرات"],
+]
+
+FILLER_EN = [
+    "the", "parties", "shall", "in", "accordance", "with", "law", "article",
+    "dubai", "property", "agreement", "may", "be", "under", "provided", "that",
+]
+
+# Each topic is split into subtopic clusters in embedding space
+SUBTOPICS_PER_TOPIC = 64
+
+FILLER_AR = ["وفقا", "القانون", "المادة", "دبي", "العقار", "الطرفين", "يجب", "على"]
+
+
+@dataclass
+class SyntheticCorpus:
+    """A generated corpus held fully in memory"""
+    ids: List[str]
+    contents: List[str]
+    languages: np.ndarray   # dtype '<U4', values 'en' | 'ar' | 'both'
+    topics: np.ndarray      # int topic label per chunk
+    embeddings: np.ndarray  # float32, L2-normalised, shape (n, dim)
+
+
+def _topic_centres(dim: int, n_topics: int, seed: int) -> np.ndarray:
+    """
+    Unit centres for every (topic, subtopic) pair, shape (n_topics * SUBTOPICS_PER_TOPIC, dim)
+
+    Subtopics give each topic internal structure so that nearest neighbours
+    are meaningful rather than an arbitrary pick from one large cluster.
+    """
+    rng = np.random.default_rng(seed)
+    topics = _normalise(rng.standard_normal((n_topics, dim)).astype(np.float32))
+    offsets = _normalise(rng.standard_normal((n_topics, SUBTOPICS_PER_TOPIC, dim)).astype(np.float32))
+    centres = topics[:, None, :] + 0.6 * offsets
+    return _normalise(centres.reshape(-1, dim)).astype(np.float32)
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _make_text(rng: np.random.Generator, topic: int, language: str) -> str:
+    if language == 'ar':
+        words = list(rng.choice(TOPICS_AR[topic], size=6)) + list(rng.choice(FILLER_AR, size=10))
+    else:
+        words = list(rng.choice(TOPICS_EN[topic], size=8)) + list(rng.choice(FILLER_EN, size=24))
+    rng.shuffle(words)
+    return " ".join(words) + "."
+
+
+def iter_batches(
+    size: int,
+    dim: int,
+    seed: int = 42,
+    batch_size: int = 50_000,
+    noise: float = 0.35
+) -> Iterator[Tuple[int, List[str], np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Generate the corpus in batches so callers can stream it into a database
+
+    Yields:
+        (offset, contents, languages, topics, embeddings) per batch
+    """
+    n_topics = len(TOPICS_EN)
+    centres = _topic_centres(dim, n_topics, seed)
+
+    for batch_no, offset in enumerate(range(0, size, batch_size)):
+        count = min(batch_size, size - offset)
+        rng = np.random.default_rng(seed + 1 + batch_no)
+
+        clusters = rng.integers(0, len(centres), size=count)
+        topics = clusters // SUBTOPICS_PER_TOPIC
+        languages = rng.choice(np.array(['en', 'ar', 'both']), size=count, p=[0.8, 0.1, 0.1])
+        scale = noise / np.sqrt(dim)
+        vectors = centres[clusters] + scale * rng.standard_normal((count, dim)).astype(np.float32)
+        embeddings = _normalise(vectors).astype(np.float32)
+        contents = [_make_text(rng, int(t), str(l)) for t, l in zip(topics, languages)]
+
+        yield offset, contents, languages, topics, embeddings
+
+
+def generate_corpus(size: int, dim: int, seed: int = 42) -> SyntheticCorpus:
+    """Generate a corpus of `size` chunks with `dim`-dimensional embeddings"""
+    ids: List[str] = []
+    contents: List[str] = []
+    languages, topics, embeddings = [], [], []
+
+    for offset, batch_contents, batch_langs, batch_topics, batch_emb in iter_batches(size, dim, seed):
+        ids.extend(f"bench-{offset + i}" for i in range(len(batch_contents)))
+        contents.extend(batch_contents)
+        languages.append(batch_langs)
+        topics.append(batch_topics)
+        embeddings.append(batch_emb)
+
+    return SyntheticCorpus(
+        ids=ids,
+        contents=contents,
+        languages=np.concatenate(languages),
+        topics=np.concatenate(topics),
+        embeddings=np.vstack(embeddings),
+    )
+
+
+def generate_queries(
+    n_queries: int,
+    dim: int,
+    seed: int = 42,
+    noise: float = 0.5
+) -> List[Tuple[str, str, np.ndarray]]:
+    """
+    Generate benchmark queries drawn from the same topic clusters as the corpus
+
+    Returns:
+        List of (query_text, language, embedding) tuples
+    """
+    n_topics = len(TOPICS_EN)
+    centres = _topic_centres(dim, n_topics, seed)
+    rng = np.random.default_rng(seed + 10_000)
+
+    queries = []
+    for _ in range(n_queries):
+        cluster = int(rng.integers(0, len(centres)))
+        topic = cluster // SUBTOPICS_PER_TOPIC
+        language = 'ar' if rng.random() < 0.2 else 'en'
+        vocab = TOPICS_AR[topic] if language == 'ar' else TOPICS_EN[topic]
+        text = " ".join(rng.choice(vocab, size=3))
+        vector = centres[cluster] + (noise / np.sqrt(dim)) * rng.standard_normal(dim).astype(np.float32)
+        vector = (vector / np.linalg.norm(vector)).astype(np.float32)
+        queries.append((text, language, vector))
+
+    return queries
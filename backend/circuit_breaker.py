@@ -0,0 +1,137 @@
+"""
+Circuit breaker for upstream providers
+Fails fast while an upstream is down and probes it for recovery
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, TypeVar
+
+import metrics
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed → open → half-open breaker driven by a rolling failure rate
+
+    The circuit opens when, within `window_seconds`, at least
+    `minimum_calls` calls were made and the failure rate reached
+    `failure_rate_threshold`, or after `consecutive_failures` failures in
+    a row. While open every call fails immediately. After `open_seconds`
+    up to `half_open_probes` calls are let through; a successful probe
+    closes the circuit, a failed one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 10,
+        consecutive_failures: int = 5,
+        window_seconds: float = 30.0,
+        open_seconds: float = 15.0,
+        half_open_probes: int = 1,
+        is_failure: Callable[[Exception], bool] = lambda e: True
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.consecutive_failures = consecutive_failures
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.is_failure = is_failure
+
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._streak = 0
+        self._outcomes = deque()  # (timestamp, failed)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float):
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _open(self, now: float):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        metrics.increment(f"circuit.{self.name}.opened")
+        print(f"Circuit '{self.name}' opened")
+
+    def _before_call(self) -> bool:
+        """Admit or reject a call; returns True if the call is a half-open probe"""
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            if self._state == self.CLOSED:
+                return False
+            if self._state == self.HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+        metrics.increment(f"circuit.{self.name}.short_circuited")
+        raise CircuitOpenError(f"Circuit '{self.name}' is open; upstream unavailable")
+
+    def _after_call(self, probe: bool, failed: bool):
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                self._probes_in_flight -= 1
+                if failed:
+                    self._open(now)
+                else:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                    self._streak = 0
+                    print(f"Circuit '{self.name}' closed")
+                return
+
+            if self._state != self.CLOSED:
+                return
+
+            self._outcomes.append((now, failed))
+            while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                self._outcomes.popleft()
+            self._streak = self._streak + 1 if failed else 0
+
+            total = len(self._outcomes)
+            failures = sum(1 for _, f in self._outcomes if f)
+            if self._streak >= self.consecutive_failures or (
+                total >= self.minimum_calls and failures / total >= self.failure_rate_threshold
+            ):
+                self._open(now)
+
+    def raise_if_open(self):
+        """Cheap pre-check so callers skip queueing for an upstream that is down"""
+        if self.state == self.OPEN:
+            metrics.increment(f"circuit.{self.name}.short_circuited")
+            raise CircuitOpenError(f"Circuit '{self.name}' is open; upstream unavailable")
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Run `fn` through the breaker"""
+        probe = self._before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            self._after_call(probe, failed=self.is_failure(e))
+            raise
+        self._after_call(probe, failed=False)
+        return result
@@ -0,0 +1,57 @@
+"""
+Per-request deadline budget
+Set once per request; every stage (rate-limit queueing, embedding,
+retrieval, generation) sizes its own timeout from the time left
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# End-to-end budget for /api/chat and /ask (/ask/batch scales it by batch size)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+# A stage is not started with less than this left; the caller degrades instead
+MIN_STAGE_SECONDS = float(os.getenv("DEADLINE_MIN_STAGE_SECONDS", "0.25"))
+
+# time.monotonic() at which the current request's budget runs out. Context
+# variables follow asyncio tasks and run_in_threadpool calls, so the budget
+# reaches the blocking OpenAI/database calls without extra parameters.
+_expires_at: ContextVar[Optional[float]] = ContextVar("deadline_expires_at", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before a stage could start"""
+
+
+@contextmanager
+def deadline(seconds: float = REQUEST_DEADLINE_SECONDS):
+    """Run the block under a budget of `seconds`; nested budgets never extend an outer one"""
+    expires_at = time.monotonic() + seconds
+    outer = _expires_at.get()
+    token = _expires_at.set(expires_at if outer is None else min(outer, expires_at))
+    try:
+        yield
+    finally:
+        _expires_at.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget; None outside a request deadline"""
+    expires_at = _expires_at.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+def stage_timeout(cap: Optional[float], stage: str) -> Optional[float]:
+    """
+    Timeout for the next stage: the smaller of `cap` and the time left
+
+    Raises:
+        DeadlineExceeded: if less than MIN_STAGE_SECONDS remain
+    """
+    left = remaining()
+    if left is None:
+        return cap
+    if left < MIN_STAGE_SECONDS:
+        raise DeadlineExceeded(f"No time left for {stage} ({max(left, 0.0) * 1000:.0f}ms)")
+    return left if cap is None else min(cap, left)
@@ -0,0 +1,145 @@
+"""
+Embedding providers
+OpenAI for production; a local hashed n-gram embedder for offline use and tests
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+
+from models import EMBEDDING_DIM
+from openai_client import create_embedding, EMBEDDING_MODEL, PRIORITY_INTERACTIVE
+
+
+class EmbeddingProvider:
+    """
+    Turns texts into EMBEDDING_DIM-sized vectors
+
+    `name` and `version` are stored with every chunk; vectors from
+    different provider/version pairs are not comparable, so retrieval only
+    searches chunks embedded the same way as the query.
+    """
+
+    name = "base"
+    version = "0"
+
+    def embed(self, texts: List[str], priority: int = PRIORITY_INTERACTIVE) -> List[List[float]]:
+        """Embed `texts`, preserving order; raises on failure"""
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    OpenAI embeddings (text-embedding-3-large by default) through the
+    shared rate limiter and breaker
+
+    `dimensions` asks the text-embedding-3 models for shortened vectors;
+    they are zero-padded to EMBEDDING_DIM, which leaves cosine distances
+    unchanged, so the column and its indexes work for any size up to it.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = None, dimensions: Optional[int] = None):
+        if dimensions is not None and not 0 < dimensions <= EMBEDDING_DIM:
+            raise ValueError(f"dimensions must be between 1 and {EMBEDDING_DIM}")
+        self.model = model or EMBEDDING_MODEL
+        self.dimensions = dimensions
+        self.version = self.model if dimensions is None else f"{self.model}@{dimensions}"
+
+    def embed(self, texts: List[str], priority: int = PRIORITY_INTERACTIVE) -> List[List[float]]:
+        response = create_embedding(texts, priority=priority, model=self.model, dimensions=self.dimensions)
+        data = sorted(response['data'], key=lambda d: d['index'])
+        return [pad_vector(d['embedding']) for d in data]
+
+
+def pad_vector(vector: List[float], dim: int = EMBEDDING_DIM) -> List[float]:
+    """Zero-pad a shorter embedding to `dim` (cosine distance is unaffected)"""
+    return vector if len(vector) >= dim else list(vector) + [0.0] * (dim - len(vector))
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=200_000)
+def _feature_slot(feature: str, dim: int) -> int:
+    """Stable hash of a feature → signed slot (sign in the low bit); Python's hash() is salted per process"""
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return (h >> 1) % dim * 2 + (h & 1)
+
+
+class LocalHashEmbeddingProvider(EmbeddingProvider):
+    """
+    CPU-only embedder that needs no downloads or network
+
+    Words and character n-grams (within word boundaries, so it also works
+    for Arabic morphology) are hashed into a signed EMBEDDING_DIM vector,
+    log-scaled and L2-normalised. Lexical rather than semantic, but
+    deterministic across processes and a few milliseconds per chunk.
+
+    There is a single model (`version`); `dimensions` hashes into that
+    many slots instead, zero-padded to `dim` like shortened OpenAI vectors.
+    """
+
+    name = "local"
+    version = "hash-ngram-v1"
+
+    def __init__(self, model: str = None, dimensions: Optional[int] = None, dim: int = EMBEDDING_DIM, ngram_range=(3, 5)):
+        if model is not None and model != type(self).version:
+            raise ValueError(f"The local embedding provider has no model '{model}' (only {type(self).version})")
+        if dimensions is not None and not 0 < dimensions <= dim:
+            raise ValueError(f"dimensions must be between 1 and {dim}")
+        self.dim = dim
+        self.dimensions = dimensions
+        self.hash_dim = dimensions or dim
+        self.ngram_range = ngram_range
+        if dimensions is not None:
+            self.version = f"{type(self).version}@{dimensions}"
+
+    def _features(self, text: str) -> List[str]:
+        text = unicodedata.normalize("NFKC", text).casefold()
+        features = []
+        for word in _TOKEN_RE.findall(text):
+            features.append(f"w:{word}")
+            padded = f" {word} "
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        slots = np.fromiter((_feature_slot(f, self.hash_dim) for f in self._features(text)), dtype=np.int64)
+        if slots.size:
+            np.add.at(vector, slots >> 1, np.where(slots & 1, 1.0, -1.0).astype(np.float32))
+            vector = np.sign(vector) * np.log1p(np.abs(vector))
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector /= norm
+        return vector
+
+    def embed(self, texts: List[str], priority: int = PRIORITY_INTERACTIVE) -> List[List[float]]:
+        return [self._embed_one(text).tolist() for text in texts]
+
+
+PROVIDERS: Dict[str, Type[EmbeddingProvider]] = {
+    OpenAIEmbeddingProvider.name: OpenAIEmbeddingProvider,
+    LocalHashEmbeddingProvider.name: LocalHashEmbeddingProvider,
+}
+
+
+def get_embedding_provider(name: str = None, model: str = None, dimensions: Optional[int] = None) -> EmbeddingProvider:
+    """
+    Provider named by `name` or EMBEDDING_PROVIDER (default 'openai')
+
+    `model`/`dimensions` select the model and vector size (defaults: the
+    provider's model, full size); a model the provider lacks or a size
+    beyond EMBEDDING_DIM raises ValueError.
+    """
+    name = (name or os.getenv("EMBEDDING_PROVIDER", "openai")).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{name}' (expected one of: {', '.join(PROVIDERS)})")
+    return PROVIDERS[name](model=model, dimensions=dimensions)
@@ -0,0 +1,167 @@
+"""
+Extractive answering from retrieved chunks
+Picks the sentences that best cover the question and cites them, without
+an LLM call; used for confident lookups and when the LLM is unavailable
+"""
+import math
+import os
+import re
+from collections import Counter, namedtuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from keyword_index import tokenize
+
+# off: never; fallback: only when the LLM is unavailable; auto: also
+# instead of the LLM when retrieval and sentence coverage are both high
+EXTRACTIVE_MODE = os.getenv("EXTRACTIVE_MODE", "auto").lower()
+# Top retrieval similarity required to skip the LLM
+EXTRACTIVE_MIN_SCORE = float(os.getenv("EXTRACTIVE_MIN_SCORE", "0.75"))
+# Share of the question's (idf-weighted) terms the answer must contain
+EXTRACTIVE_MIN_COVERAGE = float(os.getenv("EXTRACTIVE_MIN_COVERAGE", "0.7"))
+EXTRACTIVE_MAX_SENTENCES = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", "3"))
+
+MIN_SENTENCE_CHARS = 25
+MAX_SENTENCE_CHARS = 500
+# Sentences sharing more terms than this with one already chosen are skipped
+MAX_OVERLAP = 0.6
+
+# Sentence ends: Latin and Arabic punctuation, or line breaks
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?؟;؛])\s+|\n+")
+
+DISCLAIMERS = {
+    'en': "This is general legal information only. For advice specific to your situation, consult a licensed lawyer in Dubai.",
+    'ar': "هذه معلومات قانونية عامة فقط. للحصول على مشورة خاصة بحالتك، استشر محاميًا مرخصًا في دبي.",
+}
+INTROS = {
+    'en': "From the sources:",
+    'ar': "من المصادر:",
+}
+
+ScoredSentence = namedtuple("ScoredSentence", ["text", "terms", "coverage", "score", "result"])
+ExtractiveAnswer = namedtuple("ExtractiveAnswer", ["text", "coverage", "sentences"])
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a chunk, whitespace-normalised, without fragments too short or long to quote"""
+    sentences = []
+    for part in _SENTENCE_END_RE.split(text):
+        sentence = " ".join(part.split())
+        if MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+
+def _citation(result: Dict[str, Any], language: str) -> str:
+    page = result.get('page')
+    if page is None:
+        return f"[{result['source']}]"
+    return f"[{result['source']}, {'ص' if language == 'ar' else 'p.'} {page}]"
+
+
+def score_sentences(question: str, results: List[Dict[str, Any]]) -> List[ScoredSentence]:
+    """
+    Every quotable sentence of `results`, best first
+
+    A sentence's coverage is the idf-weighted share of question terms it
+    contains (idf over all candidate sentences, so terms that appear
+    everywhere count little); the ranking score also weighs in the
+    retrieval score of its chunk.
+    """
+    return _score(set(tokenize(question)), results)[0]
+
+
+def _score(question_terms: set, results: List[Dict[str, Any]]) -> Tuple[List[ScoredSentence], Dict[str, float]]:
+    """score_sentences, plus the idf weight of each question term"""
+    if not question_terms:
+        return [], {}
+
+    candidates = []
+    for result in results:
+        for sentence in split_sentences(result['text']):
+            candidates.append((sentence, set(tokenize(sentence)), result))
+    if not candidates:
+        return [], {}
+
+    df = Counter(term for _, terms, _ in candidates for term in terms & question_terms)
+    weights = {term: math.log(1 + len(candidates) / (1 + df[term])) for term in question_terms}
+    total = sum(weights.values())
+
+    scored = []
+    for sentence, terms, result in candidates:
+        coverage = sum(weights[t] for t in terms & question_terms) / total
+        if coverage > 0:
+            score = coverage * (0.5 + 0.5 * max(0.0, min(result['score'], 1.0)))
+            scored.append(ScoredSentence(sentence, terms, coverage, score, result))
+    scored.sort(key=lambda s: s.score, reverse=True)
+    return scored, weights
+
+
+def extract_answer(
+    question: str,
+    results: List[Dict[str, Any]],
+    language: str = 'en',
+    max_sentences: int = EXTRACTIVE_MAX_SENTENCES
+) -> Optional[ExtractiveAnswer]:
+    """
+    Compose a cited answer from the best, mutually non-redundant sentences
+
+    Args:
+        question: User's question
+        results: Retrieved chunks (retrieve_context format)
+        language: 'en' or 'ar', for the surrounding text
+        max_sentences: Most sentences to quote
+
+    Returns:
+        The answer and the (idf-weighted) share of the question its
+        sentences cover together, or None if no sentence shares a term
+        with the question
+    """
+    question_terms = set(tokenize(question))
+    scored, weights = _score(question_terms, results)
+    if not scored:
+        return None
+
+    chosen: List[ScoredSentence] = []
+    for candidate in scored:
+        if any(
+            len(candidate.terms & s.terms) / max(1, len(candidate.terms | s.terms)) > MAX_OVERLAP
+            for s in chosen
+        ):
+            continue
+        chosen.append(candidate)
+        if len(chosen) >= max_sentences:
+            break
+
+    covered = set().union(*(s.terms for s in chosen)) & question_terms
+    coverage = sum(weights[t] for t in covered) / sum(weights.values())
+
+    language = language if language in DISCLAIMERS else 'en'
+    lines = [INTROS[language], ""]
+    lines.extend(f"- {s.text} {_citation(s.result, language)}" for s in chosen)
+    lines.extend(["", DISCLAIMERS[language]])
+    return ExtractiveAnswer("\n".join(lines), coverage, chosen)
+
+
+def confident_answer(question: str, results: List[Dict[str, Any]], language: str = 'en') -> Optional[ExtractiveAnswer]:
+    """
+    An extractive answer good enough to skip the LLM, or None
+
+    Requires EXTRACTIVE_MODE=auto, a top chunk at or above
+    EXTRACTIVE_MIN_SCORE and an answer covering at least
+    EXTRACTIVE_MIN_COVERAGE of the question.
+    """
+    if EXTRACTIVE_MODE != "auto" or not results:
+        return None
+    if max(r['score'] for r in results) < EXTRACTIVE_MIN_SCORE:
+        return None
+    answer = extract_answer(question, results, language)
+    if answer is None or answer.coverage < EXTRACTIVE_MIN_COVERAGE:
+        return None
+    return answer
+
+
+def fallback_answer(question: str, results: List[Dict[str, Any]], language: str = 'en') -> Optional[ExtractiveAnswer]:
+    """Best-effort extractive answer when the LLM is unavailable (unless EXTRACTIVE_MODE=off)"""
+    if EXTRACTIVE_MODE == "off" or not results:
+        return None
+    return extract_answer(question, results, language)
@@ -0,0 +1,118 @@
+"""
+Buffered writes for /feedback widget votes
+Votes are queued in memory and inserted in batches off the request path
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+import metrics
+from models import AnswerFeedback
+
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "500"))
+FEEDBACK_FLUSH_SECONDS = float(os.getenv("FEEDBACK_FLUSH_SECONDS", "2"))
+# Votes beyond this many unsaved ones are dropped (and counted) rather than
+# growing memory while the database is unavailable
+FEEDBACK_MAX_PENDING = int(os.getenv("FEEDBACK_MAX_PENDING", "50000"))
+
+
+class FeedbackBuffer:
+    """
+    In-memory queue of votes, flushed by a background thread
+
+    A flush happens every `flush_seconds` or as soon as `batch_size` votes
+    are waiting, as one multi-row INSERT per batch. Failed batches are put
+    back and retried at the next flush. Votes still queued when the process
+    is killed are lost; that trade-off is accepted for widget feedback.
+    """
+
+    def __init__(
+        self,
+        engine,
+        batch_size: int = FEEDBACK_BATCH_SIZE,
+        flush_seconds: float = FEEDBACK_FLUSH_SECONDS,
+        max_pending: int = FEEDBACK_MAX_PENDING
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="feedback-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still queued"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def add(self, question: str, answer_id: Optional[str], helpful: bool) -> bool:
+        """
+        Queue one vote
+
+        Returns:
+            False if the buffer is full and the vote was dropped
+        """
+        row = {
+            "id": str(uuid4()),
+            "question": question,
+            "answer_id": answer_id,
+            "helpful": helpful,
+            "created_at": datetime.utcnow()
+        }
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                metrics.increment("feedback.dropped")
+                return False
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+        return True
+
+    def _take(self) -> list:
+        with self._lock:
+            count = min(self.batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def flush(self) -> int:
+        """Insert everything queued so far; returns the number of votes written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take()
+                if not batch:
+                    return written
+                started = time.perf_counter()
+                try:
+                    with self.engine.begin() as conn:
+                        conn.execute(AnswerFeedback.__table__.insert(), batch)
+                except Exception as e:
+                    with self._lock:
+                        self._pending.extendleft(reversed(batch))
+                    print(f"Feedback flush failed ({len(batch)} votes requeued): {e}")
+                    return written
+                written += len(batch)
+                metrics.latency("feedback.flush").record((time.perf_counter() - started) * 1000)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
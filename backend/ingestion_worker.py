@@ -0,0 +1,313 @@
+"""
+Ingestion job queue
+/embed enqueues jobs; workers chunk, embed and store them off the request path
+
+Usage (separate worker process): python ingestion_worker.py --concurrency 2
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from uuid import uuid4, uuid5, UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+import metrics
+from models import IngestionJob
+from rag_engine import RAGEngine, split_text_chunks
+from pdf_ingest import iter_pdf_chunks
+
+load_dotenv()
+
+# A running job whose heartbeat is older than this is assumed orphaned
+# (worker crashed or was redeployed) and is claimed again
+STALE_SECONDS = float(os.getenv("INGESTION_JOB_STALE_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("INGESTION_JOB_MAX_ATTEMPTS", "3"))
+POLL_SECONDS = float(os.getenv("INGESTION_POLL_SECONDS", "1"))
+# Heartbeats run on their own timer, so a batch stuck behind the rate
+# limiter does not make a live job look orphaned
+HEARTBEAT_SECONDS = float(os.getenv("INGESTION_HEARTBEAT_SECONDS", str(STALE_SECONDS / 5)))
+
+# Timestamps are naive UTC, like every other table
+CLAIM_JOB_SQL = text("""
+    UPDATE ingestion_jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        worker = :worker,
+        started_at = COALESCE(started_at, timezone('utc', now())),
+        heartbeat_at = timezone('utc', now()),
+        error = NULL
+    WHERE id = (
+        SELECT id FROM ingestion_jobs
+        WHERE (status = 'queued'
+               OR (status = 'running' AND heartbeat_at < timezone('utc', now()) - make_interval(secs => :stale_seconds)))
+        AND attempts < :max_attempts
+        ORDER BY created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, document_id, source, text, file_path, language, meta_data, attempts
+""")
+
+ABANDON_JOBS_SQL = text("""
+    UPDATE ingestion_jobs
+    SET status = 'failed',
+        error = COALESCE(error, 'Worker stopped responding') || ' (gave up after ' || attempts || ' attempts)',
+        finished_at = timezone('utc', now())
+    WHERE status = 'running'
+    AND attempts >= :max_attempts
+    AND heartbeat_at < timezone('utc', now()) - make_interval(secs => :stale_seconds)
+""")
+
+FIRST_CHUNK_EXISTS_SQL = text("SELECT 1 FROM documents WHERE id = :id")
+
+# Claims bump `attempts`, so (worker, attempts) is a lease: writes from a
+# worker whose job was re-claimed after missed heartbeats match no row
+HEARTBEAT_SQL = text("""
+    UPDATE ingestion_jobs
+    SET heartbeat_at = timezone('utc', now())
+    WHERE id = :id AND worker = :worker AND attempts = :attempt AND status = 'running'
+""")
+
+PROGRESS_SQL = text("""
+    UPDATE ingestion_jobs
+    SET chunks_done = :done, chunks_total = :total, heartbeat_at = timezone('utc', now())
+    WHERE id = :id AND worker = :worker AND attempts = :attempt
+""")
+
+FINISH_SQL = text("""
+    UPDATE ingestion_jobs
+    SET status = :status,
+        error = :error,
+        text = CASE WHEN :status = 'succeeded' THEN NULL ELSE text END,
+        finished_at = timezone('utc', now())
+    WHERE id = :id AND worker = :worker AND attempts = :attempt
+""")
+
+RETRY_SQL = text("""
+    UPDATE ingestion_jobs
+    SET status = 'queued', error = :error, worker = NULL
+    WHERE id = :id AND worker = :worker AND attempts = :attempt
+""")
+
+
+class LeaseLost(Exception):
+    """The job was re-claimed by another worker; this one must stop writing"""
+
+
+def enqueue_job(
+    session,
+    source: str,
+    text: str = None,
+    language: str = 'en',
+    meta_data: dict = None,
+    file_path: str = None
+) -> IngestionJob:
+    """
+    Add an ingestion job for `text` or a spooled PDF at `file_path` (the caller commits)
+
+    Returns:
+        The job; for text `chunks_total` is known up front because chunking
+        is deterministic, for PDFs it grows as pages are parsed
+    """
+    job = IngestionJob(
+        id=str(uuid4()),
+        document_id=str(uuid4()),
+        status='queued',
+        source=source,
+        text=text,
+        file_path=file_path,
+        language=language,
+        meta_data=meta_data or {},
+        chunks_total=len(split_text_chunks(text)) if text else 0,
+        chunks_done=0,
+        attempts=0,
+        created_at=datetime.utcnow()
+    )
+    session.add(job)
+    return job
+
+
+class IngestionWorker:
+    """
+    Polls `ingestion_jobs` and processes up to `concurrency` jobs at once
+
+    Any number of workers (threads in the API process, or separate
+    `python ingestion_worker.py` processes) can share the queue: claims use
+    FOR UPDATE SKIP LOCKED, so each job goes to exactly one worker. Failed
+    jobs are retried up to INGESTION_JOB_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, rag_engine: RAGEngine, concurrency: int = 1, poll_seconds: float = POLL_SECONDS):
+        self.rag_engine = rag_engine
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"ingestion-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Ingestion worker {self.name} started ({self.concurrency} threads)")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self):
+        """Wake idle threads now instead of at the next poll (same-process enqueue)"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Ingestion worker: claim failed: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            self._process(job)
+
+    def _execute(self, statement, params: dict, fetch: bool = False):
+        """Run one statement in its own transaction; returns the first row if `fetch`, else the rowcount"""
+        with self.rag_engine.engine.begin() as conn:
+            result = conn.execute(statement, params)
+            return result.fetchone() if fetch else result.rowcount
+
+    def _claim(self):
+        self._execute(ABANDON_JOBS_SQL, {"max_attempts": MAX_ATTEMPTS, "stale_seconds": STALE_SECONDS})
+        return self._execute(
+            CLAIM_JOB_SQL,
+            {"worker": self.name, "max_attempts": MAX_ATTEMPTS, "stale_seconds": STALE_SECONDS},
+            fetch=True
+        )
+
+    def _lease(self, job) -> dict:
+        return {"id": job.id, "worker": self.name, "attempt": job.attempts}
+
+    def _finish(self, job, status: str, error: str = None):
+        if not self._execute(FINISH_SQL, {**self._lease(job), "status": status, "error": error}):
+            # Re-claimed meanwhile: the new owner finishes it and still needs the file
+            print(f"Ingestion job {job.id}: lease lost, not marking it {status}")
+            return
+        if job.file_path:
+            try:
+                os.remove(job.file_path)
+            except OSError:
+                pass
+
+    def _heartbeat(self, job, lost: threading.Event, done: threading.Event):
+        """Keep the job's lease alive until `done`; sets `lost` once it was re-claimed"""
+        while not done.wait(HEARTBEAT_SECONDS):
+            try:
+                if not self._execute(HEARTBEAT_SQL, self._lease(job)):
+                    lost.set()
+                    return
+            except Exception as e:
+                print(f"Ingestion job {job.id}: heartbeat failed: {e}")
+
+    def _process(self, job):
+        started = time.perf_counter()
+        lost = threading.Event()
+        done = threading.Event()
+        threading.Thread(
+            target=self._heartbeat, args=(job, lost, done), name=f"heartbeat-{job.id[:8]}", daemon=True
+        ).start()
+
+        def on_progress(chunks_done: int, total: int):
+            # Raising aborts the ingestion before its next commit
+            if lost.is_set() or not self._execute(
+                PROGRESS_SQL, {**self._lease(job), "done": chunks_done, "total": total}
+            ):
+                lost.set()
+                raise LeaseLost(f"job {job.id} was re-claimed by another worker")
+
+        try:
+            if not self._ingest(job, on_progress):
+                return
+        except LeaseLost as e:
+            print(f"Ingestion job {job.id} abandoned: {e}")
+            return
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+            if job.attempts < MAX_ATTEMPTS:
+                print(f"Ingestion job {job.id} failed (attempt {job.attempts}), requeued: {error}")
+                self._execute(RETRY_SQL, {**self._lease(job), "error": error})
+            else:
+                print(f"Ingestion job {job.id} failed permanently: {error}")
+                self._finish(job, "failed", error)
+                metrics.increment("ingestion.failed")
+            return
+        finally:
+            done.set()
+
+        self._finish(job, "succeeded")
+        metrics.increment("ingestion.succeeded")
+        metrics.latency("ingestion.job").record((time.perf_counter() - started) * 1000)
+
+    def _ingest(self, job, on_progress) -> bool:
+        """Chunk, embed and store the job; False if there was nothing left to do"""
+        if job.file_path:
+            # Pages are parsed, chunked and embedded incrementally; a retry
+            # resumes after the chunks earlier attempts committed
+            self.rag_engine.add_chunk_stream(
+                source=job.source,
+                chunks=iter_pdf_chunks(job.file_path),
+                document_id=job.document_id,
+                language=job.language,
+                meta_data=job.meta_data,
+                on_progress=on_progress
+            )
+            return True
+
+        # Chunk IDs derive from document_id: if an earlier attempt committed
+        # but died before marking the job, the chunks are already stored
+        first_chunk_id = str(uuid5(UUID(job.document_id), "0"))
+        if job.attempts > 1 and self._execute(FIRST_CHUNK_EXISTS_SQL, {"id": first_chunk_id}, fetch=True):
+            self._finish(job, "succeeded")
+            return False
+
+        self.rag_engine.add_document_chunks(
+            source=job.source,
+            text=job.text or "",
+            language=job.language,
+            document_id=job.document_id,
+            meta_data=job.meta_data,
+            on_progress=on_progress
+        )
+        return True
+
+
+def main():
+    """Run a standalone worker process"""
+    parser = argparse.ArgumentParser(description="Process queued /embed ingestion jobs")
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=int(os.getenv("INGESTION_WORKER_CONCURRENCY", "2")),
+        help='Jobs processed at once'
+    )
+    args = parser.parse_args()
+
+    worker = IngestionWorker(RAGEngine(), concurrency=args.concurrency)
+    worker.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
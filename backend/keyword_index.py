@@ -0,0 +1,295 @@
+"""
+In-process inverted index over document chunks
+Serves the keyword fallback when embeddings are unavailable
+"""
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+import metrics
+
+ENGLISH_STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'has', 'have',
+    'how', 'i', 'if', 'in', 'is', 'it', 'its', 'may', 'me', 'my', 'of', 'on', 'or', 'should', 'that',
+    'the', 'their', 'there', 'this', 'to', 'was', 'what', 'when', 'where', 'which', 'who', 'why',
+    'will', 'with', 'would', 'you', 'your'
+}
+
+ARABIC_STOP_WORDS = {
+    'في', 'من', 'على', 'إلى', 'عن', 'ما', 'ماذا', 'هل', 'هو', 'هي', 'أن', 'إن', 'كان', 'التي', 'الذي',
+    'مع', 'هذا', 'هذه', 'ذلك', 'أو', 'و', 'لا', 'كيف', 'متى', 'أين', 'لماذا', 'عند', 'قد', 'كل', 'بعد',
+    'قبل', 'أي', 'لي', 'له', 'لها', 'يمكن', 'يجب'
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+_ARABIC_DIACRITICS_RE = re.compile(r"[ً-ْـ]")  # Harakat and tatweel
+_ARABIC_LETTER_MAP = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ى': 'ي', 'ة': 'ه'})
+_ARABIC_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'ال')
+_ARABIC_SUFFIXES = ('ات', 'ون', 'ين')  # Plural endings
+
+
+def _normalize_token(token: str) -> str:
+    """Light, language-aware normalisation shared by documents and queries"""
+    if token.isascii():
+        # Plural → singular, enough to match "tenants" with "tenant"
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            return token[:-1]
+        return token
+    token = _ARABIC_DIACRITICS_RE.sub('', token).translate(_ARABIC_LETTER_MAP)
+    for prefix in _ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            token = token[len(prefix):]
+            break
+    for suffix in _ARABIC_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+_STOP_WORDS = {_normalize_token(w) for w in ENGLISH_STOP_WORDS} | {
+    _ARABIC_DIACRITICS_RE.sub('', w).translate(_ARABIC_LETTER_MAP) for w in ARABIC_STOP_WORDS
+}
+
+
+def tokenize(content: str) -> List[str]:
+    """English/Arabic text → normalised index terms without stop words"""
+    content = unicodedata.normalize("NFKC", content).casefold()
+    terms = []
+    for token in _TOKEN_RE.findall(content):
+        if token in _STOP_WORDS:
+            continue
+        term = _normalize_token(token)
+        if len(term) > 1 and term not in _STOP_WORDS:
+            terms.append(term)
+    return terms
+
+
+# Same attribute names as the retrieval SQL rows, so results format identically
+IndexedChunk = namedtuple(
+    "IndexedChunk",
+    ["id", "source", "page", "content", "content_ar", "language", "meta_data", "similarity"]
+)
+
+LOAD_DOCUMENTS_SQL = text("""
+    SELECT id, source, page, content, content_ar, language, meta_data, created_at
+    FROM documents
+    WHERE created_at >= :since
+    ORDER BY created_at
+""")
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index over `content` and `content_ar`
+
+    Built once from the database at startup, then kept current by `add()`
+    on ingestion in this process and `refresh_if_stale()` for chunks
+    ingested by other workers. Queries only touch the posting lists of
+    their terms.
+
+    created_at is stamped before the inserting transaction commits, so a
+    refresh re-reads `overlap_seconds` before the newest row it has seen
+    (skipping ids already indexed) to catch slow commits. Every
+    `rebuild_seconds` the index is rebuilt from scratch, which also drops
+    deleted chunks and picks up anything committed later than the overlap.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        refresh_seconds: float = 60.0,
+        overlap_seconds: float = 900.0,
+        rebuild_seconds: float = 3600.0
+    ):
+        self.k1 = k1
+        self.b = b
+        self.refresh_seconds = refresh_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.rebuild_seconds = rebuild_seconds
+        self.ready = False
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._chunks: Dict[str, IndexedChunk] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._watermark = datetime.min
+        self._last_refresh = 0.0
+        self._last_rebuild = 0.0
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def get(self, id: str) -> Optional[IndexedChunk]:
+        """The indexed chunk with this id, if any"""
+        return self._chunks.get(id)
+
+    def add(
+        self,
+        id: str,
+        source: str,
+        page: Optional[int],
+        content: str,
+        content_ar: Optional[str] = None,
+        language: str = 'en',
+        meta_data: Optional[dict] = None
+    ):
+        """Index one chunk (re-indexes it if the id is already present)"""
+        terms = Counter(tokenize(content))
+        if content_ar:
+            terms.update(tokenize(content_ar))
+        chunk = IndexedChunk(id, source, page, content, content_ar, language, meta_data or {}, 0.0)
+
+        with self._lock:
+            if id in self._chunks:
+                self._remove(id)
+            self._chunks[id] = chunk
+            length = sum(terms.values())
+            self._lengths[id] = length
+            self._total_length += length
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[id] = count
+
+    def _remove(self, id: str):
+        chunk = self._chunks.pop(id)
+        self._total_length -= self._lengths.pop(id)
+        terms = set(tokenize(chunk.content))
+        if chunk.content_ar:
+            terms.update(tokenize(chunk.content_ar))
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def load(self, session_factory: Callable, full: bool = False) -> int:
+        """
+        Index chunks created since the last load (minus the overlap window)
+
+        The first call, or `full=True`, rebuilds the index from every row
+        and swaps it in, dropping chunks no longer in the database.
+
+        Returns:
+            Number of chunks indexed by this call
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            full = full or not self.ready
+            target = KeywordIndex(self.k1, self.b) if full else self
+            since = datetime.min if full else max(datetime.min + self.overlap, self._watermark) - self.overlap
+            watermark = self._watermark
+            session = session_factory()
+            try:
+                rows = session.execute(LOAD_DOCUMENTS_SQL, {"since": since}).yield_per(1000)
+                count = 0
+                for row in rows:
+                    if row.created_at and row.created_at > watermark:
+                        watermark = row.created_at
+                    if not full and row.id in self._chunks:
+                        continue
+                    target.add(row.id, row.source, row.page, row.content, row.content_ar, row.language, row.meta_data)
+                    count += 1
+            finally:
+                session.close()
+
+            if full:
+                # Chunks add()ed meanwhile are recent enough for the next overlap refresh
+                with self._lock:
+                    self._postings = target._postings
+                    self._chunks = target._chunks
+                    self._lengths = target._lengths
+                    self._total_length = target._total_length
+                self._last_rebuild = time.monotonic()
+            self._watermark = watermark
+            self._last_refresh = time.monotonic()
+            if not self.ready:
+                self.ready = True
+                print(f"Keyword index built: {len(self)} chunks in {time.perf_counter() - started:.2f}s")
+            return count
+
+    def refresh_if_stale(self, session_factory: Callable):
+        """
+        Pick up chunks ingested by other workers, at most once per
+        `refresh_seconds`; rebuild once `rebuild_seconds` have passed
+        """
+        now = time.monotonic()
+        if not self.ready or now - self._last_refresh < self.refresh_seconds:
+            return
+        if self._refresh_lock.locked():
+            return  # Another thread is already refreshing
+        try:
+            self.load(session_factory, full=now - self._last_rebuild >= self.rebuild_seconds)
+        except Exception as e:
+            print(f"Keyword index refresh failed: {e}")
+
+    def search(
+        self,
+        query: str,
+        language: str = 'en',
+        top_k: int = 5,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[IndexedChunk]:
+        """
+        Top-k chunks by BM25 over the query terms
+
+        Args:
+            query: User's question
+            language: Chunks in this language or 'both' are eligible
+            top_k: Number of results to return
+            filters: Metadata values every chunk must match (None values ignored)
+
+        Returns:
+            IndexedChunk rows, best first; `similarity` is the BM25 score
+            scaled to at most 0.7, so keyword hits never outrank vector hits
+        """
+        started = time.perf_counter()
+        try:
+            return self._search(query, language, top_k, filters)
+        finally:
+            metrics.latency("keyword_index.search").record((time.perf_counter() - started) * 1000)
+
+    def _search(self, query, language, top_k, filters) -> List[IndexedChunk]:
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        terms = set(tokenize(query))
+        scores: Dict[str, float] = {}
+
+        with self._lock:
+            n = len(self._chunks)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            def eligible(doc_id: str) -> bool:
+                chunk = self._chunks[doc_id]
+                return (chunk.language in (language, 'both')
+                        and all(chunk.meta_data.get(k) == v for k, v in filters.items()))
+
+            best = heapq.nlargest(
+                top_k,
+                ((score, doc_id) for doc_id, score in scores.items() if eligible(doc_id)),
+            )
+            if not best:
+                return []
+            top_score = best[0][0]
+            return [
+                self._chunks[doc_id]._replace(similarity=0.7 * score / top_score)
+                for score, doc_id in best
+            ]
@@ -3,28 +3,98 @@ LegalEdge AI - Backend API
 Dubai Real Estate Legal Chatbot with RAG
 """
 import os
+import asyncio
+import base64
+import math
+import tempfile
+import threading
+import time
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Literal
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+import orjson
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 import openai
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from database import get_db, init_db
-from models import Conversation, Message, Feedback, Citation
+import database
+from database import get_db, init_db, SessionLocal
+from models import Conversation, Message, Feedback, IngestionJob
+from models import Citation as CitationRecord
 from rag_engine import RAGEngine
+from openai_client import create_chat_completion, circuit_states, is_upstream_unavailable
+from rate_limiter import PRIORITY_INTERACTIVE, PRIORITY_BULK
 from language_detector import detect_language, translate_if_needed
+import metrics
+import partitions
+from single_flight import SingleFlight, normalize_question
+from ingestion_worker import IngestionWorker, enqueue_job
+from feedback_buffer import FeedbackBuffer
+from prompts import get_prompt
+from extractive import confident_answer, fallback_answer
+from deadline import deadline, REQUEST_DEADLINE_SECONDS
 
 # Initialize FastAPI app
 app = FastAPI(
     title="LegalEdge AI API",
     description="Dubai Real Estate Legal Chatbot",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# PDF uploads are spooled here until their ingestion job finishes. Must be
+# shared storage if ingestion workers run on other machines.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "legaledge-uploads"))
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+UPLOAD_COPY_BUFFER = 1024 * 1024
+# Allowance for the other form fields and multipart boundaries
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+UPLOAD_PATHS = ("/embed/pdf",)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized uploads from their Content-Length, before Starlette
+    spools the multipart body to disk
+
+    Requests without a Content-Length (chunked) get 411. The server
+    enforces the declared length, so it bounds what is read; spool_upload
+    still checks the exact file size.
+    """
+    
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in UPLOAD_PATHS:
+            length = dict(scope["headers"]).get(b"content-length")
+            if length is None:
+                response = JSONResponse(status_code=411, content={"detail": "Content-Length required"})
+                return await response(scope, receive, send)
+            if not length.isdigit() or int(length) > self.max_bytes:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"PDF exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"}
+                )
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+
+# Compress large responses (conversation exports, batch answers); small
+# ones are not worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")))
+
+# Inside CORS, so browsers can read the 413
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -34,12 +104,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG engine
-rag_engine = RAGEngine()
+# RAG engine, created on first use and sharing database.engine's pool
+_rag_engine: Optional[RAGEngine] = None
+_rag_engine_lock = threading.Lock()
+
+
+def get_rag_engine() -> RAGEngine:
+    global _rag_engine
+    if _rag_engine is None:
+        with _rag_engine_lock:
+            if _rag_engine is None:
+                _rag_engine = RAGEngine(engine=database.engine)
+    return _rag_engine
+
+
+# In-process ingestion threads; set INGESTION_IN_PROCESS_WORKERS=0 when
+# running `python ingestion_worker.py` as a separate process instead
+INGESTION_IN_PROCESS_WORKERS = int(os.getenv("INGESTION_IN_PROCESS_WORKERS", "1"))
+ingestion_worker: Optional[IngestionWorker] = None
+
+# /feedback votes, written in batches by a background thread
+feedback_buffer = FeedbackBuffer(database.engine)
+
+# Warm-up progress reported by /ready
+readiness: Dict[str, Any] = {
+    "warmed_up": False,
+    "database": "pending",
+    "schema_revision": None,
+    "keyword_index": "pending"
+}
+
+# Coalesce identical concurrent work (per worker process)
+retrieval_flight = SingleFlight("retrieval")
+generation_flight = SingleFlight("generation")
+ask_flight = SingleFlight("ask")
 
 # OpenAI configuration
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Concurrent generations per /ask/batch request
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))
+
 
 # ===== Pydantic Models =====
 
@@ -85,6 +190,17 @@ class AskRequest(BaseModel):
     question: str = Field(..., min_length=1, max_length=2000)
     language: Optional[Literal["ar", "en"]] = None
     jurisdictionCode: Optional[str] = "DXB"
+    topic: Optional[str] = None
+    version_date: Optional[str] = None
+
+    def metadata_filters(self) -> Dict[str, str]:
+        """Document metadata every retrieved chunk must match"""
+        filters = {
+            "jurisdictionCode": self.jurisdictionCode or "DXB",
+            "topic": self.topic,
+            "version_date": self.version_date
+        }
+        return {k: v for k, v in filters.items() if v is not None}
 
 
 class Citation(BaseModel):
@@ -102,6 +218,14 @@ class AskResponse(BaseModel):
     jurisdiction: str = "DXB"
 
 
+class AskBatchRequest(BaseModel):
+    questions: List[AskRequest] = Field(..., min_length=1, max_length=500)
+
+
+class AskBatchResponse(BaseModel):
+    results: List[AskResponse]
+
+
 class EmbedDocument(BaseModel):
     title: str
     source_url: Optional[str] = None
@@ -118,7 +242,22 @@ class EmbedRequest(BaseModel):
 
 class EmbedResponse(BaseModel):
     documentId: str
-    chunks: int
+    chunks: int  # Chunks that will be stored once the job completes
+    jobId: str
+    status: str
+
+
+class EmbedJobResponse(BaseModel):
+    jobId: str
+    documentId: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    chunksTotal: int
+    chunksDone: int
+    attempts: int
+    error: Optional[str] = None
+    createdAt: Optional[str] = None
+    startedAt: Optional[str] = None
+    finishedAt: Optional[str] = None
 
 
 class FeedbackNewRequest(BaseModel):
@@ -131,61 +270,73 @@ class FeedbackNewResponse(BaseModel):
     ok: bool = True
 
 
-# ===== System Prompts =====
-
-SYSTEM_PROMPT_EN = """You are LegalEdge AI, a specialized legal assistant for Dubai real estate and tenancy law.
-
-Your role:
-1. Provide accurate information based ONLY on UAE/Dubai real estate and tenancy laws
-2. Always cite specific laws, articles, or regulations
-3. Explain complex legal concepts in simple terms
-4. Be bilingual (English and Arabic)
-
-CRITICAL RULES:
-- ONLY answer questions about Dubai real estate, tenancy, and property law
-- If asked about other legal areas or jurisdictions, politely decline
-- Always include relevant citations from official sources
-- If you're not confident (confidence < 0.7), suggest consulting a licensed lawyer
-- Never provide specific legal advice - only general legal information
-- Always include appropriate disclaimers
-
-DISCLAIMER: This is general legal information only. For advice specific to your situation, consult a licensed lawyer in Dubai.
-
-Context from knowledge base:
-{context}
-
-Based on this context, provide accurate, cited information."""
-
-SYSTEM_PROMPT_AR = """أنت LegalEdge AI، مساعد قانوني متخصص في قوانين العقارات والإيجارات في دبي.
-
-دورك:
-1. تقديم معلومات دقيقة بناءً فقط على قوانين العقارات والإيجارات في الإمارات/دبي
-2. الاستشهاد دائمًا بالقوانين أو المواد أو اللوائح المحددة
-3. شرح المفاهيم القانونية المعقدة بعبارات بسيطة
-4. التحدث باللغتين (الإنجليزية والعربية)
-
-قواعد حاسمة:
-- أجب فقط على الأسئلة المتعلقة بالعقارات والإيجارات والملكية في دبي
-- إذا سُئلت عن مجالات قانونية أخرى أو ولايات قضائية أخرى، ارفض بأدب
-- قم دائمًا بتضمين الاستشهادات ذات الصلة من المصادر الرسمية
-- إذا لم تكن واثقًا (الثقة < 0.7)، اقترح استشارة محامٍ مرخص
-- لا تقدم أبدًا نصيحة قانونية محددة - معلومات قانونية عامة فقط
-- قم دائمًا بتضمين إخلاء المسؤولية المناسب
-
-إخلاء المسؤولية: هذه معلومات قانونية عامة فقط. للحصول على مشورة خاصة بحالتك، استشر محاميًا مرخصًا في دبي.
-
-السياق من قاعدة المعرفة:
-{context}
-
-بناءً على هذا السياق، قدم معلومات دقيقة مع الاستشهادات."""
+# ===== API Endpoints =====
 
+def warm_up():
+    """
+    Pre-connect the pool and preload caches, recording progress for /ready
+    
+    Runs in a background thread so the server accepts connections
+    immediately; retries the database until it is reachable.
+    """
+    started = time.perf_counter()
+    retry_seconds = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+    while True:
+        try:
+            database.warm_pool(int(os.getenv("DB_WARM_CONNECTIONS", "5")))
+            readiness["schema_revision"] = database.schema_revision()
+            readiness["database"] = "ok"
+            break
+        except Exception as e:
+            readiness["database"] = f"unavailable: {e.__class__.__name__}"
+            print(f"Warm-up: database not ready ({e}); retrying in {retry_seconds}s")
+            time.sleep(retry_seconds)
+    
+    if partitions.MAINTENANCE_INTERVAL_SECONDS > 0:
+        threading.Thread(
+            target=partitions.maintenance_loop,
+            args=(database.engine,),
+            name="partition-maintenance",
+            daemon=True
+        ).start()
+    
+    engine = get_rag_engine()
+    if engine.keyword_index is None:
+        readiness["keyword_index"] = "disabled"
+    else:
+        try:
+            engine.build_keyword_index()
+            readiness["keyword_index"] = "ok"
+        except Exception as e:
+            # Not fatal: the keyword fallback uses SQL until the index exists
+            readiness["keyword_index"] = f"failed: {e.__class__.__name__}"
+            print(f"Warm-up: keyword index build failed: {e}")
+    
+    readiness["warmed_up"] = True
+    print(f"Warm-up complete in {time.perf_counter() - started:.2f}s")
 
-# ===== API Endpoints =====
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
-    init_db()
+    """Start background warm-up; schema is managed by alembic"""
+    if os.getenv("AUTO_CREATE_SCHEMA", "false").lower() in ("1", "true", "yes"):
+        init_db()  # Local development only
+    loop = asyncio.get_running_loop()
+    loop.create_task(metrics.monitor_event_loop_lag())
+    # Daemon thread rather than the default executor, so a retrying warm-up never blocks shutdown
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    
+    global ingestion_worker
+    if INGESTION_IN_PROCESS_WORKERS > 0:
+        ingestion_worker = IngestionWorker(get_rag_engine(), concurrency=INGESTION_IN_PROCESS_WORKERS)
+        ingestion_worker.start()
+    feedback_buffer.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Write buffered feedback before the process exits"""
+    feedback_buffer.stop()
 
 
 @app.get("/health")
@@ -198,71 +349,176 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once warm-up finished and the database answers,
+    503 otherwise. /health stays a pure liveness check.
+    """
+    checks = dict(readiness)
+    if checks["warmed_up"]:
+        try:
+            await asyncio.wait_for(run_in_threadpool(database.check_db), timeout=2)
+        except Exception as e:
+            checks["database"] = f"unavailable: {e.__class__.__name__}"
+    checks["circuits"] = circuit_states()
+    
+    ready = checks["warmed_up"] and checks["database"] == "ok"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", **checks}
+    )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """In-process latency and counter metrics for this worker"""
+    result = {
+        "pid": os.getpid(),
+        "circuits": circuit_states(),
+        **metrics.snapshot()
+    }
+    # Overlap@k of sampled retrievals against an in-flight embedding migration
+    if _rag_engine is not None and _rag_engine.embedding_migration is not None and _rag_engine.shadow_comparison:
+        result["embedding_shadow"] = {
+            "migration": _rag_engine.embedding_migration.id,
+            **_rag_engine.shadow_comparison.snapshot()
+        }
+    return result
+
+
+def get_conversation_row(db: Session, conversation_id: str) -> Optional[Conversation]:
+    """Fetch a conversation on the request's session"""
+    return db.query(Conversation).filter(
+        Conversation.id == conversation_id
+    ).first()
+
+
+# Messages never predate their conversation; the lower bound lets the
+# planner skip month partitions older than the conversation
+CONVERSATION_START_SQL = "COALESCE((SELECT created_at FROM conversations WHERE id = :conversation_id), '-infinity')"
+
+HISTORY_MESSAGES = 10
+
+# Most recent turns, newest first (reversed by the caller)
+HISTORY_SQL = text(f"""
+    SELECT content, is_user
+    FROM messages
+    WHERE conversation_id = :conversation_id
+    AND created_at >= {CONVERSATION_START_SQL}
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+""")
+
+
+def load_history(conversation_id: str) -> List[Dict[str, str]]:
+    """
+    Load the latest conversation turns as OpenAI messages, oldest first
+    
+    Uses its own session so it can run concurrently with queries on the
+    request's session.
+    """
+    session = SessionLocal()
+    try:
+        rows = session.execute(HISTORY_SQL, {
+            "conversation_id": conversation_id,
+            "limit": HISTORY_MESSAGES
+        }).fetchall()
+        return [
+            {"role": "user" if row.is_user else "assistant", "content": row.content}
+            for row in reversed(rows)
+        ]
+    finally:
+        session.close()
+
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest, db: Session = Depends(get_db)):
     """
     Main chat endpoint with RAG
+    
+    Runs under REQUEST_DEADLINE_SECONDS: embedding, retrieval and generation
+    each get the time left, and an exhausted budget degrades to the
+    fallback answer instead of holding the worker.
     """
+    with deadline(REQUEST_DEADLINE_SECONDS):
+        return await answer_chat(request, db)
+
+
+async def answer_chat(request: ChatRequest, db: Session) -> ChatResponse:
     try:
         # Detect language if not provided
         language = request.language or detect_language(request.message)
         
-        # Get or create conversation
+        # Conversation lookup, history load and embedding + retrieval are
+        # independent, so run them concurrently and join before the prompt
         if request.conversation_id:
-            conversation = db.query(Conversation).filter(
-                Conversation.id == request.conversation_id
-            ).first()
+            conversation, history, rag_results = await asyncio.gather(
+                run_in_threadpool(get_conversation_row, db, request.conversation_id),
+                run_in_threadpool(load_history, request.conversation_id),
+                retrieve_shared(request.message, language, top_k=5)
+            )
             if not conversation:
                 raise HTTPException(status_code=404, detail="Conversation not found")
         else:
+            # New conversation: there is no row to look up and no history to
+            # load, so retrieval is the only stage and nothing runs beside it.
+            # The row is committed together with the messages below instead
+            # of in a round trip of its own.
             conversation = Conversation(
                 id=str(uuid4()),
                 language=language,
                 created_at=datetime.utcnow()
             )
             db.add(conversation)
-            db.commit()
-        
-        # Retrieve relevant context using RAG
-        rag_results = rag_engine.retrieve_context(
-            query=request.message,
-            language=language,
-            top_k=5
-        )
+            history = []
+            rag_results = await retrieve_shared(request.message, language, top_k=5)
         
         # Build context string
         context = "\n\n".join([
             f"[{r['source']}] {r['text']}" for r in rag_results
         ])
         
-        # Select system prompt based on language
-        system_prompt = SYSTEM_PROMPT_AR if language == 'ar' else SYSTEM_PROMPT_EN
-        system_prompt = system_prompt.format(context=context)
-        
-        # Get conversation history
-        history = db.query(Message).filter(
-            Message.conversation_id == conversation.id
-        ).order_by(Message.created_at).limit(10).all()
+        # Build messages for OpenAI: static prompt, history, context, question
+        messages = get_prompt(language).build(request.message, context, history)
         
-        # Build messages for OpenAI
-        messages = [{"role": "system", "content": system_prompt}]
-        for msg in history:
-            messages.append({"role": "user" if msg.is_user else "assistant", "content": msg.content})
-        messages.append({"role": "user", "content": request.message})
+        # Confident lookups are answered extractively, skipping the LLM.
+        # Follow-ups go to the LLM, which can resolve references to history.
+        extractive = None if history else confident_answer(request.message, rag_results, language)
         
-        # Call OpenAI API with intelligent fallback for testing phase
+        # Call OpenAI API with intelligent fallback for testing phase.
+        # Rate limits are queued and retried first; the fallback only
+        # applies once retries are exhausted.
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.3,  # Lower temperature for more consistent legal info
-                max_tokens=1000
-            )
-            assistant_response = response.choices[0].message.content
+            if extractive:
+                assistant_response = extractive.text
+                metrics.increment("answers.extractive")
+            else:
+                generate = lambda: run_in_threadpool(
+                    create_chat_completion,
+                    messages,
+                    temperature=0.3,  # Lower temperature for more consistent legal info
+                    max_tokens=1000
+                )
+                if history:
+                    response = await generate()
+                else:
+                    # Without history the prompt depends only on the question,
+                    # so identical first questions can share one generation
+                    response = await generation_flight.do(
+                        (normalize_question(request.message), language),
+                        generate
+                    )
+                assistant_response = response.choices[0].message.content
         except Exception as e:
-            if "quota" in str(e).lower() or "billing" in str(e).lower() or "rate" in str(e).lower():
+            if is_upstream_unavailable(e):
+                # Outage fallback: answer extractively from the retrieved chunks
+                extractive = fallback_answer(request.message, rag_results, language)
+                if extractive:
+                    assistant_response = extractive.text
+                    metrics.increment("answers.extractive_fallback")
                 # TESTING MODE: Provide intelligent responses from RAG context without AI
-                if context:
+                elif context:
                     # Extract most relevant information from RAG results
                     top_results = "\n\n".join([
                         f"📄 **{r['source']}** (Page {r.get('page', 'N/A')})\n{r['text'][:400]}..."
@@ -328,7 +584,7 @@ Sorry, I couldn't find relevant information in our database about this question.
 
 ⚠️ **Note**: This is testing mode. Once you add OpenAI billing, the system will be able to answer a wider range of questions."""
             else:
-                raise ed 
+                raise e
         
         # Calculate confidence based on RAG results
         avg_score = sum(r['score'] for r in rag_results) / len(rag_results) if rag_results else 0.5
@@ -365,13 +621,17 @@ Sorry, I couldn't find relevant information in our database about this question.
         # Save citations
         citations_response = []
         for result in rag_results[:3]:  # Top 3 citations
-            citation = Citation(
+            # Reference the chunk instead of copying its text; the excerpt is resolved on read
+            citation = CitationRecord(
                 id=str(uuid4()),
                 message_id=assistant_msg.id,
                 source=result['source'],
                 page=result.get('page'),
-                excerpt=result['text'][:300],
-                relevance_score=result['score']
+                document_id=result['id'],
+                excerpt_start=0,
+                excerpt_end=min(len(result['text']), CITATION_EXCERPT_CHARS),
+                relevance_score=result['score'],
+                created_at=assistant_msg.created_at  # Same month partition as the message
             )
             db.add(citation)
             citations_response.append(CitationResponse(
@@ -381,7 +641,7 @@ Sorry, I couldn't find relevant information in our database about this question.
                 relevance_score=result['score']
             ))
         
-        db.commit()
+        await run_in_threadpool(db.commit)
         
         return ChatResponse(
             response=assistant_response,
@@ -393,6 +653,9 @@ Sorry, I couldn't find relevant information in our database about this question.
             needs_lawyer=needs_lawyer
         )
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
@@ -423,6 +686,14 @@ async def submit_feedback(feedback: FeedbackRequest, db: Session = Depends(get_d
         raise HTTPException(status_code=500, detail=f"Error submitting feedback: {str(e)}")
 
 
+# Widget votes count as 5 (helpful) or 1, as they did before they got their own table
+RATING_TOTALS_SQL = text("""
+    SELECT COALESCE(sum(rating), 0) AS total, count(*) AS votes FROM feedbacks
+    UNION ALL
+    SELECT COALESCE(sum(CASE WHEN helpful THEN 5 ELSE 1 END), 0), count(*) FROM answer_feedback
+""")
+
+
 @app.get("/api/analytics", response_model=AnalyticsResponse)
 async def get_analytics(db: Session = Depends(get_db)):
     """Get basic analytics (for admin dashboard)"""
@@ -430,9 +701,10 @@ async def get_analytics(db: Session = Depends(get_db)):
         total_conversations = db.query(Conversation).count()
         total_messages = db.query(Message).count()
         
-        # Average rating
-        feedbacks = db.query(Feedback).all()
-        avg_rating = sum(f.rating for f in feedbacks) / len(feedbacks) if feedbacks else 0.0
+        # Average rating over /api/feedback ratings and /feedback widget votes
+        ratings = db.execute(RATING_TOTALS_SQL).fetchall()
+        rated = sum(row.votes for row in ratings)
+        avg_rating = sum(row.total for row in ratings) / rated if rated else 0.0
         
         # Language breakdown
         lang_en = db.query(Conversation).filter(Conversation.language == 'en').count()
@@ -449,169 +721,452 @@ async def get_analytics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error fetching analytics: {str(e)}")
 
 
+# Keyset pagination over (created_at, id), served by ix_messages_conversation_created_id
+MESSAGE_PAGE_SQL = text(f"""
+    SELECT id, content, is_user, language, confidence, created_at
+    FROM messages
+    WHERE conversation_id = :conversation_id
+    AND created_at >= {CONVERSATION_START_SQL}
+    AND (CAST(:after_created_at AS timestamp) IS NULL
+         OR (created_at, id) > (CAST(:after_created_at AS timestamp), :after_id))
+    ORDER BY created_at, id
+    LIMIT :limit
+""")
+
+EXPORT_PAGE_SIZE = 500
+
+# Characters of the cited chunk shown as the excerpt
+CITATION_EXCERPT_CHARS = 300
+
+# Citations are written in the same month partition as their message, so
+# the page's first timestamp bounds the scan
+CITATIONS_SQL = text("""
+    SELECT message_id, source, page, document_id, excerpt_start, excerpt_end, excerpt, relevance_score
+    FROM citations
+    WHERE message_id = ANY(CAST(:message_ids AS text[]))
+    AND created_at >= :since
+    ORDER BY relevance_score DESC
+""")
+
+
+def encode_cursor(created_at: datetime, message_id: str) -> str:
+    """Opaque cursor for the message after which the next page starts"""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{message_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), message_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def fetch_message_page(conversation_id: str, after=None, limit: int = EXPORT_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """
+    One page of a conversation's messages, oldest first
+    
+    Uses its own session so streaming exports don't hold the request's.
+    """
+    after_created_at, after_id = after or (None, None)
+    session = SessionLocal()
+    try:
+        rows = session.execute(MESSAGE_PAGE_SQL, {
+            "conversation_id": conversation_id,
+            "after_created_at": after_created_at,
+            "after_id": after_id,
+            "limit": limit
+        }).fetchall()
+        answers = [row for row in rows if not row.is_user]
+        citations = load_citations(session, answers) if answers else {}
+    finally:
+        session.close()
+    return [
+        {
+            "id": row.id,
+            "content": row.content,
+            "is_user": row.is_user,
+            "confidence": row.confidence,
+            "created_at": row.created_at,
+            **({} if row.is_user else {"citations": citations.get(row.id, [])})
+        }
+        for row in rows
+    ]
+
+
+def load_citations(session, messages) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Citations per message id, with excerpts resolved from the cited chunks
+    
+    Chunk texts come from RAGEngine.get_chunk_texts (in-memory index/LRU
+    cache, one query for misses). Citations stored before chunk references
+    carry their own excerpt; ones whose chunk was deleted get an empty one.
+    """
+    languages = {m.id: m.language for m in messages}
+    rows = session.execute(CITATIONS_SQL, {
+        "message_ids": list(languages),
+        "since": min(m.created_at for m in messages)
+    }).fetchall()
+    
+    texts: Dict[str, Dict[str, str]] = {}
+    for language in set(languages.values()):
+        ids = [r.document_id for r in rows if r.document_id and languages[r.message_id] == language]
+        texts[language] = get_rag_engine().get_chunk_texts(ids, language) if ids else {}
+    
+    citations: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        if r.excerpt is not None:
+            excerpt = r.excerpt
+        else:
+            excerpt = texts[languages[r.message_id]].get(r.document_id, "")[r.excerpt_start:r.excerpt_end]
+        citations.setdefault(r.message_id, []).append({
+            "source": r.source,
+            "page": r.page,
+            "excerpt": excerpt,
+            "relevance_score": r.relevance_score
+        })
+    return citations
+
+
+def serialize_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**msg, "created_at": msg["created_at"].isoformat() if msg["created_at"] else None}
+
+
 @app.get("/api/conversations/{conversation_id}")
-async def get_conversation(conversation_id: str, db: Session = Depends(get_db)):
-    """Get conversation history"""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id
-    ).first()
+async def get_conversation(
+    conversation_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get conversation history
+    
+    Without `limit` every message is returned (original behaviour). With
+    `limit`, one page is returned along with `next_cursor`; pass it back
+    as `cursor` for the next page. For full exports use /export.
+    """
+    conversation = await run_in_threadpool(db.get, Conversation, conversation_id)
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at).all()
+    response = {
+        "conversation_id": conversation.id,
+        "language": conversation.language,
+        "created_at": conversation.created_at.isoformat()
+    }
+    
+    if limit is None:
+        messages = []
+        after = None
+        while True:
+            page = await run_in_threadpool(fetch_message_page, conversation_id, after)
+            messages.extend(serialize_message(m) for m in page)
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+            after = (page[-1]["created_at"], page[-1]["id"])
+        response["messages"] = messages
+        return response
     
-    return {
+    after = decode_cursor(cursor) if cursor else None
+    page = await run_in_threadpool(fetch_message_page, conversation_id, after, limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+    response["messages"] = [serialize_message(m) for m in page]
+    response["next_cursor"] = encode_cursor(page[-1]["created_at"], page[-1]["id"]) if has_more else None
+    return response
+
+
+@app.get("/api/conversations/{conversation_id}/export")
+async def export_conversation(conversation_id: str, db: Session = Depends(get_db)):
+    """
+    Stream a conversation as NDJSON: a conversation line, then one line per message
+    
+    Messages are read in keyset pages of EXPORT_PAGE_SIZE, so memory stays
+    flat however long the conversation is, and each page is fetched in the
+    threadpool so the event loop is never blocked.
+    """
+    conversation = await run_in_threadpool(db.get, Conversation, conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    header = {
+        "type": "conversation",
         "conversation_id": conversation.id,
         "language": conversation.language,
-        "created_at": conversation.created_at.isoformat(),
-        "messages": [
-            {
-                "id": msg.id,
-                "content": msg.content,
-                "is_user": msg.is_user,
-                "confidence": msg.confidence,
-                "created_at": msg.created_at.isoformat()
-            }
-            for msg in messages
-        ]
+        "created_at": conversation.created_at.isoformat()
     }
+    
+    async def lines():
+        yield orjson.dumps(header) + b"\n"
+        after = None
+        while True:
+            page = await run_in_threadpool(fetch_message_page, conversation_id, after)
+            if page:
+                yield b"".join(
+                    orjson.dumps({"type": "message", **serialize_message(m)}) + b"\n" for m in page
+                )
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+            after = (page[-1]["created_at"], page[-1]["id"])
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="conversation-{conversation_id}.ndjson"'}
+    )
 
 
 # ===== New API Contract Endpoints =====
 
-@app.post("/ask", response_model=AskResponse)
-async def ask_question(request: AskRequest, db: Session = Depends(get_db)):
+async def retrieve_shared(
+    query: str,
+    language: str,
+    top_k: int = 5,
+    filters: Optional[Dict[str, str]] = None
+) -> List[Dict[str, Any]]:
+    """retrieve_context, coalesced across concurrent identical queries"""
+    key = (normalize_question(query), language, top_k, tuple(sorted((filters or {}).items())))
+    return await retrieval_flight.do(
+        key,
+        lambda: run_in_threadpool(
+            get_rag_engine().retrieve_context, query=query, language=language, top_k=top_k, filters=filters
+        )
+    )
+
+
+async def answer_question(
+    question: str,
+    language: str,
+    jurisdiction: str,
+    filters: Optional[Dict[str, str]] = None
+) -> AskResponse:
     """
-    Main question endpoint with authoritative RAG flow
+    Retrieval + generation for /ask (steps 2-6 of the RAG flow)
+    """
+    # 2. Embed user query → retrieve top-K (K=5) from document_chunks,
+    #    filtered by jurisdiction/topic/version inside the vector query
+    rag_results = await retrieve_shared(question, language, top_k=5, filters=filters)
+    return await generate_answer(question, language, jurisdiction, rag_results)
+
+
+# Mean cosine similarity of the (up to) three context chunks for /ask
+# confidence. Keyword fallback scores are relative to the best hit (scaled
+# to 0.7), not similarities, so those answers are at most "Medium".
+ASK_HIGH_CONFIDENCE_SCORE = float(os.getenv("ASK_HIGH_CONFIDENCE_SCORE", "0.55"))
+ASK_LOW_CONFIDENCE_SCORE = float(os.getenv("ASK_LOW_CONFIDENCE_SCORE", "0.3"))
+
+
+def retrieval_confidence(context_chunks: List[Dict[str, Any]], slots: int = 3) -> str:
     """
+    High/Medium/Low from the context chunks' retrieval scores
+
+    Missing chunks count as zero, so one strong chunk alone is not High.
+    Keyword matches (see RAGEngine._format_results) cap it at Medium.
+    """
+    strength = sum(max(0.0, min(r['score'], 1.0)) for r in context_chunks[:slots]) / slots
+    keyword_only = any(r.get('match') == "keyword" for r in context_chunks[:slots])
+    if strength >= ASK_HIGH_CONFIDENCE_SCORE and not keyword_only:
+        return "High"
+    if strength >= ASK_LOW_CONFIDENCE_SCORE:
+        return "Medium"
+    return "Low"
+
+
+async def generate_answer(
+    question: str,
+    language: str,
+    jurisdiction: str,
+    rag_results: List[Dict[str, Any]],
+    priority: int = PRIORITY_INTERACTIVE
+) -> AskResponse:
+    """
+    Steps 3-6 of the /ask flow for already retrieved chunks
+    """
+    # 3. Chunks arrive MMR re-ranked (near-duplicates dropped, other documents
+    #    preferred over a third chunk of the same one); confidence follows how
+    #    similar the context chunks are to the question, not how many there are
+    context_chunks = rag_results[:3]
+    confidence_level = retrieval_confidence(context_chunks)
+    
+    # 4. Build context block (max ~3 chunks) with metadata
+    context = "\n\n".join([
+        f"[{r['source']}] {r['text']}" for r in context_chunks
+    ])
+    
+    # 5. Confident lookups are answered extractively, skipping the LLM
+    extractive = confident_answer(question, context_chunks, language)
+    if extractive:
+        metrics.increment("answers.extractive")
+        return build_ask_response(extractive.text, confidence_level, context_chunks, language, jurisdiction)
+    
+    # Otherwise generate with main prompt; weak retrieval → low-confidence prompt
+    messages = get_prompt(language).build(question, context, low_confidence=confidence_level == "Low")
+    
+    # Call OpenAI API with fallback for testing mode
     try:
-        # 1. Detect language + jurisdiction (default DXB)
-        language = request.language or detect_language(request.question)
-        jurisdiction = request.jurisdictionCode or "DXB"
-        
-        # 2. Embed user query → retrieve top-K (K=5) from document_chunks
-        rag_results = rag_engine.retrieve_context(
-            query=request.question,
-            language=language,
-            top_k=5
+        response = await run_in_threadpool(
+            create_chat_completion,
+            messages,
+            priority=priority,
+            temperature=0.3,
+            max_tokens=1000
         )
-        
-        # 3. Rerank (cosine + BM25 keywords). Require at least 2 distinct documents when available
-        if len(rag_results) < 2:
-            # Low confidence if insufficient sources
-            confidence_level = "Low"
-            context_coverage = 0.3
-        elif len(rag_results) >= 3:
-            confidence_level = "High"
-            context_coverage = 0.9
-        else:
-            confidence_level = "Medium"
-            context_coverage = 0.6
-        
-        # 4. Build context block (max ~3 chunks) with metadata
-        context_chunks = rag_results[:3]
-        context = "\n\n".join([
-            f"[{r['source']}] {r['text']}" for r in context_chunks
-        ])
-        
-        # 5. Generate with main prompt. If retrieval coverage < threshold or score low → low-confidence prompt
-        system_prompt = SYSTEM_PROMPT_AR if language == 'ar' else SYSTEM_PROMPT_EN
-        system_prompt = system_prompt.format(context=context)
-        
-        if context_coverage < 0.5:
-            # Low confidence prompt
-            if language == 'ar':
-                system_prompt += "\n\n⚠️ تحذير: المعلومات المتوفرة محدودة. يُنصح بالاستشارة مع محامٍ مرخص."
-            else:
-                system_prompt += "\n\n⚠️ Warning: Limited information available. Consider consulting a licensed lawyer."
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": request.question}
-        ]
-        
-        # Call OpenAI API with fallback for testing mode
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.3,
-                max_tokens=1000
-            )
-            answer = response.choices[0].message.content
-        except Exception as e:
-            if "quota" in str(e).lower() or "billing" in str(e).lower() or "rate" in str(e).lower():
-                # TESTING MODE: Provide response from context
-                if context:
-                    if language == 'ar':
-                        answer = f"""🤖 **وضع الاختبار** - نظام LegalEdge AI
-
-📋 **سؤالك**: {request.question}
+        answer = response.choices[0].message.content
+    except Exception as e:
+        if is_upstream_unavailable(e):
+            extractive = fallback_answer(question, context_chunks, language)
+            if extractive:
+                answer = extractive.text
+                metrics.increment("answers.extractive_fallback")
+            # TESTING MODE: Provide response from context
+            elif context:
+                if language == 'ar':
+                    answer = f"""🤖 **وضع الاختبار** - نظام LegalEdge AI
+
+📋 **سؤالك**: {question}
 
 📚 **المعلومات القانونية ذات الصلة من دليل الإيجار في دبي**:
 
 {context[:800]}...
 
 ⚠️ **تنويه قانوني**: هذه معلومات عامة فقط من قانون الإيجار في دبي. للحصول على استشارة قانونية محددة لحالتك، يرجى التواصل مع محامٍ مرخص في دبي."""
-                    else:
-                        answer = f"""🤖 **TESTING MODE** - LegalEdge AI System
+                else:
+                    answer = f"""🤖 **TESTING MODE** - LegalEdge AI System
 
-📋 **Your Question**: {request.question}
+📋 **Your Question**: {question}
 
 📚 **Relevant Legal Information from Dubai Tenancy Guide**:
 
 {context[:800]}...
 
 ⚠️ **Legal Disclaimer**: This is general information only from Dubai tenancy law. For legal advice specific to your situation, please consult a licensed lawyer in Dubai."""
-                else:
-                    if language == 'ar':
-                        answer = "عذراً، لم أجد معلومات ذات صلة في قاعدة البيانات الخاصة بنا حول هذا السؤال."
-                    else:
-                        answer = "Sorry, I couldn't find relevant information in our database about this question."
-                confidence_level = "Low"
             else:
-                raise e
+                if language == 'ar':
+                    answer = "عذراً، لم أجد معلومات ذات صلة في قاعدة البيانات الخاصة بنا حول هذا السؤال."
+                else:
+                    answer = "Sorry, I couldn't find relevant information in our database about this question."
+            confidence_level = "Low"
+        else:
+            raise e
+    
+    return build_ask_response(answer, confidence_level, context_chunks, language, jurisdiction)
+
+
+def build_ask_response(
+    answer: str,
+    confidence_level: str,
+    context_chunks: List[Dict[str, Any]],
+    language: str,
+    jurisdiction: str
+) -> AskResponse:
+    """Step 6 of the /ask flow: attach citations for the chunks the answer came from"""
+    # 6. Always return citations; never answer without sources
+    citations = []
+    for result in context_chunks:
+        # Metadata comes back with the chunk, so no extra lookup per citation
+        metadata = result.get('metadata') or {}
+        citation = Citation(
+            title=result['source'],
+            article=f"Page {result.get('page', 'N/A')}",
+            version_date=metadata.get('version_date'),
+            source_url=metadata.get('source_url')
+        )
+        citations.append(citation)
+    
+    return AskResponse(
+        answer=answer,
+        confidence=confidence_level,
+        citations=citations,
+        language=language,
+        jurisdiction=jurisdiction
+    )
+
+
+@app.post("/ask", response_model=AskResponse)
+async def ask_question(request: AskRequest, db: Session = Depends(get_db)):
+    """
+    Main question endpoint with authoritative RAG flow
+    """
+    try:
+        # 1. Detect language + jurisdiction (default DXB)
+        language = request.language or detect_language(request.question)
+        jurisdiction = request.jurisdictionCode or "DXB"
+        filters = request.metadata_filters()
         
-        # 6. Always return citations; never answer without sources
-        citations = []
-        for result in context_chunks:
-            citation = Citation(
-                title=result['source'],
-                article=f"Page {result.get('page', 'N/A')}",
-                version_date="2024",  # Default version date
-                source_url=None
+        # Concurrent identical questions share one embedding, retrieval and
+        # generation, all within the leader's deadline budget
+        key = (normalize_question(request.question), language, tuple(sorted(filters.items())))
+        with deadline(REQUEST_DEADLINE_SECONDS):
+            return await ask_flight.do(
+                key,
+                lambda: answer_question(request.question, language, jurisdiction, filters)
             )
-            citations.append(citation)
-        
-        return AskResponse(
-            answer=answer,
-            confidence=confidence_level,
-            citations=citations,
-            language=language,
-            jurisdiction=jurisdiction
-        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
 
-@app.post("/embed", response_model=EmbedResponse)
+@app.post("/ask/batch", response_model=AskBatchResponse)
+async def ask_batch(request: AskBatchRequest, db: Session = Depends(get_db)):
+    """
+    Batch question endpoint for partner integrations and regression runs
+    
+    All questions are embedded together and retrieved in one SQL round
+    trip; generations then run with bounded concurrency at bulk priority.
+    Results are returned in request order.
+    
+    The deadline budget is one /ask budget per wave of ASK_BATCH_CONCURRENCY
+    generations; questions whose generation no longer fits get the
+    fallback answer instead of holding the whole batch.
+    """
+    try:
+        languages = [q.language or detect_language(q.question) for q in request.questions]
+        jurisdictions = [q.jurisdictionCode or "DXB" for q in request.questions]
+        waves = max(1, math.ceil(len(request.questions) / ASK_BATCH_CONCURRENCY))
+        
+        with deadline(REQUEST_DEADLINE_SECONDS * waves):
+            batch_results = await run_in_threadpool(
+                get_rag_engine().retrieve_context_batch,
+                [q.question for q in request.questions],
+                languages,
+                5,
+                [q.metadata_filters() for q in request.questions]
+            )
+            
+            semaphore = asyncio.Semaphore(ASK_BATCH_CONCURRENCY)
+            
+            async def generate(i: int) -> AskResponse:
+                async with semaphore:
+                    return await generate_answer(
+                        request.questions[i].question,
+                        languages[i],
+                        jurisdictions[i],
+                        batch_results[i],
+                        priority=PRIORITY_BULK
+                    )
+            
+            results = await asyncio.gather(*(generate(i) for i in range(len(request.questions))))
+        return AskBatchResponse(results=list(results))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+
+
+@app.post("/embed", response_model=EmbedResponse, status_code=202)
 async def embed_document(request: EmbedRequest, db: Session = Depends(get_db)):
     """
     Admin endpoint for embedding documents
+    
+    Enqueues an ingestion job and returns immediately; chunking and
+    embedding run in the ingestion workers. Poll /embed/jobs/{jobId}.
     """
     try:
-        document_id = str(uuid4())
-        
-        # Split text into chunks and embed
-        chunks = rag_engine.add_document_chunks(
+        job = enqueue_job(
+            db,
             source=request.document.title,
             text=request.text,
             language=request.language or 'en',
-            document_id=document_id,
             meta_data={
                 "source_url": request.document.source_url,
                 "version_date": request.document.version_date,
@@ -619,65 +1174,149 @@ async def embed_document(request: EmbedRequest, db: Session = Depends(get_db)):
                 "topic": request.topic
             }
         )
-        
-        return EmbedResponse(
-            documentId=document_id,
-            chunks=len(chunks)
+        response = EmbedResponse(
+            documentId=job.document_id,
+            chunks=job.chunks_total,
+            jobId=job.id,
+            status=job.status
         )
+        await run_in_threadpool(db.commit)
+        if ingestion_worker:
+            ingestion_worker.notify()
+        
+        return response
         
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Error embedding document: {str(e)}")
 
 
-@app.post("/feedback", response_model=FeedbackNewResponse)
-async def submit_feedback_new(request: FeedbackNewRequest, db: Session = Depends(get_db)):
+def spool_upload(upload: UploadFile, job_id: str) -> str:
     """
-    Submit feedback for questions/answers
+    Copy an uploaded PDF to UPLOAD_DIR in fixed-size blocks
+    
+    Returns:
+        Path of the spooled file
     """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, f"{job_id}.pdf")
+    size = 0
     try:
-        # Create a message first if answerId is provided, otherwise use a generic one
-        if request.answerId:
-            message_id = request.answerId
-        else:
-            # Create a generic conversation first
-            generic_conversation = Conversation(
-                id=str(uuid4()),
-                language="en",
-                created_at=datetime.utcnow()
-            )
-            db.add(generic_conversation)
-            db.flush()  # Get the ID without committing
-            
-            # Create a generic message for general feedback
-            generic_message = Message(
-                id=str(uuid4()),
-                conversation_id=generic_conversation.id,
-                content=f"General feedback: {request.question}",
-                is_user=True,
-                language="en",
-                created_at=datetime.utcnow()
-            )
-            db.add(generic_message)
-            db.flush()  # Get the ID without committing
-            message_id = generic_message.id
-        
-        # Create feedback
-        feedback = Feedback(
-            id=str(uuid4()),
-            message_id=message_id,
-            rating=5 if request.helpful else 1,
-            comment=f"Question: {request.question}",
-            created_at=datetime.utcnow()
+        with open(path, "wb") as out:
+            upload.file.seek(0)
+            header = upload.file.read(5)
+            if header != b"%PDF-":
+                raise HTTPException(status_code=400, detail="File is not a PDF")
+            out.write(header)
+            size = len(header)
+            while True:
+                block = upload.file.read(UPLOAD_COPY_BUFFER)
+                if not block:
+                    break
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"PDF exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                out.write(block)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+@app.post("/embed/pdf", response_model=EmbedResponse, status_code=202)
+async def embed_pdf(
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    language: Literal["ar", "en"] = Form("en"),
+    jurisdictionCode: str = Form("DXB"),
+    source_url: Optional[str] = Form(None),
+    version_date: Optional[str] = Form(None),
+    topic: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Admin endpoint for uploading a PDF (multipart/form-data)
+    
+    The upload is spooled to disk and queued; an ingestion worker parses,
+    chunks and embeds it page by page, so memory use does not grow with
+    document size. `chunks` in the response is 0; follow progress via
+    /embed/jobs/{jobId}.
+    """
+    path = None
+    try:
+        job = enqueue_job(
+            db,
+            source=title or file.filename or "Uploaded PDF",
+            language=language,
+            meta_data={
+                "source_url": source_url,
+                "version_date": version_date,
+                "jurisdictionCode": jurisdictionCode,
+                "topic": topic
+            }
         )
+        path = await run_in_threadpool(spool_upload, file, job.id)
+        job.file_path = path
         
-        db.add(feedback)
-        db.commit()
+        response = EmbedResponse(
+            documentId=job.document_id,
+            chunks=job.chunks_total,
+            jobId=job.id,
+            status=job.status
+        )
+        await run_in_threadpool(db.commit)
+        if ingestion_worker:
+            ingestion_worker.notify()
         
-        return FeedbackNewResponse(ok=True)
+        return response
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error submitting feedback: {str(e)}")
+        if path and os.path.exists(path):
+            os.remove(path)
+        raise HTTPException(status_code=500, detail=f"Error queueing PDF: {str(e)}")
+    finally:
+        await file.close()
+
+
+@app.get("/embed/jobs/{job_id}", response_model=EmbedJobResponse)
+async def get_embed_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Progress of an ingestion job
+    """
+    job = await run_in_threadpool(db.get, IngestionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return EmbedJobResponse(
+        jobId=job.id,
+        documentId=job.document_id,
+        status=job.status,
+        chunksTotal=job.chunks_total,
+        chunksDone=job.chunks_done,
+        attempts=job.attempts,
+        error=job.error,
+        createdAt=job.created_at.isoformat() if job.created_at else None,
+        startedAt=job.started_at.isoformat() if job.started_at else None,
+        finishedAt=job.finished_at.isoformat() if job.finished_at else None
+    )
+
+
+@app.post("/feedback", response_model=FeedbackNewResponse)
+async def submit_feedback_new(request: FeedbackNewRequest):
+    """
+    Submit feedback for questions/answers
+    
+    Votes are buffered and written to `answer_feedback` in batches, so a
+    click costs no database round trip on the request path.
+    """
+    if not feedback_buffer.add(request.question, request.answerId, request.helpful):
+        # Buffer full (database unavailable for a while): tell the client the vote was not kept
+        raise HTTPException(status_code=503, detail="Feedback is temporarily unavailable, please retry later")
+    return FeedbackNewResponse(ok=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+Lightweight in-process metrics
+Rolling latency windows, counters and an event-loop lag monitor
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+def _pick(samples, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+
+class LatencyStats:
+    """Rolling window of latency samples (milliseconds)"""
+
+    def __init__(self, window: int = 2048):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, value_ms: float):
+        with self._lock:
+            self._samples.append(value_ms)
+            self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        return _pick(samples, pct) if samples else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+        if not samples:
+            return {"count": count}
+        return {
+            "count": count,
+            "p50_ms": round(_pick(samples, 50), 3),
+            "p95_ms": round(_pick(samples, 95), 3),
+            "p99_ms": round(_pick(samples, 99), 3),
+            "max_ms": round(samples[-1], 3),
+        }
+
+
+_latencies: Dict[str, LatencyStats] = {}
+_counters: Dict[str, int] = {}
+_registry_lock = threading.Lock()
+
+
+def latency(name: str) -> LatencyStats:
+    """Get (or create) the named latency window"""
+    stats = _latencies.get(name)
+    if stats is None:
+        with _registry_lock:
+            stats = _latencies.setdefault(name, LatencyStats())
+    return stats
+
+
+def increment(name: str, amount: int = 1):
+    """Increment a named counter"""
+    with _registry_lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot() -> Dict[str, Any]:
+    """All metrics as a JSON-serializable dict"""
+    with _registry_lock:
+        names = list(_latencies.items())
+        counters = dict(_counters)
+    return {
+        "latency": {name: stats.snapshot() for name, stats in names},
+        "counters": counters,
+    }
+
+
+async def monitor_event_loop_lag(interval: float = 0.1):
+    """
+    Record how late the event loop wakes up from a fixed sleep
+
+    Anything blocking the loop (sync DB or OpenAI calls inside async
+    handlers) shows up directly as lag under the "event_loop_lag" name.
+    """
+    loop = asyncio.get_running_loop()
+    stats = latency("event_loop_lag")
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        stats.record(max(0.0, (loop.time() - start - interval) * 1000))
@@ -0,0 +1,108 @@
+"""
+Micro-batching of concurrent blocking calls
+Collects items over a short window and processes them as one batch
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+import metrics
+from deadline import deadline
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Thread-safe micro-batcher
+
+    `submit()` blocks the calling thread until its item has been processed.
+    A dispatcher thread starts a batch when the first item arrives, keeps
+    collecting for up to `window_ms` or until `max_batch` items, then hands
+    the batch to `process_batch`, which must return one result per item in
+    the same order. Up to `max_concurrency` batches run at once, so a slow
+    batch does not stall the next one.
+
+    Batches run on executor threads, outside the callers' contexts; the
+    earliest `timeout` among a batch's callers becomes its request deadline.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_batch: Callable[[List[T]], List[R]],
+        window_ms: float = 3.0,
+        max_batch: int = 32,
+        max_concurrency: int = 4
+    ):
+        self.name = name
+        self.process_batch = process_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        # (item, future, enqueued at, expires at or None)
+        self._queue: "queue.Queue[Tuple[T, Future, float, Optional[float]]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"{name}-batch")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name=f"{name}-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, item: T, timeout: Optional[float] = None) -> R:
+        """
+        Queue `item` and block until its batch has produced a result
+
+        Raises concurrent.futures.TimeoutError after `timeout` seconds. The
+        item is dropped if its batch has not started yet; otherwise it is
+        processed with the batch and the result discarded.
+        """
+        future: Future = Future()
+        now = time.monotonic()
+        self._queue.put((item, future, now, None if timeout is None else now + timeout))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def _dispatch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[Tuple[T, Future, float, Optional[float]]]):
+        # Callers that already gave up are skipped; the rest can no longer cancel
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.monotonic()
+        wait_stats = metrics.latency(f"microbatch.{self.name}.wait")
+        for _, _, enqueued, _ in batch:
+            wait_stats.record((started - enqueued) * 1000)
+        metrics.increment(f"microbatch.{self.name}.batches")
+        metrics.increment(f"microbatch.{self.name}.items", len(batch))
+
+        expiries = [expires_at for _, _, _, expires_at in batch if expires_at is not None]
+        budget = deadline(min(expiries) - started) if expiries else nullcontext()
+        try:
+            with budget:
+                results = self.process_batch([item for item, _, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future, _, _), result in zip(batch, results):
+            future.set_result(result)
@@ -3,11 +3,15 @@ SQLAlchemy models for LegalEdge AI
 """
 from datetime import datetime
 from sqlalchemy import Column, String, Text, Integer, Float, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, deferred
 from pgvector.sqlalchemy import Vector
 
 from database import Base
 
+# text-embedding-3-large dimension
+EMBEDDING_DIM = 3072
+
 
 class Conversation(Base):
     """Conversation/Session model"""
@@ -22,7 +26,14 @@ class Conversation(Base):
 
 
 class Message(Base):
-    """Chat message model"""
+    """
+    Chat message model
+    
+    Migrated databases partition messages, citations and feedbacks by month
+    on created_at (see partitions.py), so the database primary key is
+    (id, created_at) and citations/feedbacks reference messages without a
+    foreign-key constraint.
+    """
     __tablename__ = "messages"
     
     id = Column(String, primary_key=True)
@@ -31,27 +42,51 @@ class Message(Base):
     is_user = Column(Boolean, nullable=False)
     language = Column(String(2), nullable=False)
     confidence = Column(Float, nullable=True)  # For assistant messages
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Partition key
     
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
-    citations = relationship("Citation", back_populates="message", cascade="all, delete-orphan")
-    feedbacks = relationship("Feedback", back_populates="message", cascade="all, delete-orphan")
+    citations = relationship(
+        "Citation",
+        primaryjoin="Message.id == foreign(Citation.message_id)",
+        back_populates="message",
+        cascade="all, delete-orphan"
+    )
+    feedbacks = relationship(
+        "Feedback",
+        primaryjoin="Message.id == foreign(Feedback.message_id)",
+        back_populates="message",
+        cascade="all, delete-orphan"
+    )
 
 
 class Citation(Base):
-    """Citation/Source reference model"""
+    """
+    Citation/Source reference model
+    
+    Points at the cited chunk (`document_id`) and the excerpt's character
+    range within it; the text is resolved on read. `excerpt` is only set
+    on citations written before chunk references existed.
+    """
     __tablename__ = "citations"
     
     id = Column(String, primary_key=True)
-    message_id = Column(String, ForeignKey("messages.id"), nullable=False)
+    message_id = Column(String, nullable=False, index=True)
     source = Column(String, nullable=False)  # Document name
     page = Column(Integer, nullable=True)
-    excerpt = Column(Text, nullable=False)
+    document_id = Column(String, nullable=True)  # documents.id; no FK, so deleting chunks never blocks on history
+    excerpt_start = Column(Integer, nullable=True)
+    excerpt_end = Column(Integer, nullable=True)
+    excerpt = Column(Text, nullable=True)  # Legacy copy of the chunk text
     relevance_score = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Partition key
     
     # Relationships
-    message = relationship("Message", back_populates="citations")
+    message = relationship(
+        "Message",
+        primaryjoin="foreign(Citation.message_id) == Message.id",
+        back_populates="citations"
+    )
 
 
 class Feedback(Base):
@@ -59,13 +94,17 @@ class Feedback(Base):
     __tablename__ = "feedbacks"
     
     id = Column(String, primary_key=True)
-    message_id = Column(String, ForeignKey("messages.id"), nullable=False)
+    message_id = Column(String, nullable=False, index=True)
     rating = Column(Integer, nullable=False)  # 1-5
     comment = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Partition key
     
     # Relationships
-    message = relationship("Message", back_populates="feedbacks")
+    message = relationship(
+        "Message",
+        primaryjoin="foreign(Feedback.message_id) == Message.id",
+        back_populates="feedbacks"
+    )
 
 
 class Document(Base):
@@ -78,10 +117,81 @@ class Document(Base):
     chunk_index = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
     content_ar = Column(Text, nullable=True)  # Arabic translation if available
-    embedding = Column(Vector(3072), nullable=False)  # text-embedding-3-large dimension
-    language = Column(String(2), default='en')
+    # Nullable and without server defaults because reembed.py cut-over swaps
+    # embedding* with embedding_next* by renaming the columns (see 0011)
+    embedding = Column(Vector(EMBEDDING_DIM))  # text-embedding-3-large dimension
+    language = Column(String(4), default='en')  # 'en', 'ar' or 'both'; partial indexes per value
+    # Which embeddings.EmbeddingProvider produced `embedding`; only comparable within a pair
+    embedding_provider = Column(String(32), default='openai')
+    embedding_version = Column(String(64), default='text-embedding-3-large')
+    # An in-flight embedding migration's vectors (the previous model's after a cut-over)
+    embedding_next = Column(Vector(EMBEDDING_DIM), nullable=True)
+    embedding_next_provider = Column(String(32), nullable=True)
+    embedding_next_version = Column(String(64), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Additional metadata
-    meta_data = Column(Text, nullable=True)  # JSON string for additional info
+    # jurisdictionCode, topic, version_date, source_url, ... (GIN-indexed, see 0003)
+    meta_data = Column(JSONB, nullable=False, default=dict, server_default='{}')
+
+
+class IngestionJob(Base):
+    """Queued /embed request, processed by ingestion_worker"""
+    __tablename__ = "ingestion_jobs"
+    
+    id = Column(String, primary_key=True)
+    document_id = Column(String, nullable=False)
+    status = Column(String(16), nullable=False, default='queued')  # queued, running, succeeded, failed
+    source = Column(String, nullable=False)  # Document title
+    text = deferred(Column(Text, nullable=True))  # Cleared once the job succeeds; not loaded for status reads
+    file_path = Column(String, nullable=True)  # Spooled PDF upload (instead of text); removed when done
+    language = Column(String(4), nullable=False, default='en')
+    meta_data = Column(JSONB, nullable=False, default=dict, server_default='{}')
+    chunks_total = Column(Integer, nullable=False, default=0)
+    chunks_done = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    worker = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
+
+class AnswerFeedback(Base):
+    """
+    Helpful/not-helpful votes from the /feedback widget
+    
+    Written in batches by feedback_buffer; deliberately standalone (no
+    conversation/message rows, no foreign keys) so votes stay one cheap insert.
+    """
+    __tablename__ = "answer_feedback"
+    
+    id = Column(String, primary_key=True)
+    question = Column(Text, nullable=False)
+    answer_id = Column(String, nullable=True)  # Message id of the rated answer, when known
+    helpful = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class EmbeddingMigration(Base):
+    """
+    Re-embedding of the corpus with another provider/model (see reembed.py)
+    
+    Vectors are written to documents.embedding_next while `status` is
+    'backfilling', and indexed before it becomes 'ready'; cut-over renames
+    them into place and marks the row 'active', which makes it the
+    embedder every RAGEngine uses (overriding EMBEDDING_PROVIDER).
+    """
+    __tablename__ = "embedding_migrations"
+    
+    id = Column(String, primary_key=True)
+    provider = Column(String(32), nullable=False)
+    model = Column(String(64), nullable=True)
+    dimensions = Column(Integer, nullable=True)  # None = the model's full size
+    version = Column(String(64), nullable=False)  # embedding_version written to documents
+    status = Column(String(16), nullable=False, default='backfilling')  # backfilling, ready, active, retired, abandoned
+    chunks_total = Column(Integer, nullable=False, default=0)
+    chunks_done = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    cut_over_at = Column(DateTime, nullable=True)
@@ -0,0 +1,244 @@
+"""
+Shared OpenAI access
+Every embedding and chat-completion call goes through the rate limiters
+and circuit breakers here
+"""
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
+
+import openai
+from dotenv import load_dotenv
+
+import metrics
+from rate_limiter import AdaptiveRateLimiter, RateLimitExceeded, PRIORITY_INTERACTIVE, call_with_retry
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from deadline import DeadlineExceeded, remaining, stage_timeout
+
+load_dotenv()
+
+T = TypeVar("T")
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+CHAT_MODEL = "gpt-4o-mini"
+
+# Limits are per model on OpenAI's side, so each gets its own limiter
+embedding_limiter = AdaptiveRateLimiter(
+    "embeddings",
+    requests_per_minute=float(os.getenv("OPENAI_EMBED_RPM", "3000")),
+    tokens_per_minute=float(os.getenv("OPENAI_EMBED_TPM", "1000000")),
+)
+chat_limiter = AdaptiveRateLimiter(
+    "chat",
+    requests_per_minute=float(os.getenv("OPENAI_CHAT_RPM", "500")),
+    tokens_per_minute=float(os.getenv("OPENAI_CHAT_TPM", "200000")),
+)
+
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+# Per-attempt timeouts; without them a stuck upstream holds a worker indefinitely
+EMBED_TIMEOUT = float(os.getenv("OPENAI_EMBED_TIMEOUT", "10"))
+CHAT_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", "60"))
+# Interactive callers give up queueing after this long; bulk ingestion waits
+INTERACTIVE_QUEUE_TIMEOUT = float(os.getenv("OPENAI_INTERACTIVE_QUEUE_TIMEOUT", "15"))
+
+# Hedged interactive embeddings: once a call has run longer than the recent
+# p95, a second identical call races it. Off by default (costs up to ~5% extra calls).
+EMBED_HEDGE = os.getenv("EMBED_HEDGE", "false").lower() in ("1", "true", "yes")
+EMBED_HEDGE_PERCENTILE = float(os.getenv("EMBED_HEDGE_PERCENTILE", "95"))
+EMBED_HEDGE_MIN_DELAY = float(os.getenv("EMBED_HEDGE_MIN_DELAY_MS", "50")) / 1000
+EMBED_HEDGE_MIN_SAMPLES = 20
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("EMBED_HEDGE_THREADS", "16")),
+    thread_name_prefix="embed-hedge"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    return isinstance(e, openai.error.RateLimitError)
+
+
+def is_retryable_error(e: Exception) -> bool:
+    return isinstance(e, (
+        openai.error.APIConnectionError,
+        openai.error.ServiceUnavailableError,
+        openai.error.Timeout,
+        openai.error.TryAgain,
+    )) or (isinstance(e, openai.error.APIError) and (getattr(e, "http_status", None) or 0) >= 500)
+
+
+# One breaker per upstream. Rate limits are the limiter's job and do not
+# count as failures here; timeouts, connection errors and 5xx do.
+embedding_breaker = CircuitBreaker(
+    "embeddings",
+    failure_rate_threshold=float(os.getenv("OPENAI_BREAKER_FAILURE_RATE", "0.5")),
+    open_seconds=float(os.getenv("OPENAI_BREAKER_OPEN_SECONDS", "15")),
+    is_failure=is_retryable_error,
+)
+chat_breaker = CircuitBreaker(
+    "chat",
+    failure_rate_threshold=float(os.getenv("OPENAI_BREAKER_FAILURE_RATE", "0.5")),
+    open_seconds=float(os.getenv("OPENAI_BREAKER_OPEN_SECONDS", "15")),
+    is_failure=is_retryable_error,
+)
+
+
+def is_upstream_unavailable(e: Exception) -> bool:
+    """True for failures that should degrade to the local fallback answer"""
+    if isinstance(e, (CircuitOpenError, RateLimitExceeded, DeadlineExceeded)) or is_rate_limit_error(e) or is_retryable_error(e):
+        return True
+    message = str(e).lower()
+    return "quota" in message or "billing" in message
+
+
+def circuit_states() -> Dict[str, str]:
+    """Current breaker state per upstream"""
+    return {b.name: b.state for b in (embedding_breaker, chat_breaker)}
+
+
+def retry_after_seconds(e: Exception) -> Optional[float]:
+    """Read the Retry-After header from an OpenAI error, if any"""
+    headers = getattr(e, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _queue_timeout(priority: int) -> Optional[float]:
+    return stage_timeout(INTERACTIVE_QUEUE_TIMEOUT if priority == PRIORITY_INTERACTIVE else None, "rate-limit queue")
+
+
+def create_embedding(
+    input: Union[str, List[str]],
+    priority: int = PRIORITY_INTERACTIVE,
+    model: str = EMBEDDING_MODEL,
+    dimensions: Optional[int] = None
+) -> Dict[str, Any]:
+    """Rate-limited, retried openai.Embedding.create, hedged for interactive calls when EMBED_HEDGE is on"""
+    options = {"model": model}
+    if dimensions is not None:
+        options["dimensions"] = dimensions
+    if EMBED_HEDGE and priority == PRIORITY_INTERACTIVE:
+        return _hedged(lambda max_retries: _create_embedding(input, priority, options, max_retries))
+    return _create_embedding(input, priority, options)
+
+
+def _create_embedding(
+    input: Union[str, List[str]],
+    priority: int,
+    options: Dict[str, Any],
+    max_retries: int = MAX_RETRIES
+) -> Dict[str, Any]:
+    texts = [input] if isinstance(input, str) else input
+    embedding_breaker.raise_if_open()
+    started = time.perf_counter()
+    response = call_with_retry(
+        # Each attempt gets at most what is left of the request's budget
+        lambda: embedding_breaker.call(lambda: openai.Embedding.create(
+            input=input,
+            request_timeout=stage_timeout(EMBED_TIMEOUT, "embedding"),
+            **options
+        )),
+        embedding_limiter,
+        tokens=sum(estimate_tokens(t) for t in texts),
+        priority=priority,
+        max_retries=max_retries,
+        queue_timeout=_queue_timeout(priority),
+        is_rate_limit=is_rate_limit_error,
+        is_retryable=is_retryable_error,
+        retry_after=retry_after_seconds,
+    )
+    if priority == PRIORITY_INTERACTIVE:
+        metrics.latency("openai.embedding").record((time.perf_counter() - started) * 1000)
+    return response
+
+
+def hedge_delay() -> Optional[float]:
+    """Seconds to wait before hedging: recent interactive embedding p95, None until enough samples"""
+    stats = metrics.latency("openai.embedding")
+    if stats.count < EMBED_HEDGE_MIN_SAMPLES:
+        return None
+    return max(EMBED_HEDGE_MIN_DELAY, stats.percentile(EMBED_HEDGE_PERCENTILE) / 1000)
+
+
+def _hedged(call: Callable[[int], T]) -> T:
+    """
+    Run `call`; if it is still running after hedge_delay(), start a second
+    identical call and return whichever succeeds first
+
+    The hedge makes a single attempt (retries stay with the primary) and
+    still goes through the rate limiter and breaker. The slower call is
+    abandoned, not cancelled.
+    """
+    primary = _hedge_executor.submit(contextvars.copy_context().run, call, MAX_RETRIES)
+    delay = hedge_delay()
+    if delay is None:
+        return primary.result()
+    left = remaining()
+    wait([primary], timeout=delay if left is None else min(delay, max(left, 0.0)))
+    if primary.done():
+        return primary.result()
+
+    metrics.increment("openai.embedding.hedged")
+    hedge = _hedge_executor.submit(contextvars.copy_context().run, call, 0)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    metrics.increment("openai.embedding.hedge_won")
+                return future.result()
+    return primary.result()  # Both failed: surface the primary's error
+
+
+def create_chat_completion(
+    messages: List[Dict[str, str]],
+    priority: int = PRIORITY_INTERACTIVE,
+    temperature: float = 0.3,
+    max_tokens: int = 1000
+):
+    """Rate-limited, retried openai.ChatCompletion.create"""
+    prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+    chat_breaker.raise_if_open()
+    response = call_with_retry(
+        lambda: chat_breaker.call(lambda: openai.ChatCompletion.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            request_timeout=stage_timeout(CHAT_TIMEOUT, "generation")
+        )),
+        chat_limiter,
+        tokens=prompt_tokens + max_tokens,
+        priority=priority,
+        max_retries=MAX_RETRIES,
+        queue_timeout=_queue_timeout(priority),
+        is_rate_limit=is_rate_limit_error,
+        is_retryable=is_retryable_error,
+        retry_after=retry_after_seconds,
+    )
+    record_usage(response)
+    return response
+
+
+def record_usage(response):
+    """
+    Count prompt and provider-cached prompt tokens from a chat response
+
+    `chat.cached_prompt_tokens` / `chat.prompt_tokens` in /metrics is the
+    prefix-cache hit rate; responses without usage details count as uncached.
+    """
+    usage = response.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    metrics.increment("chat.prompt_tokens", usage.get("prompt_tokens") or 0)
+    metrics.increment("chat.cached_prompt_tokens", details.get("cached_tokens") or 0)
+
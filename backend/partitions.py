@@ -0,0 +1,222 @@
+"""
+Monthly partitions for chat history tables and retention purge
+Keeps messages/citations/feedbacks partitions ahead of time and drops
+expired months in bulk instead of deleting rows
+
+Partitioned tables cannot be referenced by foreign keys, so citations and
+feedbacks no longer have one to messages (alembic 0008). Citations are
+written with their message and share its month; feedbacks are validated by
+/api/feedback on write, and the purge removes those whose message was dropped.
+
+Usage: python partitions.py [--retention-days 365] [--mode detach] [--dry-run]
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+# Range-partitioned by month on created_at (alembic 0008)
+PARTITIONED_TABLES = ("messages", "citations", "feedbacks")
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# 0 keeps history forever
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))
+# 'drop' deletes expired partitions; 'detach' keeps them as standalone
+# tables in the `archive` schema for export/offload
+RETENTION_MODE = os.getenv("RETENTION_MODE", "drop")
+MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "3600"))
+
+# Serialises maintenance across workers/replicas
+_ADVISORY_LOCK_KEY = 0x4C45_5041  # "LEPA"
+
+PARTITION_BOUNDS_SQL = text("""
+    SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relname = :table
+""")
+
+PURGE_CONVERSATIONS_SQL = text("""
+    DELETE FROM conversations c
+    WHERE c.created_at < :cutoff
+    AND NOT EXISTS (SELECT 1 FROM messages m WHERE m.conversation_id = c.id)
+""")
+
+# Feedback is given after the message, so it can sit in a later month
+PURGE_ORPHAN_FEEDBACKS_SQL = text("""
+    DELETE FROM feedbacks f
+    WHERE NOT EXISTS (SELECT 1 FROM messages m WHERE m.id = f.message_id)
+""")
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return bool(conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :t"),
+        {"t": table}
+    ).scalar())
+
+
+def list_partitions(conn, table: str) -> List[Tuple[str, Optional[date], Optional[date]]]:
+    """(name, lower bound, upper bound) per partition; bounds are None for the default partition"""
+    partitions = []
+    for row in conn.execute(PARTITION_BOUNDS_SQL, {"table": table}):
+        if row.bound == "DEFAULT":
+            partitions.append((row.name, None, None))
+            continue
+        # FOR VALUES FROM ('2026-10-01 00:00:00') TO ('2026-11-01 00:00:00')
+        lower, upper = [part.split("'")[1] for part in row.bound.split(" TO ")]
+        partitions.append((row.name, datetime.fromisoformat(lower).date(), datetime.fromisoformat(upper).date()))
+    return partitions
+
+
+def create_month_partition(conn, table: str, month: date):
+    """
+    Add the partition for `month`, moving any rows that already landed in
+    the default partition for that range
+    """
+    name = partition_name(table, month)
+    lower, upper = month, _next_month(month)
+    params = {"lower": lower, "upper": upper}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE created_at >= :lower AND created_at < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), params)
+    conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+
+
+def ensure_partitions(conn, months_ahead: int = MONTHS_AHEAD, today: date = None) -> List[str]:
+    """Create missing monthly partitions from this month through `months_ahead` months ahead"""
+    created = []
+    month = _month_start(today or datetime.utcnow().date())
+    months = [month]
+    for _ in range(months_ahead):
+        months.append(_next_month(months[-1]))
+
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        existing = {lower for _, lower, _ in list_partitions(conn, table)}
+        for month in months:
+            if month not in existing:
+                create_month_partition(conn, table, month)
+                created.append(partition_name(table, month))
+    return created
+
+
+def purge_expired_partitions(
+    conn,
+    retention_days: int = RETENTION_DAYS,
+    mode: str = RETENTION_MODE,
+    today: date = None
+) -> List[str]:
+    """
+    Drop (or detach into `archive`) every partition whose whole month is
+    older than `retention_days`, then delete conversations left without
+    messages and (when dropping) feedbacks left without their message
+
+    Returns:
+        Names of the partitions removed
+    """
+    if retention_days <= 0:
+        return []
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=retention_days)
+    removed = []
+
+    if mode == "detach":
+        conn.execute(text("CREATE SCHEMA IF NOT EXISTS archive"))
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        for name, _, upper in list_partitions(conn, table):
+            if upper is None or upper > cutoff:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if mode == "detach":
+                conn.execute(text(f"ALTER TABLE {name} SET SCHEMA archive"))
+            else:
+                conn.execute(text(f"DROP TABLE {name}"))
+            removed.append(name)
+
+    if removed and mode != "detach":
+        conn.execute(PURGE_ORPHAN_FEEDBACKS_SQL)
+    conn.execute(PURGE_CONVERSATIONS_SQL, {"cutoff": cutoff})
+    return removed
+
+
+def run_maintenance(engine) -> Optional[dict]:
+    """
+    Ensure upcoming partitions and apply retention
+
+    Takes a transaction-level advisory lock so only one worker does it at
+    a time; returns None if another worker holds it.
+    """
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}).scalar():
+            return None
+        result = {
+            "created": ensure_partitions(conn),
+            "removed": purge_expired_partitions(conn)
+        }
+    if result["created"] or result["removed"]:
+        print(f"Partition maintenance: created {result['created']}, removed {result['removed']}")
+    return result
+
+
+def maintenance_loop(engine, interval_seconds: float = MAINTENANCE_INTERVAL_SECONDS):
+    """Run maintenance now and every `interval_seconds`; meant for a daemon thread"""
+    while True:
+        try:
+            run_maintenance(engine)
+        except Exception as e:
+            print(f"Partition maintenance failed: {e}")
+        time.sleep(interval_seconds)
+
+
+def main():
+    """CLI for manual or cron-driven maintenance"""
+    parser = argparse.ArgumentParser(description="Maintain chat history partitions")
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS, help='Purge months older than this (0 = keep)')
+    parser.add_argument('--mode', choices=['drop', 'detach'], default=RETENTION_MODE, help='What to do with expired partitions')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would change, then roll back')
+    args = parser.parse_args()
+
+    from database import engine
+    conn = engine.connect()
+    transaction = conn.begin()
+    try:
+        created = ensure_partitions(conn)
+        removed = purge_expired_partitions(conn, args.retention_days, args.mode)
+        print(f"Created: {created or 'none'}")
+        print(f"{'Archived' if args.mode == 'detach' else 'Dropped'}: {removed or 'none'}")
+        if args.dry_run:
+            transaction.rollback()
+            print("Dry run: rolled back")
+        else:
+            transaction.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Incremental PDF text extraction and chunking
+Shared by the admin CLI and the /embed/pdf upload endpoint
+"""
+import gzip
+import hashlib
+import json
+import os
+from typing import Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+import PyPDF2
+
+# Characters per chunk and overlap between consecutive chunks
+PDF_CHUNK_SIZE = 1000
+PDF_CHUNK_OVERLAP = 200
+# Chunks shorter than this are usually headers/footers
+MIN_CHUNK_CHARS = 50
+
+# Extracted text is cached per (file content, extractor) so re-chunking or
+# re-embedding the same PDF skips parsing. Bump the suffix whenever the
+# extraction logic changes.
+PDF_EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}-1"
+PDF_TEXT_CACHE_DIR = os.getenv(
+    "PDF_TEXT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "pdf_text")
+)
+# Artifacts are evicted least recently used first beyond this total size,
+# since every distinct upload adds one (0 = unbounded)
+PDF_TEXT_CACHE_MAX_BYTES = int(float(os.getenv("PDF_TEXT_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_artifact_path(content_hash: str, cache_dir: str = None) -> str:
+    """Where the extracted-text artifact for a PDF hash lives"""
+    return os.path.join(cache_dir or PDF_TEXT_CACHE_DIR, f"{content_hash}.{PDF_EXTRACTOR_VERSION}.jsonl.gz")
+
+
+def prune_text_cache(cache_dir: str = None, max_bytes: int = PDF_TEXT_CACHE_MAX_BYTES) -> List[str]:
+    """
+    Delete least recently used artifacts (by mtime, refreshed on every hit)
+    until the cache fits in `max_bytes`
+
+    Returns:
+        Paths removed
+    """
+    cache_dir = cache_dir or PDF_TEXT_CACHE_DIR
+    if max_bytes <= 0 or not os.path.isdir(cache_dir):
+        return []
+    artifacts = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(".jsonl.gz"):
+            stat = entry.stat()
+            artifacts.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in artifacts)
+    removed = []
+    for _, size, path in sorted(artifacts):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue  # Already evicted by another worker
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def _parse_pdf_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_num, page in enumerate(pdf_reader.pages, start=1):
+            text = page.extract_text() or ""
+            if text.strip():
+                yield page_num, text
+
+
+def _read_artifact(path: str) -> Iterator[Tuple[int, str]]:
+    with gzip.open(path, 'rt', encoding='utf-8') as artifact:
+        next(artifact)  # Header
+        for line in artifact:
+            record = json.loads(line)
+            yield record["page"], record["text"]
+
+
+def _parse_and_cache(pdf_path: str, content_hash: str, path: str) -> Iterator[Tuple[int, str]]:
+    """Parse pages while writing them to the artifact; it is only published if parsing completes"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid4().hex}.tmp"
+    completed = False
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as artifact:
+            artifact.write(json.dumps({
+                "sha256": content_hash,
+                "extractor": PDF_EXTRACTOR_VERSION,
+                "source": os.path.basename(pdf_path)
+            }) + "\n")
+            for page_num, text in _parse_pdf_pages(pdf_path):
+                artifact.write(json.dumps({"page": page_num, "text": text}, ensure_ascii=False) + "\n")
+                yield page_num, text
+        os.replace(tmp_path, path)
+        completed = True
+    finally:
+        if not completed and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    prune_text_cache(os.path.dirname(path))
+
+
+def iter_pdf_pages(pdf_path: str, use_cache: bool = True, cache_dir: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) one page at a time
+
+    Only the current page's text is held in memory; pages without text
+    (scans, blank pages) are skipped. With `use_cache`, pages come from
+    the gzipped JSONL artifact for this file's content hash when one
+    exists; otherwise the PDF is parsed and the artifact written alongside.
+    """
+    if not use_cache:
+        yield from _parse_pdf_pages(pdf_path)
+        return
+
+    content_hash = file_sha256(pdf_path)
+    path = text_artifact_path(content_hash, cache_dir)
+    if os.path.exists(path):
+        try:
+            os.utime(path)  # Mark as recently used for prune_text_cache
+        except OSError:
+            pass
+        yield from _read_artifact(path)
+    else:
+        yield from _parse_and_cache(pdf_path, content_hash, path)
+
+
+def chunk_text(text: str, chunk_size: int = PDF_CHUNK_SIZE, chunk_overlap: int = PDF_CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into overlapping chunks, preferring sentence/line boundaries
+
+    Stops at the chunk that reaches the end of the text. Chunking before
+    the streaming upload path also emitted the last `chunk_overlap`
+    characters again as a final chunk, so re-ingesting a document made
+    with that version yields one chunk fewer per page.
+    """
+    chunks = []
+    start = 0
+
+    while start < len(text):
+        end = start + chunk_size
+        chunk = text[start:end]
+
+        # Try to break at sentence boundary
+        if end < len(text):
+            last_period = chunk.rfind('.')
+            last_newline = chunk.rfind('\n')
+            break_point = max(last_period, last_newline)
+
+            if break_point > chunk_size * 0.5:
+                chunk = chunk[:break_point + 1]
+                end = start + break_point + 1
+
+        chunks.append(chunk.strip())
+        if end >= len(text):
+            break
+        start = end - chunk_overlap
+
+    return chunks
+
+
+def iter_pdf_chunks(
+    pdf_path: str,
+    chunk_size: int = PDF_CHUNK_SIZE,
+    chunk_overlap: int = PDF_CHUNK_OVERLAP,
+    use_cache: bool = True
+) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yield (page number, chunk index within page, text) as pages are parsed
+    """
+    for page_num, page_text in iter_pdf_pages(pdf_path, use_cache=use_cache):
+        for chunk_idx, chunk in enumerate(chunk_text(page_text, chunk_size, chunk_overlap)):
+            if len(chunk) >= MIN_CHUNK_CHARS:
+                yield page_num, chunk_idx, chunk
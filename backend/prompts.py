@@ -0,0 +1,113 @@
+"""
+Chat prompt templates
+Laid out for provider-side prompt caching: each language has a static,
+byte-identical system prefix; per-request content (history, retrieved
+context, the question) only ever follows it
+"""
+from typing import Dict, List, Sequence
+
+SYSTEM_PROMPT_EN = """You are LegalEdge AI, a specialized legal assistant for Dubai real estate and tenancy law.
+
+Your role:
+1. Provide accurate information based ONLY on UAE/Dubai real estate and tenancy laws
+2. Always cite specific laws, articles, or regulations
+3. Explain complex legal concepts in simple terms
+4. Be bilingual (English and Arabic)
+
+CRITICAL RULES:
+- ONLY answer questions about Dubai real estate, tenancy, and property law
+- If asked about other legal areas or jurisdictions, politely decline
+- Always include relevant citations from official sources
+- If you're not confident (confidence < 0.7), suggest consulting a licensed lawyer
+- Never provide specific legal advice - only general legal information
+- Always include appropriate disclaimers
+
+DISCLAIMER: This is general legal information only. For advice specific to your situation, consult a licensed lawyer in Dubai."""
+
+SYSTEM_PROMPT_AR = """أنت LegalEdge AI، مساعد قانوني متخصص في قوانين العقارات والإيجارات في دبي.
+
+دورك:
+1. تقديم معلومات دقيقة بناءً فقط على قوانين العقارات والإيجارات في الإمارات/دبي
+2. الاستشهاد دائمًا بالقوانين أو المواد أو اللوائح المحددة
+3. شرح المفاهيم القانونية المعقدة بعبارات بسيطة
+4. التحدث باللغتين (الإنجليزية والعربية)
+
+قواعد حاسمة:
+- أجب فقط على الأسئلة المتعلقة بالعقارات والإيجارات والملكية في دبي
+- إذا سُئلت عن مجالات قانونية أخرى أو ولايات قضائية أخرى، ارفض بأدب
+- قم دائمًا بتضمين الاستشهادات ذات الصلة من المصادر الرسمية
+- إذا لم تكن واثقًا (الثقة < 0.7)، اقترح استشارة محامٍ مرخص
+- لا تقدم أبدًا نصيحة قانونية محددة - معلومات قانونية عامة فقط
+- قم دائمًا بتضمين إخلاء المسؤولية المناسب
+
+إخلاء المسؤولية: هذه معلومات قانونية عامة فقط. للحصول على مشورة خاصة بحالتك، استشر محاميًا مرخصًا في دبي."""
+
+CONTEXT_HEADER_EN = "Context from knowledge base:"
+CONTEXT_FOOTER_EN = "Based on this context, provide accurate, cited information."
+LOW_CONFIDENCE_EN = "⚠️ Warning: Limited information available. Consider consulting a licensed lawyer."
+
+CONTEXT_HEADER_AR = "السياق من قاعدة المعرفة:"
+CONTEXT_FOOTER_AR = "بناءً على هذا السياق، قدم معلومات دقيقة مع الاستشهادات."
+LOW_CONFIDENCE_AR = "⚠️ تحذير: المعلومات المتوفرة محدودة. يُنصح بالاستشارة مع محامٍ مرخص."
+
+
+class PromptTemplate:
+    """
+    Message layout for one language, assembled once at import
+
+    Messages are ordered static system prompt → conversation history →
+    retrieved context → question, so consecutive turns of a conversation
+    share everything up to the new context and every request shares the
+    system prompt. Prefixes are only cached upstream once the prompt is
+    long enough (1024 tokens for OpenAI); the layout costs nothing below that.
+    """
+
+    def __init__(self, language: str, system: str, context_header: str, context_footer: str, low_confidence: str):
+        self.language = language
+        self.system = system
+        self._context_head = f"{context_header}\n"
+        self._context_tail = f"\n\n{context_footer}"
+        self._low_confidence = f"\n\n{low_confidence}"
+
+    def context_message(self, context: str, low_confidence: bool = False) -> Dict[str, str]:
+        content = self._context_head + context + self._context_tail
+        if low_confidence:
+            content += self._low_confidence
+        return {"role": "system", "content": content}
+
+    def build(
+        self,
+        question: str,
+        context: str,
+        history: Sequence[Dict[str, str]] = (),
+        low_confidence: bool = False
+    ) -> List[Dict[str, str]]:
+        """
+        Chat messages for one request
+
+        Args:
+            question: User's message
+            context: Retrieved chunks, already formatted
+            history: Earlier turns as OpenAI messages, oldest first
+            low_confidence: Append the limited-information warning
+
+        Returns:
+            Messages for create_chat_completion
+        """
+        return [
+            {"role": "system", "content": self.system},
+            *history,
+            self.context_message(context, low_confidence),
+            {"role": "user", "content": question}
+        ]
+
+
+PROMPTS: Dict[str, PromptTemplate] = {
+    "en": PromptTemplate("en", SYSTEM_PROMPT_EN, CONTEXT_HEADER_EN, CONTEXT_FOOTER_EN, LOW_CONFIDENCE_EN),
+    "ar": PromptTemplate("ar", SYSTEM_PROMPT_AR, CONTEXT_HEADER_AR, CONTEXT_FOOTER_AR, LOW_CONFIDENCE_AR),
+}
+
+
+def get_prompt(language: str) -> PromptTemplate:
+    """Template for `language`, English for anything else"""
+    return PROMPTS.get(language, PROMPTS["en"])
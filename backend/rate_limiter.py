@@ -0,0 +1,204 @@
+"""
+Client-side rate limiting for upstream APIs
+Token buckets for requests/tokens per minute with priorities and adaptive backoff
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+import deadline
+import metrics
+
+T = TypeVar("T")
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller would have to queue longer than it is willing to"""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def set_rate(self, per_minute: float, now: float):
+        self._refill(now)
+        self.rate = per_minute / 60.0
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount: float):
+        self.available -= min(amount, self.capacity)
+
+
+class AdaptiveRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by all threads
+
+    Waiters are served strictly by (priority, arrival), so bulk ingestion
+    never jumps ahead of interactive chat. On a 429 the limiter pauses
+    everyone until Retry-After and multiplicatively lowers its rate, then
+    recovers additively on each success (AIMD).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        min_factor: float = 0.1
+    ):
+        self.name = name
+        self.base_rpm = requests_per_minute
+        self.base_tpm = tokens_per_minute
+        self.min_factor = min_factor
+        self.factor = 1.0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def acquire(self, tokens: int = 1, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> float:
+        """
+        Block until one request and `tokens` tokens may be spent
+
+        Args:
+            tokens: Estimated tokens for the call
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BULK
+            timeout: Maximum seconds to queue; None waits indefinitely
+
+        Returns:
+            Seconds spent queueing
+        """
+        enqueued = time.monotonic()
+        ticket = (priority, next(self._counter))
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._waiters[0] == ticket:
+                        wait = max(
+                            self.paused_until - now,
+                            self.requests.time_until(1, now),
+                            self.tokens.time_until(tokens, now),
+                        )
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    else:
+                        # Not at the head; woken when the head is served
+                        wait = 0.25
+
+                    if timeout is not None and (now - enqueued) + wait > timeout:
+                        metrics.increment(f"ratelimit.{self.name}.rejected")
+                        raise RateLimitExceeded(
+                            f"Client-side rate limit for {self.name}: would queue more than {timeout:.1f}s"
+                        )
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+        queued = time.monotonic() - enqueued
+        metrics.latency(f"ratelimit.{self.name}.queue_wait").record(queued * 1000)
+        return queued
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Upstream returned 429: pause everyone and back the rate off"""
+        with self._cond:
+            now = time.monotonic()
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            self.factor = max(self.min_factor, self.factor * 0.7)
+            self._apply_factor(now)
+        metrics.increment(f"ratelimit.{self.name}.upstream_429")
+
+    def on_success(self):
+        """Additive recovery towards the configured rate"""
+        if self.factor >= 1.0:
+            return
+        with self._cond:
+            self.factor = min(1.0, self.factor + 0.02)
+            self._apply_factor(time.monotonic())
+
+    def _apply_factor(self, now: float):
+        self.requests.set_rate(self.base_rpm * self.factor, now)
+        self.tokens.set_rate(self.base_tpm * self.factor, now)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Full-jitter exponential backoff for the given (0-based) retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    limiter: AdaptiveRateLimiter,
+    tokens: int,
+    priority: int = PRIORITY_INTERACTIVE,
+    max_retries: int = 4,
+    queue_timeout: Optional[float] = None,
+    is_rate_limit: Callable[[Exception], bool] = lambda e: False,
+    is_retryable: Callable[[Exception], bool] = lambda e: False,
+    retry_after: Callable[[Exception], Optional[float]] = lambda e: None
+) -> T:
+    """
+    Run `fn` through `limiter`, retrying rate-limit and transient errors
+
+    Retry delays honour Retry-After when the upstream provides it and
+    otherwise use jittered exponential backoff. Non-retryable errors, the
+    final failure and failures with no request deadline budget left for
+    another attempt are re-raised unchanged.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire(tokens, priority=priority, timeout=queue_timeout)
+        try:
+            result = fn()
+        except Exception as e:
+            rate_limited = is_rate_limit(e)
+            if not (rate_limited or is_retryable(e)) or attempt >= max_retries:
+                raise
+
+            hint = retry_after(e)
+            if rate_limited:
+                limiter.on_rate_limited(hint)
+            delay = max(hint or 0.0, backoff_delay(attempt))
+            left = deadline.remaining()
+            if left is not None and delay + deadline.MIN_STAGE_SECONDS >= left:
+                raise  # No budget for another attempt; let the caller degrade
+            metrics.increment(f"ratelimit.{limiter.name}.retries")
+            print(f"{limiter.name} call failed ({type(e).__name__}), retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        limiter.on_success()
+        return result
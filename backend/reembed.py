@@ -0,0 +1,497 @@
+"""
+Zero-downtime re-embedding of the document corpus
+New-model vectors are backfilled into documents.embedding_next at a
+controlled rate while retrieval keeps serving documents.embedding; once
+the backfill is indexed, sampled queries compare both and cut-over swaps
+the two columns (and their HNSW indexes) by renaming them
+
+Usage:
+    python reembed.py start --model text-embedding-3-large --dimensions 1024
+    python reembed.py backfill --rate 3000
+    python reembed.py compare --sample 200
+    python reembed.py status
+    python reembed.py cutover
+    python reembed.py abandon
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+import metrics
+from embeddings import EmbeddingProvider, get_embedding_provider
+from models import EMBEDDING_DIM
+from rate_limiter import PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+load_dotenv()
+
+# Share of interactive retrievals that also query the migration's vectors,
+# once its backfill is indexed ('ready')
+SHADOW_COMPARE_RATE = float(os.getenv("EMBEDDING_SHADOW_COMPARE_RATE", "0.05"))
+# Chunks embedded per minute by the backfill (bulk priority, so interactive calls go first)
+BACKFILL_CHUNKS_PER_MINUTE = float(os.getenv("REEMBED_CHUNKS_PER_MINUTE", "3000"))
+BACKFILL_BATCH_SIZE = int(os.getenv("REEMBED_BATCH_SIZE", "64"))
+# Most chunks cut-over will embed while holding the documents lock; a larger
+# backlog aborts the cut-over (catch up with `backfill` and retry)
+CUTOVER_MAX_DELTA = int(os.getenv("REEMBED_CUTOVER_MAX_DELTA", "256"))
+# Cut-over gives up rather than queue behind long-running statements
+CUTOVER_LOCK_TIMEOUT = "5s"
+
+# Same partial indexes as alembic 0002, on each column
+LANGUAGES = ('en', 'ar', 'both')
+LIVE_INDEX = "ix_documents_embedding_hnsw_{language}"
+NEXT_INDEX = "ix_documents_embedding_next_hnsw_{language}"
+SWAP_INDEX = "ix_documents_embedding_swap_hnsw_{language}"
+
+MIGRATION_COLUMNS = "id, provider, model, dimensions, version, status, chunks_total, chunks_done, created_at, cut_over_at"
+
+EMBEDDING_MIGRATIONS_EXIST_SQL = text("SELECT to_regclass('embedding_migrations') IS NOT NULL")
+
+EMBEDDING_CONFIG_SQL = text(f"""
+    SELECT {MIGRATION_COLUMNS} FROM embedding_migrations
+    WHERE status IN ('active', 'backfilling', 'ready')
+""")
+
+MIGRATIONS_SQL = text(f"SELECT {MIGRATION_COLUMNS} FROM embedding_migrations ORDER BY created_at DESC LIMIT :limit")
+
+# Chunks whose embedding_next is missing or from another embedder, in id
+# order after :after. `current` marks chunks already embedded like the
+# target, which are copied instead of re-embedded.
+PENDING_CHUNKS_SQL = text("""
+    SELECT d.id, d.content,
+           (d.embedding_provider = :provider AND d.embedding_version = :version) AS current
+    FROM documents d
+    WHERE d.id > :after
+    AND (d.embedding_next IS NULL
+         OR d.embedding_next_provider IS DISTINCT FROM :provider
+         OR d.embedding_next_version IS DISTINCT FROM :version)
+    ORDER BY d.id
+    LIMIT :limit
+""")
+
+# After cut-over: chunks ingested with the old embedder before workers noticed
+STRAGGLER_CHUNKS_SQL = text("""
+    SELECT id, content, false AS current FROM documents
+    WHERE id > :after
+    AND NOT (embedding_provider = :provider AND embedding_version = :version)
+    ORDER BY id
+    LIMIT :limit
+""")
+
+UPDATE_NEXT_SQL = text("""
+    UPDATE documents
+    SET embedding_next = CAST(:embedding AS vector), embedding_next_provider = :provider, embedding_next_version = :version
+    WHERE id = :document_id
+""")
+
+COPY_CURRENT_SQL = text("""
+    UPDATE documents
+    SET embedding_next = embedding, embedding_next_provider = embedding_provider, embedding_next_version = embedding_version
+    WHERE id = :document_id
+""")
+
+UPDATE_EMBEDDING_SQL = text("""
+    UPDATE documents
+    SET embedding = CAST(:embedding AS vector), embedding_provider = :provider, embedding_version = :version
+    WHERE id = :document_id
+""")
+
+PROGRESS_SQL = text("UPDATE embedding_migrations SET chunks_done = chunks_done + :count WHERE id = :id")
+
+INDEX_EXISTS_SQL = text("SELECT to_regclass(:name) IS NOT NULL")
+
+LOCK_TIMEOUT_SQL = text("SELECT set_config('lock_timeout', :timeout, true)")
+
+# Blocks concurrent writes (ingestion) until commit; reads are unaffected
+LOCK_DOCUMENTS_SQL = text("LOCK TABLE documents IN SHARE ROW EXCLUSIVE MODE")
+
+SAMPLE_QUERIES_SQL = text("""
+    SELECT content, language FROM documents
+    WHERE language IN ('en', 'ar')
+    ORDER BY random()
+    LIMIT :limit
+""")
+
+
+def provider_for(migration) -> EmbeddingProvider:
+    """The embedder a migration row describes"""
+    return get_embedding_provider(migration.provider, model=migration.model, dimensions=migration.dimensions)
+
+
+def load_embedding_config(conn) -> Dict[str, Any]:
+    """
+    {'active': row or None, 'in_flight': row or None}
+
+    Without the table (database not migrated yet) both are None, and the
+    embedder comes from EMBEDDING_PROVIDER as before.
+    """
+    config = {"active": None, "in_flight": None}
+    if not conn.execute(EMBEDDING_MIGRATIONS_EXIST_SQL).scalar():
+        return config
+    for row in conn.execute(EMBEDDING_CONFIG_SQL):
+        config["active" if row.status == "active" else "in_flight"] = row
+    return config
+
+
+def _vector_literal(embedding: List[float]) -> str:
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+
+class ShadowComparison:
+    """
+    Dual-read of sampled retrievals against a migration's vectors
+
+    `search(migration, vector, language, top_k, filters)` returns the top-k
+    chunk ids by embedding_next (RAGEngine.next_vector_search). Runs off
+    the request path on one background thread and records overlap@k
+    between the live and shadow top-k chunk ids; samples beyond a few
+    pending comparisons are dropped rather than queued. Live traffic is
+    only sampled once the migration is 'ready', i.e. its indexes are built.
+    """
+
+    def __init__(self, search: Callable[..., List[str]], sample_rate: float = SHADOW_COMPARE_RATE, window: int = 1000):
+        self.search = search
+        self.sample_rate = sample_rate
+        self._overlaps = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._busy = threading.Semaphore(4)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow-compare")
+
+    def maybe_compare(self, migration, query: str, language: str, top_k: int, filters: str, live_ids: List[str]):
+        if migration is None or migration.status != "ready":
+            return
+        if random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return
+        self._executor.submit(self._compare_in_background, migration, query, language, top_k, filters, live_ids)
+
+    def _compare_in_background(self, *args):
+        try:
+            self.compare(*args)
+        except Exception as e:
+            print(f"Shadow comparison failed: {e}")
+        finally:
+            self._busy.release()
+
+    def compare(self, migration, query: str, language: str, top_k: int, filters: str, live_ids: List[str]):
+        """Run the shadow search for `query` and record its overlap with `live_ids`"""
+        vector = provider_for(migration).embed([query], priority=PRIORITY_BULK)[0]
+        self.record(live_ids[:top_k], self.search(migration, vector, language, top_k, filters))
+
+    def record(self, live_ids: List[str], shadow_ids: List[str]):
+        if not live_ids:
+            return
+        overlap = len(set(live_ids) & set(shadow_ids)) / len(live_ids)
+        with self._lock:
+            self._overlaps.append(overlap)
+        metrics.increment("embedding_shadow.comparisons")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            overlaps = sorted(self._overlaps)
+        if not overlaps:
+            return {"count": 0}
+        return {
+            "count": len(overlaps),
+            "mean_overlap": round(sum(overlaps) / len(overlaps), 4),
+            "p10_overlap": round(overlaps[int(0.1 * (len(overlaps) - 1))], 4),
+        }
+
+
+def _drop_next_indexes(engine):
+    """Drop the embedding_next HNSW indexes, including invalid leftovers of an interrupted build"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for language in LANGUAGES:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {NEXT_INDEX.format(language=language)}"))
+
+
+def _build_next_indexes(engine):
+    """
+    Build the embedding_next counterpart of every live HNSW index (alembic
+    0002) without blocking writes, so shadow reads and the post-swap
+    column are indexed like the live one
+    """
+    _drop_next_indexes(engine)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for language in LANGUAGES:
+            if not conn.execute(INDEX_EXISTS_SQL, {"name": LIVE_INDEX.format(language=language)}).scalar():
+                continue
+            print(f"Building {NEXT_INDEX.format(language=language)}")
+            conn.execute(text(_next_index_sql(language)))
+
+
+def _next_index_sql(language: str) -> str:
+    """
+    DDL for one embedding_next HNSW index
+
+    Every provider's vectors are zero-padded to EMBEDDING_DIM, and searches
+    cast to halfvec(EMBEDDING_DIM) (rag_engine), so the index is built at
+    the column's width whatever `dimensions` the migration uses.
+    """
+    return (
+        f"CREATE INDEX CONCURRENTLY {NEXT_INDEX.format(language=language)} ON documents "
+        f"USING hnsw ((CAST(embedding_next AS halfvec({EMBEDDING_DIM}))) halfvec_cosine_ops) "
+        f"WHERE language = '{language}'"
+    )
+
+
+def _missing_next_indexes(conn) -> List[str]:
+    """Live HNSW indexes without an embedding_next counterpart"""
+    return [
+        NEXT_INDEX.format(language=language) for language in LANGUAGES
+        if conn.execute(INDEX_EXISTS_SQL, {"name": LIVE_INDEX.format(language=language)}).scalar()
+        and not conn.execute(INDEX_EXISTS_SQL, {"name": NEXT_INDEX.format(language=language)}).scalar()
+    ]
+
+
+def _embed_rows(conn, rows, embedder: EmbeddingProvider, migration, in_place: bool, priority: int):
+    """Write new vectors for `rows` (copying the live one where it is already the target's)"""
+    params = {"provider": migration.provider, "version": migration.version}
+    copies = [{"document_id": row.id} for row in rows if row.current]
+    fresh = [row for row in rows if not row.current]
+    if copies:
+        conn.execute(COPY_CURRENT_SQL, copies)
+    if fresh:
+        vectors = embedder.embed([row.content for row in fresh], priority=priority)
+        conn.execute(
+            UPDATE_EMBEDDING_SQL if in_place else UPDATE_NEXT_SQL,
+            [{**params, "document_id": row.id, "embedding": _vector_literal(vector)}
+             for row, vector in zip(fresh, vectors)]
+        )
+
+
+def start_migration(engine, provider: str, model: Optional[str], dimensions: Optional[int]) -> str:
+    """Record a new migration in 'backfilling'; fails if another one is in flight"""
+    embedder = get_embedding_provider(provider, model=model, dimensions=dimensions)
+    migration_id = str(uuid4())
+    with engine.begin() as conn:
+        total = conn.execute(text("SELECT count(*) FROM documents")).scalar()
+        conn.execute(text("""
+            INSERT INTO embedding_migrations
+                (id, provider, model, dimensions, version, status, chunks_total, chunks_done, created_at)
+            VALUES (:id, :provider, :model, :dimensions, :version, 'backfilling', :total, 0, timezone('utc', now()))
+        """), {
+            "id": migration_id,
+            "provider": embedder.name,
+            "model": getattr(embedder, "model", None),
+            "dimensions": dimensions,
+            "version": embedder.version,
+            "total": total
+        })
+    # embedding_next holds the previous model's vectors after a cut-over;
+    # stop maintaining their indexes while it is overwritten
+    _drop_next_indexes(engine)
+    return migration_id
+
+
+def _backfill_pass(engine, migration, chunks_per_minute: float, batch_size: int) -> int:
+    """
+    Embed pending chunks in id order (keyset pages), repeating until a
+    pass finds none, so chunks ingested behind the cursor are caught too
+
+    Returns:
+        Number of chunks embedded
+    """
+    in_place = migration.status == "active"
+    embedder = provider_for(migration)
+    params = {"provider": migration.provider, "version": migration.version}
+    done = 0
+
+    while True:
+        after = ""
+        embedded = 0
+        while True:
+            started = time.monotonic()
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    STRAGGLER_CHUNKS_SQL if in_place else PENDING_CHUNKS_SQL,
+                    {**params, "after": after, "limit": batch_size}
+                ).fetchall()
+            if not rows:
+                break
+            after = rows[-1].id
+
+            with engine.begin() as conn:
+                _embed_rows(conn, rows, embedder, migration, in_place, PRIORITY_BULK)
+                if not in_place:
+                    conn.execute(PROGRESS_SQL, {"id": migration.id, "count": len(rows)})
+            embedded += len(rows)
+            print(f"Re-embedded {done + embedded} chunks")
+
+            # Hold the average rate to chunks_per_minute
+            pause = len(rows) * 60.0 / chunks_per_minute - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+        done += embedded
+        if not embedded:
+            return done
+
+
+def backfill(engine, chunks_per_minute: float = BACKFILL_CHUNKS_PER_MINUTE, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Embed pending chunks for the in-flight migration (or, once cut over,
+    re-embed stragglers in place) until none are left
+
+    Each batch is embedded at bulk priority and committed on its own, so
+    the backfill can be stopped and resumed at any time. A completed
+    backfill builds the embedding_next indexes and marks the migration
+    'ready' for shadow comparison and cut-over.
+
+    Returns:
+        Number of chunks embedded
+    """
+    with engine.connect() as conn:
+        config = load_embedding_config(conn)
+    migration = config["in_flight"] or config["active"]
+    if migration is None:
+        raise SystemExit("No embedding migration to backfill; run `reembed.py start` first")
+    done = _backfill_pass(engine, migration, chunks_per_minute, batch_size)
+
+    if migration.status == "backfilling":
+        _build_next_indexes(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text("UPDATE embedding_migrations SET status = 'ready' WHERE id = :id AND status = 'backfilling'"),
+                {"id": migration.id}
+            )
+    return done
+
+
+def compare_sample(rag_engine, sample: int = 100, top_k: int = 5) -> Dict[str, Any]:
+    """Overlap@k of live vs shadow retrieval, using random chunk texts as queries"""
+    with rag_engine.engine.connect() as conn:
+        migration = load_embedding_config(conn)["in_flight"]
+        if migration is None:
+            raise SystemExit("No embedding migration in flight")
+        queries = conn.execute(SAMPLE_QUERIES_SQL, {"limit": sample}).fetchall()
+
+    comparison = ShadowComparison(rag_engine.next_vector_search, sample_rate=1.0, window=sample)
+    for query in queries:
+        question = query.content[:300]
+        live = rag_engine.retrieve_context(question, language=query.language, top_k=top_k)
+        comparison.compare(migration, question, query.language, top_k, "{}", [r["id"] for r in live])
+    return comparison.snapshot()
+
+
+def _swap_sql() -> List[str]:
+    """Renames exchanging embedding* with embedding_next* and their HNSW indexes"""
+    statements = []
+    for suffix in ("", "_provider", "_version"):
+        statements += [
+            f"ALTER TABLE documents RENAME COLUMN embedding{suffix} TO embedding_swap{suffix}",
+            f"ALTER TABLE documents RENAME COLUMN embedding_next{suffix} TO embedding{suffix}",
+            f"ALTER TABLE documents RENAME COLUMN embedding_swap{suffix} TO embedding_next{suffix}",
+        ]
+    for language in LANGUAGES:
+        live, swap, next_ = (name.format(language=language) for name in (LIVE_INDEX, SWAP_INDEX, NEXT_INDEX))
+        statements += [
+            f"ALTER INDEX IF EXISTS {live} RENAME TO {swap}",
+            f"ALTER INDEX IF EXISTS {next_} RENAME TO {live}",
+            f"ALTER INDEX IF EXISTS {swap} RENAME TO {next_}",
+        ]
+    return statements
+
+
+def cut_over(engine, max_delta: int = CUTOVER_MAX_DELTA) -> str:
+    """
+    Swap the ready migration's column and indexes in for the live ones
+
+    A catch-up backfill runs first without locks; then one short
+    transaction blocks writes, embeds the few chunks ingested since (at
+    most `max_delta`), and renames the columns and indexes, which costs
+    the same however large the corpus. Reads carry on until the renames
+    and then see the new vectors. The previous vectors stay in
+    embedding_next until the next `start`. RAGEngines switch embedder at
+    their next config refresh, or immediately if a search comes back empty.
+    """
+    with engine.connect() as conn:
+        migration = load_embedding_config(conn)["in_flight"]
+        if migration is None or migration.status != "ready":
+            raise SystemExit("No embedding migration ready; run `reembed.py backfill` until it completes")
+        missing = _missing_next_indexes(conn)
+    if missing:
+        raise SystemExit(f"Missing {', '.join(missing)}; run `reembed.py backfill` to build them")
+    _backfill_pass(engine, migration, BACKFILL_CHUNKS_PER_MINUTE, BACKFILL_BATCH_SIZE)
+
+    params = {"provider": migration.provider, "version": migration.version}
+    with engine.begin() as conn:
+        conn.execute(LOCK_TIMEOUT_SQL, {"timeout": CUTOVER_LOCK_TIMEOUT})
+        conn.execute(LOCK_DOCUMENTS_SQL)
+        delta = conn.execute(PENDING_CHUNKS_SQL, {**params, "after": "", "limit": max_delta + 1}).fetchall()
+        if len(delta) > max_delta:
+            raise SystemExit(f"More than {max_delta} chunks pending; run `reembed.py backfill` and retry")
+        if delta:
+            _embed_rows(conn, delta, provider_for(migration), migration, False, PRIORITY_INTERACTIVE)
+
+        for statement in _swap_sql():
+            conn.execute(text(statement))
+        conn.execute(text("UPDATE embedding_migrations SET status = 'retired' WHERE status = 'active'"))
+        conn.execute(text(
+            "UPDATE embedding_migrations SET status = 'active', cut_over_at = timezone('utc', now()) WHERE id = :id"
+        ), {"id": migration.id})
+    print(f"Cut over to {migration.provider}/{migration.version} ({len(delta)} chunks embedded under lock)")
+    return migration.id
+
+
+def abandon(engine):
+    """Drop the in-flight migration and its indexes; retrieval is unaffected"""
+    with engine.begin() as conn:
+        migration = load_embedding_config(conn)["in_flight"]
+        if migration is None:
+            raise SystemExit("No embedding migration in flight")
+        conn.execute(text("UPDATE embedding_migrations SET status = 'abandoned' WHERE id = :id"), {"id": migration.id})
+    _drop_next_indexes(engine)
+
+
+def main():
+    """CLI for the re-embedding workflow"""
+    parser = argparse.ArgumentParser(description="Re-embed documents with a new embedding model without downtime")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("start", help="Begin a migration to a new provider/model")
+    start.add_argument('--provider', default='openai', help='Embedding provider (openai, local)')
+    start.add_argument('--model', default=None, help='Model name (default: the current OpenAI model)')
+    start.add_argument('--dimensions', type=int, default=None, help='Shortened vector size (text-embedding-3 models)')
+
+    run = commands.add_parser("backfill", help="Embed pending chunks (resumable)")
+    run.add_argument('--rate', type=float, default=BACKFILL_CHUNKS_PER_MINUTE, help='Chunks per minute')
+    run.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Chunks per embedding call')
+
+    compare = commands.add_parser("compare", help="Overlap@k of live vs embedding_next retrieval")
+    compare.add_argument('--sample', type=int, default=100, help='Random chunks used as queries')
+    compare.add_argument('--top-k', type=int, default=5, help='Results compared per query')
+
+    commands.add_parser("status", help="Show recent migrations")
+    cutover = commands.add_parser("cutover", help="Swap in the backfilled vectors")
+    cutover.add_argument('--max-delta', type=int, default=CUTOVER_MAX_DELTA, help='Most chunks embedded under the lock')
+    commands.add_parser("abandon", help="Discard the in-flight migration")
+    args = parser.parse_args()
+
+    from database import engine
+    if args.command == "start":
+        print(f"Started migration {start_migration(engine, args.provider, args.model, args.dimensions)}")
+    elif args.command == "backfill":
+        print(f"Backfill complete: {backfill(engine, args.rate, args.batch_size)} chunks")
+    elif args.command == "compare":
+        from rag_engine import RAGEngine
+        print(compare_sample(RAGEngine(engine=engine), args.sample, args.top_k))
+    elif args.command == "status":
+        with engine.connect() as conn:
+            for row in conn.execute(MIGRATIONS_SQL, {"limit": 10}):
+                print(f"{row.id}  {row.status:<11} {row.provider}/{row.version}  "
+                      f"{row.chunks_done}/{row.chunks_total}  created {row.created_at}  cut over {row.cut_over_at or '-'}")
+    elif args.command == "cutover":
+        cut_over(engine, args.max_delta)
+    elif args.command == "abandon":
+        abandon(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Maximal marginal relevance (MMR) re-ranking
+Picks retrieved chunks that are relevant to the query but not to each other
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def parse_vector(value) -> np.ndarray:
+    """pgvector column value (text '[1,2,...]' or array) → float32 array"""
+    if isinstance(value, str):
+        return np.array(value.strip("[]").split(","), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def mmr_select(
+    query_vector: Sequence[float],
+    candidate_vectors: np.ndarray,
+    sources: Sequence[str],
+    top_k: int,
+    lambda_mult: float = 0.7,
+    max_per_source: Optional[int] = None,
+    duplicate_threshold: Optional[float] = None
+) -> List[int]:
+    """
+    Greedy MMR over candidate vectors
+
+    Each step picks the candidate maximising
+    `lambda_mult * sim(query, c) - (1 - lambda_mult) * max sim(c, selected)`.
+    All similarities come from two matrix products up front; a step is then
+    a masked argmax plus one `np.maximum` update.
+
+    Args:
+        query_vector: Query embedding
+        candidate_vectors: (n, dim) candidate embeddings
+        sources: Source document per candidate
+        top_k: Maximum number of candidates to select
+        lambda_mult: 1.0 = pure relevance, 0.0 = pure diversity
+        max_per_source: Prefer at most this many chunks from one source; once
+            no other source has candidates left, the remaining slots are
+            filled from capped sources (still by MMR score)
+        duplicate_threshold: Skip candidates at least this similar to one already selected
+
+    Returns:
+        Indices into the candidates, in selection order. May be fewer than
+        `top_k` only when the duplicate threshold rules the rest out.
+    """
+    n = len(candidate_vectors)
+    if n == 0 or top_k <= 0:
+        return []
+
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = vectors @ query
+    pairwise = vectors @ vectors.T
+
+    _, source_ids = np.unique(np.asarray(sources, dtype=object).astype(str), return_inverse=True)
+    source_counts = np.zeros(source_ids.max() + 1, dtype=np.int32)
+
+    redundancy = np.full(n, -np.inf, dtype=np.float32)  # Max similarity to anything selected
+    available = np.ones(n, dtype=bool)
+    selected = []
+    capped = max_per_source is not None
+
+    while len(selected) < top_k:
+        if duplicate_threshold is not None and selected:
+            available &= redundancy < duplicate_threshold
+        eligible = available
+        if capped:
+            eligible = available & (source_counts[source_ids] < max_per_source)
+            if not eligible.any():
+                # Every other source is used up: backfill from the capped ones
+                capped = False
+                eligible = available
+        if not eligible.any():
+            break
+
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        best = int(np.argmax(np.where(eligible, scores, -np.inf)))
+
+        selected.append(best)
+        available[best] = False
+        source_counts[source_ids[best]] += 1
+        redundancy = np.maximum(redundancy, pairwise[best])
+
+    return selected
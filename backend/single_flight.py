@@ -0,0 +1,53 @@
+"""
+Single-flight request coalescing
+Concurrent callers with the same key share one in-flight computation
+"""
+import asyncio
+import re
+import unicodedata
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+import metrics
+
+T = TypeVar("T")
+
+
+def normalize_question(text: str) -> str:
+    """Canonical form of a question for coalescing (case, spacing, end punctuation)"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.strip(" ?؟!.،,")
+
+
+class SingleFlight:
+    """
+    Per-process coalescing of identical concurrent async work
+
+    The first caller for a key (the leader) starts the work; callers that
+    arrive while it is running await the same task and receive the same
+    result or exception. Work is shielded, so a leader whose client
+    disconnects does not cancel it for the others. Nothing is cached once
+    the task finishes. Coalescing is per worker process.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every waiter went away
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn()` unless an identical call is already in flight, then share its result"""
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.increment(f"singleflight.{self.name}.shared")
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            metrics.increment(f"singleflight.{self.name}.leader")
+        return await asyncio.shield(task)
@@ -0,0 +1,12 @@
+"""
+Shared pytest setup: backend modules are imported as top-level modules,
+as they are when the API runs from this directory
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing main must not start ingestion threads or partition maintenance
+os.environ.setdefault("INGESTION_IN_PROCESS_WORKERS", "0")
+os.environ.setdefault("PARTITION_MAINTENANCE_SECONDS", "0")
@@ -0,0 +1,25 @@
+"""/ask confidence levels from the context chunks' retrieval scores"""
+from main import retrieval_confidence
+
+
+def _chunk(score: float, match: str = "vector"):
+    return {"source": "lease.pdf", "text": "...", "score": score, "match": match}
+
+
+def test_levels_follow_mean_similarity():
+    assert retrieval_confidence([_chunk(0.8), _chunk(0.7), _chunk(0.6)]) == "High"
+    assert retrieval_confidence([_chunk(0.5), _chunk(0.4), _chunk(0.3)]) == "Medium"
+    assert retrieval_confidence([_chunk(0.2), _chunk(0.2), _chunk(0.1)]) == "Low"
+
+
+def test_missing_chunks_count_as_zero():
+    assert retrieval_confidence([_chunk(0.9)]) == "Medium"
+    assert retrieval_confidence([_chunk(0.9), _chunk(0.9)]) == "High"
+    assert retrieval_confidence([]) == "Low"
+
+
+def test_keyword_fallback_is_at_most_medium():
+    # The top keyword hit is always scaled to 0.7, whatever its relevance
+    chunks = [_chunk(0.7, "keyword"), _chunk(0.65, "keyword"), _chunk(0.6, "keyword")]
+    assert retrieval_confidence(chunks) == "Medium"
+    assert retrieval_confidence([_chunk(0.7, "keyword"), _chunk(0.1, "keyword")]) == "Low"
@@ -0,0 +1,81 @@
+"""CircuitBreaker: closed → open → half-open → closed/open transitions"""
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _fail():
+    raise ConnectionError("upstream down")
+
+
+def _trip(breaker: CircuitBreaker, failures: int):
+    for _ in range(failures):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+
+def test_opens_after_consecutive_failures_and_short_circuits():
+    breaker = CircuitBreaker("test", consecutive_failures=2, open_seconds=60)
+    _trip(breaker, 1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    _trip(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+    with pytest.raises(CircuitOpenError):
+        breaker.raise_if_open()
+
+
+def test_opens_on_failure_rate():
+    breaker = CircuitBreaker("test", failure_rate_threshold=0.5, minimum_calls=4, consecutive_failures=10)
+    for _ in range(2):
+        breaker.call(lambda: None)
+        _trip(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_successful_probe_closes():
+    breaker = CircuitBreaker("test", consecutive_failures=1, open_seconds=0.05)
+    _trip(breaker, 1)
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", consecutive_failures=1, open_seconds=0.05)
+    _trip(breaker, 1)
+    time.sleep(0.06)
+    _trip(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_admits_only_the_probe():
+    breaker = CircuitBreaker("test", consecutive_failures=1, open_seconds=0.05, half_open_probes=1)
+    _trip(breaker, 1)
+    time.sleep(0.06)
+
+    def probe():
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: None)
+        return "ok"
+
+    assert breaker.call(probe) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_ignored_errors_do_not_count():
+    breaker = CircuitBreaker("test", consecutive_failures=1, is_failure=lambda e: not isinstance(e, ValueError))
+
+    def bad_request():
+        raise ValueError("invalid input")
+
+    with pytest.raises(ValueError):
+        breaker.call(bad_request)
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,36 @@
+"""Keyset-pagination cursors for GET /conversations/{id}"""
+import base64
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from main import decode_cursor, encode_cursor
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def test_round_trip():
+    created_at = datetime(2026, 3, 1, 12, 30, 45, 123456)
+    cursor = encode_cursor(created_at, "0b9f6c1e-message")
+    assert decode_cursor(cursor) == (created_at, "0b9f6c1e-message")
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(datetime(2026, 3, 1), "id?with/odd+chars|and-a-pipe")
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+    assert decode_cursor(cursor)[1] == "id?with/odd+chars|and-a-pipe"
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    _b64(b"no separator"),
+    _b64(b"yesterday|message-id"),
+    _b64(b"\xff\xfe|message-id"),
+])
+def test_bad_cursors_are_rejected_with_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,90 @@
+"""Request deadline budget: stage timeouts, nesting, and /ask degrading when it runs out"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from deadline import MIN_STAGE_SECONDS, DeadlineExceeded, deadline, remaining, stage_timeout
+
+CHUNKS = [
+    {"source": "Dubai Tenancy Guide", "text": "Rent increases are capped by the RERA index.", "score": 0.2,
+     "match": "vector", "page": 3, "metadata": {}},
+]
+
+
+def test_no_budget_outside_a_request():
+    assert remaining() is None
+    assert stage_timeout(10, "embedding") == 10
+    assert stage_timeout(None, "retrieval") is None
+
+
+def test_stage_timeout_shrinks_to_the_time_left():
+    with deadline(2):
+        assert 0 < remaining() <= 2
+        assert stage_timeout(10, "embedding") <= 2
+        assert stage_timeout(1, "embedding") == 1
+        assert stage_timeout(None, "retrieval") <= 2
+    assert remaining() is None
+
+
+def test_nested_budget_never_extends_the_outer_one():
+    with deadline(1):
+        with deadline(60):
+            assert remaining() <= 1
+        with deadline(0.5):
+            assert remaining() <= 0.5
+
+
+def test_stage_refused_when_too_little_time_is_left():
+    with deadline(MIN_STAGE_SECONDS / 2):
+        with pytest.raises(DeadlineExceeded):
+            stage_timeout(10, "generation")
+
+
+def _slow_retrieval(seconds):
+    async def retrieve(query, language, top_k=5, filters=None):
+        await asyncio.sleep(seconds)
+        return CHUNKS
+    return retrieve
+
+
+def test_ask_falls_back_when_retrieval_uses_up_the_budget(monkeypatch):
+    # Generation would start with less than MIN_STAGE_SECONDS left, so it
+    # is refused before any OpenAI call and the fallback answer is returned
+    monkeypatch.setattr(main, "REQUEST_DEADLINE_SECONDS", MIN_STAGE_SECONDS + 0.05)
+    monkeypatch.setattr(main, "retrieve_shared", _slow_retrieval(0.1))
+    client = TestClient(main.app)
+
+    response = client.post("/ask", json={"question": "How often can rent be increased?", "language": "en"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["confidence"] == "Low"
+    assert body["answer"]
+    assert body["citations"][0]["title"] == "Dubai Tenancy Guide"
+
+
+def test_ask_batch_runs_under_a_budget(monkeypatch):
+    seen = []
+
+    def retrieve_context_batch(questions, languages, top_k, filters):
+        seen.append(remaining())
+        time.sleep(0.1)
+        return [CHUNKS for _ in questions]
+
+    engine = SimpleNamespace(retrieve_context_batch=retrieve_context_batch)
+    monkeypatch.setattr(main, "get_rag_engine", lambda: engine)
+    monkeypatch.setattr(main, "REQUEST_DEADLINE_SECONDS", (MIN_STAGE_SECONDS + 0.05) / 2)
+    monkeypatch.setattr(main, "ASK_BATCH_CONCURRENCY", 1)
+    client = TestClient(main.app)
+
+    questions = [{"question": "How often can rent be increased?", "language": "en"}] * 2
+    response = client.post("/ask/batch", json={"questions": questions})
+
+    # Two waves of one generation each: twice the per-request budget
+    assert seen[0] is not None and seen[0] <= MIN_STAGE_SECONDS + 0.05
+    assert response.status_code == 200
+    assert [r["confidence"] for r in response.json()["results"]] == ["Low", "Low"]
@@ -0,0 +1,72 @@
+"""Embedding providers: local determinism and normalisation, OpenAI padding"""
+import numpy as np
+import pytest
+
+import embeddings
+from embeddings import LocalHashEmbeddingProvider, OpenAIEmbeddingProvider, get_embedding_provider, pad_vector
+from models import EMBEDDING_DIM
+
+
+def test_local_is_deterministic_and_normalised():
+    provider = LocalHashEmbeddingProvider()
+    first, again, other = provider.embed(["security deposit refund", "security deposit refund", "eviction notice"])
+
+    assert first == again
+    assert first == LocalHashEmbeddingProvider().embed(["security deposit refund"])[0]
+    assert len(first) == EMBEDDING_DIM
+    assert np.linalg.norm(first) == pytest.approx(1.0, abs=1e-5)
+    assert first != other
+
+
+def test_local_empty_text_is_zero():
+    assert not any(LocalHashEmbeddingProvider().embed([""])[0])
+
+
+def test_local_dimensions_hash_into_a_prefix():
+    provider = LocalHashEmbeddingProvider(dimensions=256)
+    vector = np.array(provider.embed(["security deposit refund"])[0])
+
+    assert provider.version == "hash-ngram-v1@256"
+    assert vector.shape == (EMBEDDING_DIM,)
+    assert not vector[256:].any() and vector[:256].any()
+    assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_local_rejects_unknown_model_and_bad_dimensions():
+    with pytest.raises(ValueError):
+        get_embedding_provider("local", model="text-embedding-3-large")
+    with pytest.raises(ValueError):
+        LocalHashEmbeddingProvider(dimensions=EMBEDDING_DIM + 1)
+    assert get_embedding_provider("local", model="hash-ngram-v1").version == "hash-ngram-v1"
+
+
+def test_openai_pads_shortened_vectors_in_input_order(monkeypatch):
+    calls = []
+
+    def fake_create_embedding(texts, priority, model, dimensions):
+        calls.append((model, dimensions))
+        return {"data": [{"index": 1, "embedding": [0.0, 1.0]}, {"index": 0, "embedding": [1.0, 0.0]}]}
+
+    monkeypatch.setattr(embeddings, "create_embedding", fake_create_embedding)
+    provider = OpenAIEmbeddingProvider(model="text-embedding-3-large", dimensions=2)
+    first, second = provider.embed(["a", "b"])
+
+    assert calls == [("text-embedding-3-large", 2)]
+    assert provider.version == "text-embedding-3-large@2"
+    assert len(first) == EMBEDDING_DIM and first[:2] == [1.0, 0.0] and not any(first[2:])
+    assert second[:2] == [0.0, 1.0]
+
+
+def test_openai_rejects_bad_dimensions():
+    with pytest.raises(ValueError):
+        OpenAIEmbeddingProvider(dimensions=0)
+
+
+def test_pad_vector():
+    assert pad_vector([1.0, 2.0], dim=4) == [1.0, 2.0, 0.0, 0.0]
+    assert pad_vector([1.0, 2.0], dim=2) == [1.0, 2.0]
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError):
+        get_embedding_provider("nope")
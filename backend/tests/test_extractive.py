@@ -0,0 +1,38 @@
+"""extract_answer: coverage is the idf-weighted share of the question's terms"""
+import math
+
+import pytest
+
+from extractive import extract_answer
+
+
+def _result(text: str, score: float = 0.9):
+    return {"text": text, "score": score, "source": "lease.pdf", "page": 3}
+
+
+def test_coverage_is_idf_weighted():
+    # "deposit" is in every sentence; "eviction" and "notice" in none
+    results = [_result(
+        "The deposit is held by the landlord for the whole term. "
+        "A deposit covers unpaid rent and damage to the property. "
+        "Landlords return the deposit within thirty days of handover. "
+        "Disputes about a deposit go to the rental committee."
+    )]
+    answer = extract_answer("deposit eviction notice", results)
+
+    assert answer is not None
+    deposit = math.log(1 + 4 / 5)
+    missing = math.log(1 + 4 / 1)
+    assert answer.coverage == pytest.approx(deposit / (deposit + 2 * missing))
+    assert answer.coverage < 1 / 3  # The unweighted share
+
+
+def test_full_coverage():
+    results = [_result("An eviction notice must give the tenant twelve months.")]
+    answer = extract_answer("eviction notice tenant", results)
+    assert answer.coverage == pytest.approx(1.0)
+    assert "[lease.pdf, p. 3]" in answer.text
+
+
+def test_no_shared_terms():
+    assert extract_answer("eviction notice", [_result("Rent is payable monthly in advance by cheque.")]) is None
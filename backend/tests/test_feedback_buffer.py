@@ -0,0 +1,87 @@
+"""FeedbackBuffer batching, requeue on failure and overflow; the /feedback 503 path"""
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+from feedback_buffer import FeedbackBuffer
+
+
+class FakeEngine:
+    """Records each inserted batch; raises while `fail` is set"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, rows):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.batches.append(list(rows))
+
+
+def _fill(buffer, count):
+    for i in range(count):
+        assert buffer.add(f"q{i}", None, i % 2 == 0)
+
+
+def test_flush_writes_in_batches_in_order():
+    engine = FakeEngine()
+    buffer = FeedbackBuffer(engine, batch_size=2)
+    _fill(buffer, 5)
+
+    assert buffer.flush() == 5
+    assert [len(batch) for batch in engine.batches] == [2, 2, 1]
+    assert [row["question"] for batch in engine.batches for row in batch] == ["q0", "q1", "q2", "q3", "q4"]
+    assert len(buffer) == 0
+
+
+def test_failed_batch_is_requeued_at_the_front():
+    engine = FakeEngine()
+    buffer = FeedbackBuffer(engine, batch_size=2)
+    _fill(buffer, 3)
+
+    engine.fail = True
+    assert buffer.flush() == 0
+    assert len(buffer) == 3
+
+    engine.fail = False
+    buffer.add("late", None, True)
+    assert buffer.flush() == 4
+    assert [row["question"] for batch in engine.batches for row in batch] == ["q0", "q1", "q2", "late"]
+
+
+def test_votes_beyond_max_pending_are_dropped_and_counted():
+    buffer = FeedbackBuffer(FakeEngine(), max_pending=2)
+    before = metrics.snapshot()["counters"].get("feedback.dropped", 0)
+    _fill(buffer, 2)
+
+    assert buffer.add("one too many", None, True) is False
+    assert len(buffer) == 2
+    assert metrics.snapshot()["counters"]["feedback.dropped"] == before + 1
+
+
+def test_feedback_endpoint_returns_503_when_buffer_is_full(monkeypatch):
+    monkeypatch.setattr(main, "feedback_buffer", FeedbackBuffer(FakeEngine(), max_pending=0))
+    client = TestClient(main.app)
+
+    response = client.post("/feedback", json={"question": "Is a deposit refundable?", "helpful": True})
+
+    assert response.status_code == 503
+
+
+def test_feedback_endpoint_queues_vote(monkeypatch):
+    buffer = FeedbackBuffer(FakeEngine())
+    monkeypatch.setattr(main, "feedback_buffer", buffer)
+    client = TestClient(main.app)
+
+    response = client.post("/feedback", json={"question": "Is a deposit refundable?", "answerId": "a1", "helpful": False})
+
+    assert response.status_code == 200
+    assert response.json()["ok"] is True
+    assert len(buffer) == 1
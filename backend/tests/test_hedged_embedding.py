@@ -0,0 +1,69 @@
+"""Hedged interactive embeddings: a second call races a primary slower than the recent p95"""
+import threading
+
+import metrics
+import openai_client
+from deadline import deadline, remaining
+from openai_client import MAX_RETRIES, _hedged
+
+
+def _counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_no_hedge_until_there_are_enough_samples(monkeypatch):
+    monkeypatch.setattr(openai_client, "hedge_delay", lambda: None)
+    calls = []
+
+    assert _hedged(lambda max_retries: calls.append(max_retries) or "primary") == "primary"
+    assert calls == [MAX_RETRIES]
+
+
+def test_fast_primary_is_not_hedged(monkeypatch):
+    monkeypatch.setattr(openai_client, "hedge_delay", lambda: 1.0)
+    calls = []
+    before = _counter("openai.embedding.hedged")
+
+    assert _hedged(lambda max_retries: calls.append(max_retries) or "primary") == "primary"
+    assert calls == [MAX_RETRIES]
+    assert _counter("openai.embedding.hedged") == before
+
+
+def test_hedge_fires_after_the_delay_and_wins(monkeypatch):
+    monkeypatch.setattr(openai_client, "hedge_delay", lambda: 0.05)
+    release = threading.Event()
+    hedged, won = _counter("openai.embedding.hedged"), _counter("openai.embedding.hedge_won")
+
+    def call(max_retries):
+        if max_retries == MAX_RETRIES:
+            release.wait(5)
+            return "primary"
+        # The hedge makes a single attempt
+        assert max_retries == 0
+        return "hedge"
+
+    try:
+        assert _hedged(call) == "hedge"
+    finally:
+        release.set()
+    assert _counter("openai.embedding.hedged") == hedged + 1
+    assert _counter("openai.embedding.hedge_won") == won + 1
+
+
+def test_failed_hedge_waits_for_the_primary(monkeypatch):
+    monkeypatch.setattr(openai_client, "hedge_delay", lambda: 0.02)
+
+    def call(max_retries):
+        if max_retries == 0:
+            raise RuntimeError("hedge failed")
+        threading.Event().wait(0.1)
+        return "primary"
+
+    assert _hedged(call) == "primary"
+
+
+def test_calls_run_inside_the_request_budget(monkeypatch):
+    monkeypatch.setattr(openai_client, "hedge_delay", lambda: None)
+    with deadline(5):
+        left = _hedged(lambda max_retries: remaining())
+    assert left is not None and 0 < left <= 5
@@ -0,0 +1,153 @@
+"""IngestionWorker: claim SQL, lease fencing on (worker, attempts), retries"""
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+import ingestion_worker
+from ingestion_worker import (
+    CLAIM_JOB_SQL, FINISH_SQL, HEARTBEAT_SQL, MAX_ATTEMPTS, PROGRESS_SQL, RETRY_SQL,
+    IngestionWorker, LeaseLost
+)
+
+Job = namedtuple("Job", ["id", "document_id", "source", "text", "file_path", "language", "meta_data", "attempts"])
+
+
+class FakeEngine:
+    """Records statements; `rowcounts` maps a statement to the rows it 'updates' (default 1)"""
+
+    def __init__(self, rowcounts=None):
+        self.rowcounts = rowcounts or {}
+        self.executed = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, params):
+        with self._lock:
+            self.executed.append((statement, params))
+        return SimpleNamespace(rowcount=self.rowcounts.get(statement, 1), fetchone=lambda: None)
+
+    def calls(self, statement):
+        with self._lock:
+            return [params for executed, params in self.executed if executed is statement]
+
+
+def _worker(engine, ingest):
+    rag_engine = SimpleNamespace(engine=engine, add_document_chunks=ingest, add_chunk_stream=ingest)
+    return IngestionWorker(rag_engine)
+
+
+def _job(attempts: int = 1, file_path: str = None) -> Job:
+    return Job(str(uuid4()), str(uuid4()), "lease.txt", "text", file_path, "en", {}, attempts)
+
+
+def test_claim_skips_locked_rows_and_starts_a_new_lease():
+    sql = " ".join(CLAIM_JOB_SQL.text.split())
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "attempts = attempts + 1" in sql
+    assert "worker = :worker" in sql
+
+
+@pytest.mark.parametrize("statement", [HEARTBEAT_SQL, PROGRESS_SQL, FINISH_SQL, RETRY_SQL])
+def test_job_writes_are_fenced_on_the_lease(statement):
+    assert "WHERE id = :id AND worker = :worker AND attempts = :attempt" in " ".join(statement.text.split())
+
+
+def test_successful_job_reports_progress_and_finishes_under_its_lease():
+    engine = FakeEngine()
+
+    def ingest(on_progress, **kwargs):
+        on_progress(0, 2)
+        on_progress(2, 2)
+
+    worker = _worker(engine, ingest)
+    job = _job()
+    worker._process(job)
+
+    lease = {"id": job.id, "worker": worker.name, "attempt": 1}
+    assert engine.calls(PROGRESS_SQL)[-1] == {**lease, "done": 2, "total": 2}
+    assert engine.calls(FINISH_SQL) == [{**lease, "status": "succeeded", "error": None}]
+
+
+def test_stolen_lease_aborts_without_finishing():
+    engine = FakeEngine({PROGRESS_SQL: 0})
+    reached = []
+
+    def ingest(on_progress, **kwargs):
+        on_progress(0, 2)
+        reached.append("commit")
+
+    _worker(engine, ingest)._process(_job())
+
+    assert reached == []
+    assert engine.calls(FINISH_SQL) == [] and engine.calls(RETRY_SQL) == []
+
+
+def test_on_progress_raises_lease_lost():
+    engine = FakeEngine({PROGRESS_SQL: 0})
+    raised = []
+
+    def ingest(on_progress, **kwargs):
+        try:
+            on_progress(0, 1)
+        except LeaseLost:
+            raised.append(True)
+            raise
+
+    _worker(engine, ingest)._process(_job())
+    assert raised == [True]
+
+
+def test_missed_heartbeat_marks_the_lease_lost(monkeypatch):
+    monkeypatch.setattr(ingestion_worker, "HEARTBEAT_SECONDS", 0.01)
+    engine = FakeEngine({HEARTBEAT_SQL: 0})
+
+    def ingest(on_progress, **kwargs):
+        deadline = time.monotonic() + 5
+        while not engine.calls(HEARTBEAT_SQL) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.02)
+        on_progress(0, 1)
+
+    _worker(engine, ingest)._process(_job())
+
+    assert engine.calls(HEARTBEAT_SQL)
+    assert engine.calls(PROGRESS_SQL) == []  # Lost before writing anything
+    assert engine.calls(FINISH_SQL) == []
+
+
+def test_failure_is_requeued_until_the_last_attempt():
+    def ingest(**kwargs):
+        raise RuntimeError("embedding failed")
+
+    engine = FakeEngine()
+    worker = _worker(engine, ingest)
+    worker._process(_job(attempts=1))
+    assert engine.calls(RETRY_SQL)[0]["error"] == "RuntimeError: embedding failed"
+    assert engine.calls(FINISH_SQL) == []
+
+    engine = FakeEngine()
+    worker = _worker(engine, ingest)
+    worker._process(_job(attempts=MAX_ATTEMPTS))
+    assert engine.calls(RETRY_SQL) == []
+    assert engine.calls(FINISH_SQL)[0]["status"] == "failed"
+
+
+def test_finish_keeps_the_upload_when_the_lease_was_lost(tmp_path):
+    upload = tmp_path / "upload.pdf"
+    upload.write_bytes(b"%PDF")
+    job = _job(file_path=str(upload))
+
+    _worker(FakeEngine({FINISH_SQL: 0}), None)._finish(job, "succeeded")
+    assert upload.exists()
+
+    _worker(FakeEngine(), None)._finish(job, "succeeded")
+    assert not os.path.exists(upload)
@@ -0,0 +1,108 @@
+"""KeywordIndex: overlap refreshes catch late commits, rebuilds drop deleted chunks"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from keyword_index import KeywordIndex
+
+Row = namedtuple("Row", ["id", "source", "page", "content", "content_ar", "language", "meta_data", "created_at"])
+
+T0 = datetime(2026, 1, 1, 12, 0)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def yield_per(self, count):
+        return iter(self._rows)
+
+
+class FakeDatabase:
+    """Stands in for the documents table behind LOAD_DOCUMENTS_SQL"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def insert(self, id: str, content: str, created_at: datetime):
+        self.rows[id] = Row(id, "lease.pdf", 1, content, None, "en", {}, created_at)
+
+    def session(self):
+        return self
+
+    def execute(self, statement, params):
+        rows = [row for row in self.rows.values() if row.created_at >= params["since"]]
+        return FakeResult(sorted(rows, key=lambda row: row.created_at))
+
+    def close(self):
+        pass
+
+
+def _ids(index: KeywordIndex, query: str):
+    return {chunk.id for chunk in index.search(query, top_k=10)}
+
+
+def test_refresh_picks_up_rows_committed_behind_the_watermark():
+    db = FakeDatabase()
+    db.insert("a", "security deposit refund", T0)
+    index = KeywordIndex(overlap_seconds=900)
+    assert index.load(db.session) == 1
+
+    # Stamped before a slow transaction committed, so older than the watermark
+    db.insert("late", "eviction notice period", T0 - timedelta(minutes=5))
+    assert index.load(db.session) == 1
+    assert _ids(index, "eviction") == {"late"}
+    assert len(index) == 2
+
+
+def test_refresh_does_not_reach_past_the_overlap():
+    db = FakeDatabase()
+    db.insert("a", "security deposit refund", T0)
+    index = KeywordIndex(overlap_seconds=60)
+    index.load(db.session)
+
+    db.insert("very-late", "eviction notice period", T0 - timedelta(hours=1))
+    assert index.load(db.session) == 0
+    assert index.load(db.session, full=True) == 2
+    assert _ids(index, "eviction") == {"very-late"}
+
+
+def test_full_rebuild_drops_deleted_chunks():
+    db = FakeDatabase()
+    db.insert("a", "security deposit refund", T0)
+    db.insert("b", "deposit deductions for damage", T0 + timedelta(seconds=1))
+    index = KeywordIndex()
+    index.load(db.session)
+    assert _ids(index, "deposit") == {"a", "b"}
+
+    del db.rows["b"]
+    index.load(db.session)
+    assert _ids(index, "deposit") == {"a", "b"}  # Incremental refreshes only add
+
+    index.load(db.session, full=True)
+    assert _ids(index, "deposit") == {"a"}
+    assert index.get("b") is None
+    assert len(index) == 1
+
+
+def test_refresh_if_stale_rebuilds_after_rebuild_seconds():
+    db = FakeDatabase()
+    db.insert("a", "security deposit refund", T0)
+    db.insert("b", "deposit deductions for damage", T0)
+    index = KeywordIndex(refresh_seconds=0, rebuild_seconds=0)
+    index.load(db.session)
+
+    del db.rows["b"]
+    index.refresh_if_stale(db.session)
+    assert index.get("b") is None
+
+
+def test_refresh_if_stale_is_incremental_between_rebuilds():
+    db = FakeDatabase()
+    db.insert("a", "security deposit refund", T0)
+    index = KeywordIndex(refresh_seconds=0, rebuild_seconds=3600)
+    index.load(db.session)
+
+    del db.rows["a"]
+    db.insert("b", "deposit deductions for damage", T0 + timedelta(seconds=1))
+    index.refresh_if_stale(db.session)
+    assert _ids(index, "deposit") == {"a", "b"}
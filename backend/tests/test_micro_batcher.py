@@ -0,0 +1,70 @@
+"""MicroBatcher: batching, result ordering, caller timeouts and the batch deadline"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import pytest
+
+from deadline import remaining
+from micro_batcher import MicroBatcher
+
+
+def test_concurrent_items_are_batched_in_order():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher("test", process, window_ms=50, max_batch=8)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(batcher.submit, range(4)))
+
+    assert results == [0, 2, 4, 6]
+    assert sum(len(batch) for batch in batches) == 4
+    assert len(batches) < 4
+
+
+def test_wrong_result_count_fails_every_caller():
+    batcher = MicroBatcher("test", lambda items: [], window_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+
+def test_timed_out_items_are_dropped_before_their_batch_starts():
+    release = threading.Event()
+    processed = []
+
+    def process(items):
+        processed.extend(items)
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher("test", process, window_ms=1, max_concurrency=1)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(batcher.submit, "first")
+        while not processed:
+            threading.Event().wait(0.005)
+        # The only batch thread is busy, so this item's batch never starts in time
+        with pytest.raises(FutureTimeoutError):
+            batcher.submit("late", timeout=0.05)
+        release.set()
+        assert first.result(timeout=5) == "first"
+
+    assert batcher.submit("after", timeout=5) == "after"
+    assert "late" not in processed
+
+
+
+def test_batch_runs_under_the_earliest_caller_timeout():
+    budgets = []
+
+    def process(items):
+        budgets.append(remaining())
+        return items
+
+    batcher = MicroBatcher("test", process, window_ms=1)
+    assert batcher.submit("bounded", timeout=2) == "bounded"
+    assert batcher.submit("unbounded") == "unbounded"
+
+    assert 0 < budgets[0] <= 2
+    assert budgets[1] is None
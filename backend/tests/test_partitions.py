@@ -0,0 +1,105 @@
+"""Partition maintenance: monthly bounds and which partitions retention removes"""
+from datetime import date
+from types import SimpleNamespace
+
+from partitions import (
+    PARTITION_BOUNDS_SQL, PURGE_CONVERSATIONS_SQL, PURGE_ORPHAN_FEEDBACKS_SQL,
+    _next_month, ensure_partitions, partition_name, purge_expired_partitions
+)
+
+
+def _bound(lower, upper):
+    return f"FOR VALUES FROM ('{lower} 00:00:00') TO ('{upper} 00:00:00')"
+
+
+class FakeConn:
+    """Answers the catalog queries from `partitions` ({table: [(name, bound)]}) and records the rest"""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "pg_partitioned_table" in sql:
+            return SimpleNamespace(scalar=lambda: params["t"] in self.partitions)
+        if statement is PARTITION_BOUNDS_SQL:
+            rows = self.partitions[params["table"]]
+            return [SimpleNamespace(name=name, bound=bound) for name, bound in rows]
+        self.statements.append((sql, params))
+        return None
+
+    def sql(self):
+        return [" ".join(sql.split()) for sql, _ in self.statements]
+
+
+def _all_tables(rows):
+    return {table: [(name.replace("messages", table), bound) for name, bound in rows]
+            for table in ("messages", "citations", "feedbacks")}
+
+
+def test_next_month_rolls_over_year_and_month_ends():
+    assert _next_month(date(2026, 12, 1)) == date(2027, 1, 1)
+    assert _next_month(date(2026, 1, 31)) == date(2026, 2, 1)
+    assert _next_month(date(2028, 2, 29)) == date(2028, 3, 1)
+
+
+def test_partition_name():
+    assert partition_name("messages", date(2026, 3, 1)) == "messages_p2026_03"
+
+
+def test_ensure_creates_missing_months_only():
+    conn = FakeConn({"messages": [
+        ("messages_default", "DEFAULT"),
+        ("messages_p2026_12", _bound("2026-12-01", "2027-01-01")),
+    ]})
+
+    created = ensure_partitions(conn, months_ahead=2, today=date(2026, 12, 31))
+
+    assert created == ["messages_p2027_01", "messages_p2027_02"]
+    assert any(
+        "ATTACH PARTITION messages_p2027_01 FOR VALUES FROM ('2027-01-01') TO ('2027-02-01')" in sql
+        for sql in conn.sql()
+    )
+
+
+def test_ensure_skips_unpartitioned_tables():
+    conn = FakeConn({})
+    assert ensure_partitions(conn, months_ahead=1, today=date(2026, 10, 19)) == []
+    assert conn.statements == []
+
+
+def test_purge_removes_only_whole_months_before_cutoff():
+    conn = FakeConn(_all_tables([
+        ("messages_default", "DEFAULT"),
+        ("messages_p2026_08", _bound("2026-08-01", "2026-09-01")),
+        ("messages_p2026_09", _bound("2026-09-01", "2026-10-01")),
+        ("messages_p2026_10", _bound("2026-10-01", "2026-11-01")),
+    ]))
+
+    # cutoff 2026-09-19: August has ended before it, September has not
+    removed = purge_expired_partitions(conn, retention_days=30, mode="drop", today=date(2026, 10, 19))
+
+    assert removed == ["messages_p2026_08", "citations_p2026_08", "feedbacks_p2026_08"]
+    assert "DROP TABLE messages_p2026_08" in conn.sql()
+    assert (PURGE_ORPHAN_FEEDBACKS_SQL.text, None) in conn.statements
+    assert conn.statements[-1] == (PURGE_CONVERSATIONS_SQL.text, {"cutoff": date(2026, 9, 19)})
+
+
+def test_purge_detach_moves_partitions_to_archive_and_keeps_feedbacks():
+    conn = FakeConn(_all_tables([("messages_p2026_08", _bound("2026-08-01", "2026-09-01"))]))
+
+    purge_expired_partitions(conn, retention_days=30, mode="detach", today=date(2026, 10, 19))
+
+    sql = conn.sql()
+    assert sql[0] == "CREATE SCHEMA IF NOT EXISTS archive"
+    assert "ALTER TABLE messages DETACH PARTITION messages_p2026_08" in sql
+    assert "ALTER TABLE messages_p2026_08 SET SCHEMA archive" in sql
+    assert not any(s.startswith("DROP TABLE") for s in sql)
+    assert (PURGE_ORPHAN_FEEDBACKS_SQL.text, None) not in conn.statements
+
+
+def test_purge_disabled_when_retention_is_zero():
+    conn = FakeConn(_all_tables([("messages_p2020_01", _bound("2020-01-01", "2020-02-01"))]))
+    assert purge_expired_partitions(conn, retention_days=0, today=date(2026, 10, 19)) == []
+    assert conn.statements == []
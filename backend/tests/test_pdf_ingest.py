@@ -0,0 +1,118 @@
+"""pdf_ingest: chunk boundaries and the extracted-text cache"""
+import gzip
+import hashlib
+import json
+import os
+import time
+
+import pdf_ingest
+from pdf_ingest import (
+    PDF_EXTRACTOR_VERSION, chunk_text, file_sha256, iter_pdf_pages, prune_text_cache, text_artifact_path
+)
+
+
+def test_chunks_overlap_and_stop_at_the_end():
+    text = "".join(chr(ord("a") + i % 26) for i in range(2500))  # No sentence breaks
+    chunks = chunk_text(text, chunk_size=1000, chunk_overlap=200)
+
+    assert chunks == [text[0:1000], text[800:1800], text[1600:2500]]
+
+
+def test_no_trailing_overlap_only_chunk():
+    text = "x" * 1000
+    assert chunk_text(text, chunk_size=1000, chunk_overlap=200) == [text]
+    assert chunk_text("short text", chunk_size=1000, chunk_overlap=200) == ["short text"]
+
+
+def test_breaks_at_sentence_end_past_half_the_chunk():
+    first = "a" * 700 + "."
+    text = first + " " + "b" * 900
+    chunks = chunk_text(text, chunk_size=1000, chunk_overlap=200)
+
+    assert chunks == [first, text[501:1501], text[1301:]]
+
+
+def _fake_pages(pages):
+    """Stands in for PyPDF2 parsing; counts calls"""
+    calls = []
+
+    def parse(pdf_path):
+        calls.append(pdf_path)
+        yield from pages
+    return parse, calls
+
+
+def test_artifact_path_keys_on_content_hash_and_extractor(tmp_path):
+    path = text_artifact_path("abc123", str(tmp_path))
+    assert os.path.basename(path) == f"abc123.{PDF_EXTRACTOR_VERSION}.jsonl.gz"
+
+
+def test_file_sha256(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 contents")
+    assert file_sha256(str(pdf)) == hashlib.sha256(b"%PDF-1.4 contents").hexdigest()
+
+
+def test_pages_round_trip_through_the_gzip_jsonl_artifact(tmp_path, monkeypatch):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 one")
+    pages = [(1, "Tenancy contract clause"), (3, "عقد الإيجار")]
+    parse, calls = _fake_pages(pages)
+    monkeypatch.setattr(pdf_ingest, "_parse_pdf_pages", parse)
+    cache = str(tmp_path / "cache")
+
+    assert list(iter_pdf_pages(str(pdf), cache_dir=cache)) == pages
+    artifact = text_artifact_path(file_sha256(str(pdf)), cache)
+    with gzip.open(artifact, "rt", encoding="utf-8") as file:
+        header = json.loads(next(file))
+    assert header["sha256"] == file_sha256(str(pdf))
+    assert header["extractor"] == PDF_EXTRACTOR_VERSION
+
+    # Served from the artifact; a different file's content is parsed again
+    assert list(iter_pdf_pages(str(pdf), cache_dir=cache)) == pages
+    assert len(calls) == 1
+    pdf.write_bytes(b"%PDF-1.4 two")
+    list(iter_pdf_pages(str(pdf), cache_dir=cache))
+    assert len(calls) == 2
+
+
+def test_interrupted_parse_publishes_no_artifact(tmp_path, monkeypatch):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    parse, _ = _fake_pages([(1, "page one"), (2, "page two")])
+    monkeypatch.setattr(pdf_ingest, "_parse_pdf_pages", parse)
+    cache = tmp_path / "cache"
+
+    pages = iter_pdf_pages(str(pdf), cache_dir=str(cache))
+    next(pages)
+    pages.close()
+    assert list(cache.iterdir()) == []
+
+
+def test_prune_evicts_least_recently_used_first(tmp_path):
+    now = time.time()
+    for age, name in ((300, "old"), (200, "middle"), (100, "new")):
+        path = tmp_path / f"{name}.jsonl.gz"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (now - age, now - age))
+    (tmp_path / "other.tmp").write_bytes(b"x" * 1000)
+
+    removed = prune_text_cache(str(tmp_path), max_bytes=200)
+    assert [os.path.basename(path) for path in removed] == ["old.jsonl.gz"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["middle.jsonl.gz", "new.jsonl.gz", "other.tmp"]
+
+    assert prune_text_cache(str(tmp_path), max_bytes=0) == []  # 0 = unbounded
+
+
+def test_cache_hit_refreshes_recency(tmp_path, monkeypatch):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    parse, _ = _fake_pages([(1, "page one")])
+    monkeypatch.setattr(pdf_ingest, "_parse_pdf_pages", parse)
+    cache = str(tmp_path / "cache")
+    list(iter_pdf_pages(str(pdf), cache_dir=cache))
+    artifact = text_artifact_path(file_sha256(str(pdf)), cache)
+    os.utime(artifact, (0, 0))
+
+    list(iter_pdf_pages(str(pdf), cache_dir=cache))
+    assert os.path.getmtime(artifact) > 0
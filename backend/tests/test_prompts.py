@@ -0,0 +1,43 @@
+"""Prompt layout: a static system prefix that providers can cache across requests"""
+import json
+
+from prompts import PROMPTS, get_prompt
+
+
+def _prefix_bytes(messages):
+    return json.dumps(messages[0], ensure_ascii=False).encode("utf-8")
+
+
+def test_system_prefix_is_byte_identical_across_requests():
+    for language, template in PROMPTS.items():
+        first = template.build("Can my landlord raise the rent?", "[1] Law No. 26 of 2007, Article 9")
+        second = template.build(
+            "How much notice for eviction?",
+            "[1] Law No. 33 of 2008, Article 25",
+            history=[{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}],
+            low_confidence=True
+        )
+        assert _prefix_bytes(first) == _prefix_bytes(second), language
+        assert first[0] == {"role": "system", "content": template.system}
+
+
+def test_per_request_content_follows_history():
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+    messages = get_prompt("en").build("Is a deposit refundable?", "[1] context", history=history)
+
+    assert messages[1:3] == history
+    assert messages[3]["role"] == "system" and "[1] context" in messages[3]["content"]
+    assert messages[-1] == {"role": "user", "content": "Is a deposit refundable?"}
+
+
+def test_low_confidence_warning_only_changes_the_context_message():
+    template = get_prompt("ar")
+    plain = template.build("سؤال", "سياق")
+    warned = template.build("سؤال", "سياق", low_confidence=True)
+
+    assert plain[0] == warned[0] and plain[-1] == warned[-1]
+    assert warned[1]["content"] == plain[1]["content"] + template._low_confidence
+
+
+def test_unknown_language_falls_back_to_english():
+    assert get_prompt("fr") is PROMPTS["en"]
@@ -0,0 +1,66 @@
+"""AdaptiveRateLimiter: priority ordering, queue timeouts and AIMD backoff"""
+import threading
+import time
+
+import pytest
+
+from rate_limiter import PRIORITY_BULK, PRIORITY_INTERACTIVE, AdaptiveRateLimiter, RateLimitExceeded
+
+
+def _drained(requests_per_minute: float = 600) -> AdaptiveRateLimiter:
+    limiter = AdaptiveRateLimiter("test", requests_per_minute=requests_per_minute, tokens_per_minute=1_000_000)
+    limiter.requests.available = 0.0
+    return limiter
+
+
+def test_interactive_is_served_before_earlier_bulk():
+    limiter = _drained()
+    order = []
+
+    def acquire(name, priority):
+        limiter.acquire(priority=priority)
+        order.append(name)
+
+    bulk = threading.Thread(target=acquire, args=("bulk", PRIORITY_BULK))
+    bulk.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=acquire, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    bulk.join(5)
+    interactive.join(5)
+
+    assert order == ["interactive", "bulk"]
+
+
+def test_same_priority_is_first_come_first_served():
+    limiter = _drained()
+    order = []
+
+    def acquire(name):
+        limiter.acquire(priority=PRIORITY_BULK)
+        order.append(name)
+
+    threads = [threading.Thread(target=acquire, args=(name,)) for name in ("first", "second")]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["first", "second"]
+
+
+def test_queue_timeout_raises():
+    limiter = _drained(requests_per_minute=6)  # Next request in 10s
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(timeout=0.1)
+    assert limiter._waiters == []
+
+
+def test_rate_limited_backs_off_and_recovers():
+    limiter = AdaptiveRateLimiter("test", requests_per_minute=600, tokens_per_minute=1_000_000)
+    limiter.on_rate_limited(retry_after=0.5)
+    assert limiter.factor == pytest.approx(0.7)
+    assert limiter.paused_until > time.monotonic()
+    limiter.on_success()
+    assert limiter.factor == pytest.approx(0.72)
@@ -0,0 +1,108 @@
+"""Re-embedding: shadow comparison sampling and overlap, cut-over renames, index DDL"""
+from types import SimpleNamespace
+
+import pytest
+
+import rag_engine
+from models import EMBEDDING_DIM
+from reembed import (
+    LANGUAGES, ShadowComparison, _next_index_sql, _swap_sql, load_embedding_config
+)
+
+READY = SimpleNamespace(status="ready")
+
+
+class RecordingComparison(ShadowComparison):
+    """Runs comparisons inline and records what would have been compared"""
+
+    def __init__(self, sample_rate):
+        super().__init__(search=None, sample_rate=sample_rate)
+        self.compared = []
+
+    def _compare_in_background(self, *args):
+        self.compared.append(args)
+        self._busy.release()
+
+    def maybe_compare(self, *args):
+        super().maybe_compare(*args)
+        self._executor.shutdown(wait=True)
+
+
+def test_only_ready_migrations_are_sampled():
+    for migration in (None, SimpleNamespace(status="backfilling"), SimpleNamespace(status="active")):
+        comparison = RecordingComparison(sample_rate=1.0)
+        comparison.maybe_compare(migration, "q", "en", 5, "{}", ["a"])
+        assert comparison.compared == []
+
+
+@pytest.mark.parametrize("rate, expected", [(0.0, 0), (1.0, 1)])
+def test_sample_rate(rate, expected):
+    comparison = RecordingComparison(sample_rate=rate)
+    comparison.maybe_compare(READY, "q", "en", 5, "{}", ["a"])
+    assert len(comparison.compared) == expected
+
+
+def test_overlap_is_the_share_of_live_ids_found_by_the_shadow_search():
+    comparison = ShadowComparison(search=None)
+    comparison.record(["a", "b", "c", "d"], ["a", "b", "x", "y"])
+    comparison.record(["a", "b"], ["b", "a"])
+    comparison.record([], ["a"])  # nothing to compare against: ignored
+
+    snapshot = comparison.snapshot()
+    assert snapshot["count"] == 2
+    assert snapshot["mean_overlap"] == 0.75
+    assert snapshot["p10_overlap"] == 0.5
+
+
+def test_compare_limits_live_ids_to_top_k(monkeypatch):
+    monkeypatch.setattr(
+        "reembed.provider_for",
+        lambda migration: SimpleNamespace(embed=lambda texts, priority: [[0.0]])
+    )
+    comparison = ShadowComparison(search=lambda migration, vector, language, top_k, filters: ["a", "b"])
+    comparison.compare(READY, "q", "en", 2, "{}", ["a", "c", "b"])
+    assert comparison.snapshot()["mean_overlap"] == 0.5
+
+
+def test_empty_snapshot():
+    assert ShadowComparison(search=None).snapshot() == {"count": 0}
+
+
+def test_swap_sql_exchanges_columns_and_indexes_through_a_temporary_name():
+    statements = _swap_sql()
+
+    assert statements[:3] == [
+        "ALTER TABLE documents RENAME COLUMN embedding TO embedding_swap",
+        "ALTER TABLE documents RENAME COLUMN embedding_next TO embedding",
+        "ALTER TABLE documents RENAME COLUMN embedding_swap TO embedding_next",
+    ]
+    for suffix in ("_provider", "_version"):
+        assert f"ALTER TABLE documents RENAME COLUMN embedding_next{suffix} TO embedding{suffix}" in statements
+    for language in LANGUAGES:
+        assert statements.index(
+            f"ALTER INDEX IF EXISTS ix_documents_embedding_hnsw_{language} RENAME TO ix_documents_embedding_swap_hnsw_{language}"
+        ) < statements.index(
+            f"ALTER INDEX IF EXISTS ix_documents_embedding_next_hnsw_{language} RENAME TO ix_documents_embedding_hnsw_{language}"
+        )
+    assert len(statements) == 3 * 3 + 3 * len(LANGUAGES)
+
+
+def test_next_index_matches_the_search_expression():
+    sql = _next_index_sql("ar")
+
+    assert f"CAST(embedding_next AS halfvec({EMBEDDING_DIM}))" in sql
+    assert "WHERE language = 'ar'" in sql
+    if rag_engine.VECTOR_SEARCH_CAST == "halfvec":
+        assert f"CAST(embedding_next AS halfvec({EMBEDDING_DIM}))" in rag_engine.NEXT_VECTOR_SEARCH_SQL.text
+
+
+def test_config_without_the_migrations_table():
+    conn = SimpleNamespace(execute=lambda statement: SimpleNamespace(scalar=lambda: False))
+    assert load_embedding_config(conn) == {"active": None, "in_flight": None}
+
+
+def test_config_splits_active_and_in_flight():
+    active, ready = SimpleNamespace(status="active"), SimpleNamespace(status="ready")
+    results = iter([SimpleNamespace(scalar=lambda: True), [active, ready]])
+    conn = SimpleNamespace(execute=lambda statement: next(results))
+    assert load_embedding_config(conn) == {"active": active, "in_flight": ready}
@@ -0,0 +1,48 @@
+"""mmr_select: per-source cap as a preference, backfill and duplicate skipping"""
+import numpy as np
+
+from reranker import mmr_select
+
+
+def _unit(dim: int, *weights) -> np.ndarray:
+    vector = np.zeros(dim, dtype=np.float32)
+    for axis, weight in weights:
+        vector[axis] = weight
+    return vector
+
+
+QUERY = _unit(8, (0, 1.0))
+# Three strongly relevant chunks from A, two weaker ones from B
+CANDIDATES = np.stack([
+    _unit(8, (0, 1.0), (1, 0.3)),
+    _unit(8, (0, 1.0), (2, 0.3)),
+    _unit(8, (0, 1.0), (3, 0.3)),
+    _unit(8, (0, 0.5), (4, 1.0)),
+    _unit(8, (0, 0.5), (5, 1.0)),
+])
+SOURCES = ["a.pdf", "a.pdf", "a.pdf", "b.pdf", "b.pdf"]
+
+
+def test_cap_prefers_other_sources():
+    selected = mmr_select(QUERY, CANDIDATES, SOURCES, top_k=4, lambda_mult=0.9, max_per_source=2)
+    assert sorted(SOURCES[i] for i in selected) == ["a.pdf", "a.pdf", "b.pdf", "b.pdf"]
+
+
+def test_cap_backfills_once_other_sources_are_used_up():
+    selected = mmr_select(QUERY, CANDIDATES, SOURCES, top_k=5, lambda_mult=0.9, max_per_source=2)
+    assert sorted(selected) == [0, 1, 2, 3, 4]
+
+
+def test_single_source_fills_every_slot():
+    selected = mmr_select(QUERY, CANDIDATES[:3], SOURCES[:3], top_k=3, max_per_source=2)
+    assert sorted(selected) == [0, 1, 2]
+
+
+def test_duplicates_are_skipped_even_when_backfilling():
+    candidates = np.stack([CANDIDATES[0], CANDIDATES[0], CANDIDATES[1]])
+    selected = mmr_select(QUERY, candidates, ["a.pdf"] * 3, top_k=3, max_per_source=1, duplicate_threshold=0.95)
+    assert sorted(selected) in ([0, 2], [1, 2])
+
+
+def test_empty_candidates():
+    assert mmr_select(QUERY, np.zeros((0, 8)), [], top_k=3) == []